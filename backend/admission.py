@@ -0,0 +1,337 @@
+import contextlib
+import ctypes
+import json
+import math
+import multiprocessing
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+
+def refill(tokens: float, updated: float, rate: float, burst: float, now: float, cost: float = 1.0):
+    """One token-bucket step: (tokens left, seconds to wait; 0 = allowed)."""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; rate <= 0 means unlimited."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> float:
+        """Spend cost tokens; 0 if allowed, else seconds until it would be."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens, wait = refill(self.tokens, self.updated, self.rate, self.burst, now, cost)
+        self.updated = now
+        return wait
+
+    def refund(self, cost: float = 1.0):
+        """Give back tokens spent on a request that was turned away anyway."""
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class Tenant:
+    """One API key: its limits and live usage."""
+
+    def __init__(self, key: str, name: str, rate_per_second: float, burst: float, max_concurrent: int):
+        self.key = key
+        self.name = name
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.concurrency_limited = 0
+        self.shed = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "ratePerSecond": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "maxConcurrent": self.max_concurrent,
+            "inFlight": self.in_flight,
+            "admitted": self.admitted,
+            "rateLimited": self.rate_limited,
+            "concurrencyLimited": self.concurrency_limited,
+            "shed": self.shed,
+        }
+
+
+class KeyStore:
+    """API keys and their limits.
+
+    `config` maps key -> {"name", "ratePerSecond", "burst", "maxConcurrent"};
+    anything a key leaves out falls back to the defaults. A ratePerSecond or
+    maxConcurrent of 0 disables that limit for the key.
+    """
+
+    def __init__(self, config: Dict[str, dict], rate_per_second: float = 10, burst: float = 20, max_concurrent: int = 8):
+        self.tenants: Dict[str, Tenant] = {}
+        for key, limits in config.items():
+            self.tenants[key] = Tenant(
+                key,
+                limits.get("name", key[:8]),
+                float(limits.get("ratePerSecond", rate_per_second)),
+                float(limits.get("burst", burst)),
+                int(limits.get("maxConcurrent", max_concurrent)),
+            )
+
+    @classmethod
+    def from_sources(cls, legacy_key: Optional[str], keys_json: Optional[str] = None, keys_file: Optional[str] = None, **defaults):
+        """Keys from API_KEYS (inline JSON) or API_KEYS_FILE, plus the single
+        legacy CALLGUARD_AI_API_KEY with default limits unless listed."""
+        config = {}
+        if keys_file:
+            with open(keys_file) as f:
+                config.update(json.load(f))
+        if keys_json:
+            config.update(json.loads(keys_json))
+        if legacy_key and legacy_key not in config:
+            config[legacy_key] = {"name": "default"}
+        return cls(config, **defaults)
+
+    def get(self, key: Optional[str]) -> Optional[Tenant]:
+        return self.tenants.get(key) if key else None
+
+
+class SharedLimits:
+    """Per-key token buckets and in-flight counts in shared memory, for a
+    pre-fork server (server.py).
+
+    Created in the parent before forking and inherited by every worker, so
+    a key's rate and concurrency limits hold across the whole pool rather
+    than once per worker. In-flight counts are kept per worker so the
+    parent can clear a dead worker's share. Callers hold `lock`.
+    """
+
+    def __init__(self, keys: KeyStore, workers: int):
+        context = multiprocessing.get_context("fork")
+        self.slots = {key: slot for slot, key in enumerate(keys.tenants)}
+        self.workers = workers
+        self.worker = 0
+        self.lock = context.Lock()
+        # CLOCK_MONOTONIC is system-wide, so `updated` means the same in every worker.
+        self._tokens = context.RawArray(ctypes.c_double, [t.bucket.burst for t in keys.tenants.values()])
+        self._updated = context.RawArray(ctypes.c_double, [time.monotonic()] * len(self.slots))
+        self._in_flight = context.RawArray(ctypes.c_int, workers * len(self.slots))
+
+    def take(self, tenant: Tenant, cost: float = 1.0) -> float:
+        if tenant.bucket.rate <= 0:
+            return 0.0
+        slot = self.slots[tenant.key]
+        now = time.monotonic()
+        self._tokens[slot], wait = refill(self._tokens[slot], self._updated[slot], tenant.bucket.rate,
+                                          tenant.bucket.burst, now, cost)
+        self._updated[slot] = now
+        return wait
+
+    def refund(self, tenant: Tenant, cost: float = 1.0):
+        slot = self.slots[tenant.key]
+        self._tokens[slot] = min(tenant.bucket.burst, self._tokens[slot] + cost)
+
+    def in_flight(self, tenant: Tenant) -> int:
+        slot = self.slots[tenant.key]
+        return sum(self._in_flight[worker * len(self.slots) + slot] for worker in range(self.workers))
+
+    def add(self, tenant: Tenant, delta: int):
+        self._in_flight[self.worker * len(self.slots) + self.slots[tenant.key]] += delta
+
+    def clear_worker(self, worker: int):
+        """Forget a dead worker's in-flight requests (parent only)."""
+        with self.lock:
+            for slot in range(len(self.slots)):
+                self._in_flight[worker * len(self.slots) + slot] = 0
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, message: str, retry_after: float):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class AdmissionController:
+    """Decides, before any body is read, whether a request gets in.
+
+    In order: key over its token bucket -> 429; key at its concurrency cap
+    -> 429; whole process at max_in_flight -> 503. A request turned away by
+    either of the last two gets its rate token back. The 503 Retry-After is
+    an EWMA of how long admitted requests take, so clients back off for
+    about as long as a slot takes to free up.
+
+    With `shared` set, per-key limits are enforced across worker processes;
+    max_in_flight stays per process, since it guards that process's own
+    event loop and model pool.
+    """
+
+    def __init__(self, keys: KeyStore, max_in_flight: int = 32, shared: Optional[SharedLimits] = None):
+        self.keys = keys
+        self.max_in_flight = max_in_flight
+        self.shared = shared
+        self.in_flight = 0
+        self.shed = 0
+        self.service_seconds = 1.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def unlimited(cls, keys: KeyStore) -> "AdmissionController":
+        """The same keys with every limit off, for benches that drive the
+        app in-process and would otherwise measure the limits."""
+        return cls(KeyStore({tenant.key: {"name": tenant.name, "ratePerSecond": 0, "maxConcurrent": 0}
+                             for tenant in keys.tenants.values()}), max_in_flight=math.inf)
+
+    def admit(self, key: Optional[str]) -> Optional[Tenant]:
+        """The caller's Tenant, now holding a slot, or None for an unknown
+        key (left to the endpoint's own auth check to reject)."""
+        tenant = self.keys.get(key)
+        if tenant is None:
+            return None
+        shared = self.shared
+        with self._lock, shared.lock if shared else contextlib.nullcontext():
+            wait = shared.take(tenant) if shared else tenant.bucket.take()
+            if wait:
+                tenant.rate_limited += 1
+                raise Rejected(429, f"Rate limit exceeded for key '{tenant.name}'", wait)
+            in_flight = shared.in_flight(tenant) if shared else tenant.in_flight
+            if tenant.max_concurrent and in_flight >= tenant.max_concurrent:
+                tenant.concurrency_limited += 1
+                rejection = Rejected(429, f"Too many concurrent requests for key '{tenant.name}'", self.service_seconds)
+            elif self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                tenant.shed += 1
+                rejection = Rejected(503, "Server is at capacity, retry later", self.service_seconds)
+            else:
+                rejection = None
+            if rejection:
+                if shared:
+                    shared.refund(tenant)
+                else:
+                    tenant.bucket.refund()
+                raise rejection
+            tenant.in_flight += 1
+            tenant.admitted += 1
+            self.in_flight += 1
+            if shared:
+                shared.add(tenant, 1)
+        return tenant
+
+    def charge(self, key: Optional[str], cost: float):
+        """Spend `cost` more rate tokens on an admitted request whose size is
+        only known once its body is parsed (a batch pays per clip). Raises
+        Rejected: 429 if the key is out of tokens, 413 if the cost is more
+        than its burst and could never be paid."""
+        tenant = self.keys.get(key)
+        if tenant is None or cost <= 0 or tenant.bucket.rate <= 0:
+            return
+        if cost > tenant.bucket.burst:
+            tenant.rate_limited += 1
+            raise Rejected(413, f"Request needs {cost:g} rate tokens; key '{tenant.name}' allows {tenant.bucket.burst:g}", 0)
+        shared = self.shared
+        with self._lock, shared.lock if shared else contextlib.nullcontext():
+            wait = shared.take(tenant, cost) if shared else tenant.bucket.take(cost)
+            if wait:
+                tenant.rate_limited += 1
+                raise Rejected(429, f"Rate limit exceeded for key '{tenant.name}'", wait)
+
+    def release(self, tenant: Tenant, seconds: Optional[float]):
+        """Free the tenant's slot. `seconds` feeds the Retry-After EWMA; None
+        for sessions (WebSockets) whose length says nothing about it."""
+        shared = self.shared
+        with self._lock, shared.lock if shared else contextlib.nullcontext():
+            if shared:
+                shared.add(tenant, -1)
+            tenant.in_flight -= 1
+            self.in_flight -= 1
+            if seconds is not None:
+                self.service_seconds += 0.2 * (seconds - self.service_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "maxInFlight": self.max_in_flight,
+                "inFlight": self.in_flight,
+                "shed": self.shed,
+                "serviceSecondsEwma": round(self.service_seconds, 3),
+                "keys": [tenant.snapshot() for tenant in self.keys.tenants.values()],
+            }
+        if self.shared:
+            # Everything above is this worker's view; these are pool-wide.
+            with self.shared.lock:
+                stats["pool"] = {
+                    "workers": self.shared.workers,
+                    "worker": self.shared.worker,
+                    "keysInFlight": {t.name: self.shared.in_flight(t) for t in self.keys.tenants.values()},
+                }
+        return stats
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to HTTP requests and
+    WebSocket connections under `prefixes`, before the body is read or the
+    socket accepted.
+
+    A WebSocket holds its slot for the life of the connection; the key may
+    also come from ?api_key=, as browsers cannot set headers on one.
+    `controller` is a zero-argument callable returning the controller, so
+    the app can swap it (tests, reloads) without rebuilding the stack.
+    Rejections use the same {"detail": {"status", "message"}} body as the
+    endpoints' own errors, plus a Retry-After header; a rejected WebSocket
+    is closed with 1013 (try again later) and the message as the reason.
+    """
+
+    def __init__(self, app, controller: Callable[[], AdmissionController], prefixes: Tuple[str, ...] = ("/api/",)):
+        self.app = app
+        self.controller = controller
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] not in ("http", "websocket") or scope.get("method") == "OPTIONS"
+                or not scope["path"].startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller()
+        key = dict(scope.get("headers") or []).get(b"x-api-key", b"").decode("latin-1") or None
+        if key is None and scope["type"] == "websocket":
+            key = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("api_key", [None])[0]
+        try:
+            tenant = controller.admit(key)
+        except Rejected as e:
+            if scope["type"] == "websocket":
+                await receive()  # websocket.connect
+                await send({"type": "websocket.close", "code": 1013, "reason": e.message})
+            else:
+                await self.reject(e, send)
+            return
+        if tenant is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(tenant, time.monotonic() - started if scope["type"] == "http" else None)
+
+    @staticmethod
+    async def reject(rejection: Rejected, send):
+        body = json.dumps({"detail": {"status": "error", "message": rejection.message}}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(rejection.retry_after).encode()),
+        ]
+        await send({"type": "http.response.start", "status": rejection.status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
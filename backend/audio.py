@@ -0,0 +1,163 @@
+import io
+import wave
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# audioFormat values clients send, mapped to the mime types Gemini accepts.
+MIME_TYPES = {
+    "mp3": "audio/mp3",
+    "mpeg": "audio/mp3",
+    "wav": "audio/wav",
+    "wave": "audio/wav",
+    "x-wav": "audio/wav",
+    "aiff": "audio/aiff",
+    "aac": "audio/aac",
+    "m4a": "audio/aac",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+    "flac": "audio/flac",
+}
+
+
+def mime_type_for(audio_format: str, audio: bytes = b"") -> str:
+    """Mime type for a declared audioFormat, trusting the bytes for WAV."""
+    if is_wav(audio):
+        return "audio/wav"
+    fmt = audio_format.lower().strip().lstrip(".")
+    fmt = fmt.split("/", 1)[-1]
+    return MIME_TYPES.get(fmt, "audio/mp3")
+
+
+def is_wav(audio: bytes) -> bool:
+    return len(audio) >= 12 and audio[:4] == b"RIFF" and audio[8:12] == b"WAVE"
+
+
+def decode_pcm(audio: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode a PCM WAV clip to mono float32 in [-1, 1] and its sample rate.
+
+    Returns None for anything we cannot decode locally (MP3, AAC, ...);
+    callers then forward the original bytes untouched.
+    """
+    if not is_wav(audio):
+        return None
+    try:
+        with wave.open(io.BytesIO(audio)) as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        return None
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    """Encode mono float samples in [-1, 1] as 16-bit PCM WAV."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def trim_silence(samples: np.ndarray, rate: int, threshold_dbfs: float = -50.0, pad_seconds: float = 0.1) -> np.ndarray:
+    """Drop leading and trailing 10 ms frames quieter than threshold_dbfs,
+    keeping pad_seconds of context on each side."""
+    hop = max(int(rate * 0.01), 1)
+    usable = len(samples) - len(samples) % hop
+    if usable == 0:
+        return samples
+    frame_rms = np.sqrt(np.mean(samples[:usable].reshape(-1, hop).astype(np.float64) ** 2, axis=1))
+    loud = np.flatnonzero(frame_rms > 10 ** (threshold_dbfs / 20))
+    if len(loud) == 0:
+        return samples[:0]
+    pad = int(pad_seconds * rate)
+    start = max(loud[0] * hop - pad, 0)
+    end = min((loud[-1] + 1) * hop + pad, len(samples))
+    return samples[start:end]
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """Band-limited resampling by truncating/zero-padding the spectrum."""
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    n_out = max(int(round(len(samples) * target_rate / rate)), 1)
+    spectrum = np.fft.rfft(samples)
+    bins = n_out // 2 + 1
+    if bins <= len(spectrum):
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.concatenate([spectrum, np.zeros(bins - len(spectrum), dtype=spectrum.dtype)])
+    return (np.fft.irfft(spectrum, n_out) * (n_out / len(samples))).astype(np.float32)
+
+
+class NormalizedAudio(NamedTuple):
+    audio: bytes
+    mime_type: str
+    original_bytes: int
+    duration_seconds: Optional[float]
+    changed: bool
+
+
+def normalize_audio(audio: bytes, mime_type: str, target_rate: int = 16000, max_seconds: float = 60.0) -> NormalizedAudio:
+    """Shrink a clip before it goes upstream.
+
+    Decodable clips are downmixed to mono, trimmed of leading/trailing
+    silence, resampled to at most target_rate, capped at max_seconds and
+    re-encoded as 16-bit mono WAV. Anything we cannot decode, or that would
+    not get smaller, is passed through untouched.
+    """
+    decoded = decode_pcm(audio)
+    if decoded is None:
+        return NormalizedAudio(audio, mime_type, len(audio), None, False)
+
+    samples, rate = decoded
+    samples = trim_silence(samples, rate)
+    samples = samples[: int(max_seconds * rate)]
+    out_rate = min(rate, target_rate)
+    samples = resample(samples, rate, out_rate)
+    encoded = encode_wav(samples, out_rate)
+    if len(encoded) >= len(audio):
+        return NormalizedAudio(audio, "audio/wav", len(audio), len(decoded[0]) / rate, False)
+    return NormalizedAudio(encoded, "audio/wav", len(audio), len(samples) / out_rate, True)
+
+
+def split_windows(samples: np.ndarray, rate: int, window_seconds: float, overlap_seconds: float):
+    """Overlapping (start_s, end_s, samples) windows covering the clip.
+
+    A trailing remainder no longer than the overlap is already covered by
+    the previous window and is not emitted on its own.
+    """
+    size = max(int(window_seconds * rate), 1)
+    step = max(size - int(overlap_seconds * rate), 1)
+    overlap = size - step
+    windows = []
+    start = 0
+    while True:
+        end = min(start + size, len(samples))
+        windows.append((start / rate, end / rate, samples[start:end]))
+        if end >= len(samples) or len(samples) - (start + step) <= overlap:
+            break
+        start += step
+    return windows
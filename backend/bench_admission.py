@@ -0,0 +1,46 @@
+"""Latency of admitted requests under 2x overload, with and without shedding.
+
+Spawns stub_gemini.py (0.5 s median model latency) and the backend via
+loadgen.py, then offers ~2x what MODEL_CONCURRENCY model threads can
+serve. Without admission control every request is accepted and queues;
+with ADMISSION_MAX_IN_FLIGHT the excess gets an immediate 503 and the
+requests that are admitted keep bounded latency. No network access.
+
+    python bench_admission.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+import loadgen
+
+RATE = 30
+DURATION = 15
+PROFILE = {
+    "default": {"latency": {"dist": "lognormal", "median": 0.5, "sigma": 0.3}},
+    "models": {"gemini-3-pro-preview": {"listed": False}},
+}
+
+
+def run(label, env):
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(PROFILE, f)
+    os.makedirs(loadgen.RESULTS_DIR, exist_ok=True)
+    url, _, processes = loadgen.spawn(f.name, seed=0, extra_env={
+        "MODEL_CONCURRENCY": "8", **env
+    })
+    try:
+        payloads = loadgen.Payloads(loadgen.make_clips())
+        summary = asyncio.run(loadgen.drive(url, payloads, DURATION, rate=RATE, server_pid=processes[0].pid))
+    finally:
+        loadgen.stop(processes)
+        os.unlink(f.name)
+    latency = summary["latency_ms"]
+    print(f"{label:<14} ok {summary['ok']:>4}/{summary['requests']:<4} statuses {summary['statuses']}  "
+          f"p50 {latency['p50'] / 1000:6.2f}s  p95 {latency['p95'] / 1000:6.2f}s  p99 {latency['p99'] / 1000:6.2f}s")
+
+
+if __name__ == "__main__":
+    run("no shedding", {"ADMISSION_MAX_IN_FLIGHT": "100000"})
+    run("shedding at 16", {"ADMISSION_MAX_IN_FLIGHT": "16"})
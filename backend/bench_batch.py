@@ -0,0 +1,72 @@
+"""100 clips: one /batch call vs 100 sequential single calls.
+
+Runs the app under uvicorn on a local port with a stub model (100 ms per
+call) and drives it over real HTTP the way check_status.py does. 10 of
+the 100 clips are repeats. No network access beyond localhost.
+
+    python bench_batch.py
+"""
+import base64
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import requests
+import uvicorn
+
+import main
+from admission import AdmissionController
+from cache import VerdictCache
+
+PORT = 8765
+URL = f"http://127.0.0.1:{PORT}/api/voice-detection"
+HEADERS = {"x-api-key": "sk_test_123456789"}
+STUB_DELAY = 0.1
+
+
+class StubModel:
+    def __init__(self, model_name, **kwargs):
+        pass
+
+    def generate_content(self, **kwargs):
+        time.sleep(STUB_DELAY)
+        return SimpleNamespace(text=json.dumps({
+            "status": "success", "language": "English", "classification": "HUMAN",
+            "confidenceScore": 0.8, "explanation": "stub"
+        }))
+
+
+def clips(n=100, repeats=10):
+    unique = [base64.b64encode(f"clip-{i}".encode() * 500).decode() for i in range(n - repeats)]
+    return [{"language": "English", "audioFormat": "mp3", "audioBase64": b64} for b64 in unique + unique[:repeats]]
+
+
+if __name__ == "__main__":
+    main.genai.GenerativeModel = StubModel
+    server = uvicorn.Server(uvicorn.Config(main.app, port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    payloads = clips()
+    # No near-duplicate index either: it would answer the look-alike clips.
+    main.fingerprint_index = None
+    main.admission = AdmissionController.unlimited(main.admission.keys)
+
+    main.verdict_cache = VerdictCache()
+    start = time.perf_counter()
+    for payload in payloads:
+        requests.post(URL, headers=HEADERS, json=payload, timeout=60)
+    sequential = time.perf_counter() - start
+
+    main.verdict_cache = VerdictCache()
+    start = time.perf_counter()
+    resp = requests.post(f"{URL}/batch", headers=HEADERS, json={"clips": payloads}, timeout=120)
+    batched = time.perf_counter() - start
+    ok = sum(r["status"] == "success" for r in resp.json()["results"])
+
+    print(f"📡 100 sequential calls: {sequential:6.2f}s  ({len(payloads) / sequential:5.1f} clips/s)")
+    print(f"📦 1 batch call:         {batched:6.2f}s  ({len(payloads) / batched:5.1f} clips/s, {ok} ok, concurrency {main.BATCH_CONCURRENCY})")
+    print(f"🚀 Speed-up: {sequential / batched:.1f}x")
+    server.should_exit = True
@@ -0,0 +1,82 @@
+"""Client-side throughput: the naive integration script vs voxguard_client.
+
+Spawns stub_gemini.py (fixed 100 ms model latency) and server.py, writes
+48 distinct 3 s WAVs per run to a temp directory, and classifies the
+directory three ways:
+  naive     - requests.post per clip, new connection each time, whole-file
+              base64 in memory (the check_status.py / test_real.py pattern)
+  sdk x1    - VoxGuardClient.analyze_many with concurrency 1 (keep-alive only)
+  sdk x8    - VoxGuardClient.analyze_many with concurrency 8
+Each run gets fresh clips, so the server's verdict cache never answers.
+
+    python bench_client.py    (needs ../client on the path or pip install -e ../client)
+"""
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+from loadgen import RESULTS_DIR, make_clips, spawn, stop
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "client"))
+from voxguard_client import VoxGuardClient  # noqa: E402
+
+CLIPS = 48
+API_KEY = "sk_test_123456789"
+PROFILE = {"default": {"latency": {"dist": "fixed", "seconds": 0.1}}}
+
+
+def write_clips(directory: str, run: int) -> str:
+    path = os.path.join(directory, f"run{run}")
+    os.makedirs(path)
+    for i, clip in enumerate(make_clips(CLIPS)):
+        clip = bytearray(clip)
+        clip[-2:] = (run * CLIPS + i).to_bytes(2, "little")
+        with open(os.path.join(path, f"clip{i:03d}.wav"), "wb") as f:
+            f.write(clip)
+    return path
+
+
+def naive(url: str, directory: str) -> int:
+    ok = 0
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "rb") as f:
+            audio_base64 = base64.b64encode(f.read()).decode("utf-8")
+        payload = {"language": "English", "audioFormat": "wav", "audioBase64": audio_base64}
+        response = requests.post(f"{url}/api/voice-detection", json=payload,
+                                 headers={"x-api-key": API_KEY, "Content-Type": "application/json"}, timeout=60)
+        ok += response.status_code == 200
+    return ok
+
+
+def sdk(url: str, directory: str, concurrency: int) -> int:
+    with VoxGuardClient(url, API_KEY, max_connections=concurrency) as client:
+        return sum(result.error is None for result in client.analyze_many(directory, "English"))
+
+
+def timed(label: str, run) -> float:
+    started = time.perf_counter()
+    ok = run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<8} {ok}/{CLIPS} ok  {elapsed:6.2f} s  {ok / elapsed:6.1f} clips/s")
+    return ok / elapsed
+
+
+if __name__ == "__main__":
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    profile_path = os.path.join(RESULTS_DIR, "bench-client-profile.json")
+    with open(profile_path, "w") as f:
+        json.dump(PROFILE, f)
+    url, _, processes = spawn(profile_path, 0, {})
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = timed("naive", lambda: naive(url, write_clips(directory, 0)))
+            timed("sdk x1", lambda: sdk(url, write_clips(directory, 1), 1))
+            pooled = timed("sdk x8", lambda: sdk(url, write_clips(directory, 2), 8))
+    finally:
+        stop(processes, timeout=30)
+    print(f"📈 Client throughput: {baseline:.1f} -> {pooled:.1f} clips/s ({pooled / baseline:.1f}x)")
@@ -0,0 +1,109 @@
+"""Near-duplicate lookup: robustness and how lookup cost grows with the index.
+
+Part 1 indexes 20 speech-like clips (loadgen.make_clips, 4 s) and looks up
+altered copies of each: half volume, 8-bit requantized, 8 kHz re-encode,
+trimmed (0.3 s head, 0.5 s tail), white noise at 30 and 20 dB SNR. 20
+clips that were never indexed count false matches.
+
+Part 2 fills an index with random 3 s fingerprints up to 1M clips and
+times lookups of an indexed clip's quieter copy at each size, against a
+linear scan that compares the query with every stored clip at offset 0
+only (a lower bound for any scan).
+
+    python bench_fingerprint.py
+"""
+import os
+import shutil
+import time
+
+import numpy as np
+
+from audio import decode_pcm, resample
+from fingerprint import Fingerprint, FingerprintIndex, WEAK_BITS, fingerprint
+from loadgen import RESULTS_DIR, make_clips
+
+SIZES = (10_000, 100_000, 1_000_000)
+SCOPE = "bench:english"
+
+
+def noisy(samples, snr_db, rng):
+    level = np.sqrt(np.mean(samples ** 2)) * 10 ** (-snr_db / 20)
+    return samples + rng.normal(0, level, len(samples)).astype(np.float32)
+
+
+VARIANTS = {
+    "half volume": lambda s, r, rng: s * 0.5,
+    "8-bit": lambda s, r, rng: np.round(s * 127) / 127,
+    "8 kHz re-encode": lambda s, r, rng: resample(resample(s, r, 8000), 8000, r),
+    "trimmed": lambda s, r, rng: s[int(0.3 * r):-int(0.5 * r)],
+    "noise 30 dB": lambda s, r, rng: noisy(s, 30, rng),
+    "noise 20 dB": lambda s, r, rng: noisy(s, 20, rng),
+}
+
+
+def robustness(directory: str):
+    rng = np.random.default_rng(1)
+    clips = [decode_pcm(clip) for clip in make_clips(40, seconds=4.0)]
+    index = FingerprintIndex(directory)
+    for i, (samples, rate) in enumerate(clips[:20]):
+        index.add(fingerprint(samples, rate), SCOPE, {"clip": i})
+
+    for name, alter in VARIANTS.items():
+        found = 0
+        for i, (samples, rate) in enumerate(clips[:20]):
+            match = index.lookup(fingerprint(alter(samples, rate, rng), rate), SCOPE)
+            found += match is not None and match.verdict == {"clip": i}
+        print(f"{name:<16} {found}/20 matched")
+    false = sum(index.lookup(fingerprint(samples, rate), SCOPE) is not None for samples, rate in clips[20:])
+    print(f"{'never indexed':<16} {false}/20 false matches")
+    return false
+
+
+def scaling(directory: str):
+    rng = np.random.default_rng(2)
+    samples, rate = decode_pcm(make_clips(1)[0])
+    query = fingerprint(samples * 0.5, rate)
+    length = len(query.frames)
+    weak = np.zeros((length, WEAK_BITS), "<u4")
+    # Bulk fill: merge every 2M postings instead of the default 256k.
+    index = FingerprintIndex(directory, merge_every=1 << 21)
+    index.add(fingerprint(samples, rate), SCOPE, {"clip": "target"})
+
+    results = []
+    started = time.perf_counter()
+    for size in SIZES:
+        while index.stats()["clips"] < size:
+            index.add(Fingerprint(rng.integers(0, 2 ** 32, length, dtype=np.uint32), weak), SCOPE, {})
+        index.flush()
+        fill = time.perf_counter() - started
+
+        timings = []
+        for _ in range(50):
+            t = time.perf_counter()
+            match = index.lookup(query, SCOPE)
+            timings.append(time.perf_counter() - t)
+        assert match is not None and match.verdict == {"clip": "target"}
+
+        frames = np.memmap(os.path.join(directory, "frames.u32"), "<u4", "r")[:size * length].reshape(size, length)
+        t = time.perf_counter()
+        for rows in range(0, size, 65536):
+            differing = np.unpackbits((frames[rows:rows + 65536] ^ query.frames).view(np.uint8), axis=1).sum(axis=1)
+        scan = time.perf_counter() - t
+
+        disk = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2 ** 20
+        lookup = 1000 * float(np.median(timings))
+        print(f"{size:>9,} clips  lookup p50 {lookup:6.2f} ms  linear scan {1000 * scan:9.1f} ms  "
+              f"on disk {disk:7.1f} MB  (filled in {fill:.0f} s)")
+        results.append((size, lookup, 1000 * scan))
+    return results
+
+
+if __name__ == "__main__":
+    base = os.path.join(RESULTS_DIR, "bench-fingerprint")
+    shutil.rmtree(base, ignore_errors=True)
+    robustness(os.path.join(base, "robustness"))
+    results = scaling(os.path.join(base, "scaling"))
+    (small, small_lookup, small_scan), (large, large_lookup, large_scan) = results[0], results[-1]
+    print(f"📈 {small:,} -> {large:,} clips ({large // small}x): lookup {small_lookup:.2f} -> {large_lookup:.2f} ms "
+          f"({large_lookup / small_lookup:.1f}x), linear scan {small_scan:.0f} -> {large_scan:.0f} ms "
+          f"({large_scan / small_scan:.0f}x)")
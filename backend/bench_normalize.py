@@ -0,0 +1,95 @@
+"""Upload size, audio tokens and latency with and without normalization.
+
+Representative WAV clips are sent through /api/voice-detection against a
+stub model whose latency grows with payload size (50 ms + 2 MB/s uplink),
+roughly what a large inline upload costs. Audio tokens use Gemini's
+published rate of 32 tokens per second of audio. No network access needed.
+
+    python bench_normalize.py
+"""
+import base64
+import io
+import json
+import time
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from audio import decode_pcm
+from cache import VerdictCache
+from prescreen import PreScreener
+
+TOKENS_PER_AUDIO_SECOND = 32
+UPLINK_BYTES_PER_SECOND = 2 * 1024 * 1024
+sent = []
+
+
+class StubModel:
+    def __init__(self, model_name, **kwargs):
+        pass
+
+    def generate_content(self, contents, **kwargs):
+        data = contents[0]["parts"][1]["inline_data"]["data"]
+        sent.append(data)
+        time.sleep(0.05 + len(data) / UPLINK_BYTES_PER_SECOND)
+        return SimpleNamespace(text=json.dumps({
+            "status": "success", "language": "English", "classification": "HUMAN",
+            "confidenceScore": 0.8, "explanation": "stub"
+        }))
+
+
+def wav(seconds_voice, seconds_silence, rate, channels, seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds_voice)) / rate
+    f0 = 150 + 30 * np.sin(2 * np.pi * 0.8 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = 0.3 * sum(np.sin(k * phase) / k for k in range(1, 6)) + rng.normal(0, 0.002, len(t))
+    gap = rng.normal(0, 0.0005, int(rate * seconds_silence))
+    mono = np.concatenate([gap, voice, gap])
+    pcm = (np.repeat(mono[:, None], channels, axis=1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+CLIPS = {
+    "stereo 44.1k, 10s + silence": wav(10, 3, 44100, 2, 1),
+    "mono 48k, 60s": wav(60, 0, 48000, 1, 2),
+    "mono 8k phone, 20s": wav(20, 0.5, 8000, 1, 3),
+    "stereo 44.1k, 5 min": wav(300, 0, 44100, 2, 4),
+}
+
+
+def seconds_of(audio):
+    samples, rate = decode_pcm(audio)
+    return len(samples) / rate
+
+
+def run(clip, normalize):
+    main.NORMALIZE_AUDIO = normalize
+    main.verdict_cache = VerdictCache()
+    sent.clear()
+    start = time.perf_counter()
+    TestClient(main.app).post("/api/voice-detection", headers={"x-api-key": "sk_test_123456789"},
+                              json={"language": "English", "audioFormat": "wav", "audioBase64": base64.b64encode(clip).decode()})
+    return time.perf_counter() - start, sent[0]
+
+
+if __name__ == "__main__":
+    main.genai.GenerativeModel = StubModel
+    main.prescreener = PreScreener(enabled=False)
+    main.fingerprint_index = None
+    print(f"{'clip':<30}{'bytes in':>11}{'bytes out':>11}{'tokens':>15}{'latency':>19}")
+    for label, clip in CLIPS.items():
+        raw_time, raw_sent = run(clip, False)
+        norm_time, norm_sent = run(clip, True)
+        tokens = f"{seconds_of(raw_sent) * TOKENS_PER_AUDIO_SECOND:.0f}->{seconds_of(norm_sent) * TOKENS_PER_AUDIO_SECOND:.0f}"
+        latency = f"{raw_time * 1000:.0f}->{norm_time * 1000:.0f} ms"
+        print(f"{label:<30}{len(raw_sent):>11}{len(norm_sent):>11}{tokens:>15}{latency:>19}")
@@ -0,0 +1,86 @@
+"""Remote-call rate and latency with and without the local pre-screen.
+
+Replays a mixed corpus of WAV clips (silence, dial/test tones, speech-like
+audio) through /api/voice-detection against a stub model with a fixed
+delay. No network access is needed.
+
+    python bench_prescreen.py
+"""
+import base64
+import json
+import statistics
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from admission import AdmissionController
+from audio import encode_wav
+from cache import VerdictCache
+from prescreen import PreScreener
+
+RATE = 16000
+STUB_DELAY = 0.3
+remote_calls = 0
+
+
+class StubModel:
+    def __init__(self, model_name, **kwargs):
+        pass
+
+    def generate_content(self, **kwargs):
+        global remote_calls
+        remote_calls += 1
+        time.sleep(STUB_DELAY)
+        return SimpleNamespace(text=json.dumps({
+            "status": "success", "language": "English", "classification": "HUMAN",
+            "confidenceScore": 0.8, "explanation": "stub"
+        }))
+
+
+def corpus(n=30):
+    rng = np.random.default_rng(0)
+    t = np.arange(RATE * 2) / RATE
+    clips = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            samples = rng.normal(0, 1e-5, len(t))
+        elif kind == 1:
+            samples = 0.4 * np.sin(2 * np.pi * rng.uniform(300, 1000) * t)
+        else:
+            f0 = rng.uniform(100, 220) + 25 * np.sin(2 * np.pi * rng.uniform(0.3, 1.2) * t)
+            phase = 2 * np.pi * np.cumsum(f0) / RATE
+            envelope = np.clip(np.sin(2 * np.pi * rng.uniform(2.5, 5) * t), 0, None) ** 0.5
+            samples = 0.3 * envelope * sum(np.sin(k * phase) / k for k in range(1, 8)) + rng.normal(0, 0.003, len(t))
+        clips.append(base64.b64encode(encode_wav(samples.astype(np.float32), RATE)).decode())
+    return clips
+
+
+def run(label, enabled, clips):
+    global remote_calls
+    remote_calls = 0
+    main.verdict_cache = VerdictCache()
+    # No near-duplicate index either: it would answer the look-alike clips.
+    main.fingerprint_index = None
+    main.admission = AdmissionController.unlimited(main.admission.keys)
+    main.prescreener = PreScreener(enabled=enabled)
+    client = TestClient(main.app)
+    latencies = []
+    for clip in clips:
+        start = time.perf_counter()
+        client.post("/api/voice-detection", headers={"x-api-key": "sk_test_123456789"},
+                    json={"language": "English", "audioFormat": "wav", "audioBase64": clip})
+        latencies.append(time.perf_counter() - start)
+    print(f"{label:<16} remote calls {remote_calls:>3}/{len(clips)}  "
+          f"median {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"local fraction {main.prescreener.stats()['localFraction']:.2f}")
+
+
+if __name__ == "__main__":
+    main.genai.GenerativeModel = StubModel
+    clips = corpus()
+    run("pre-screen off", False, clips)
+    run("pre-screen on", True, clips)
@@ -0,0 +1,100 @@
+"""Input tokens and time to first token per request: the forensic
+instruction re-sent in every request vs a system instruction vs a
+context cache.
+
+Runs /api/voice-detection in-process against stub_gemini.py on a local
+port, with 3 s speech-like WAVs (96 audio tokens each). The stub charges
+100 ms of prefill per 1000 input tokens that do not come from a context
+cache, on top of a fixed 200 ms; calls are not streamed, so time to first
+token is the model attempt latency. Token counts come from the
+voxguard_model_input_tokens metric (the provider's usage_metadata).
+
+The stub's minimum cacheable size is lifted for this run. The real API
+refuses a context cache for today's ~440-token instruction (below
+Gemini's minimum), which is why CONTEXT_CACHE_TTL_SECONDS defaults to 0;
+the cached rows show what an instruction past the minimum would gain.
+
+    python bench_prompt_cache.py
+"""
+import threading
+import time
+
+import uvicorn
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import main
+import registry
+from admission import AdmissionController
+from cache import VerdictCache
+from loadgen import Payloads, free_port, make_clips
+from registry import ModelRegistry
+from stub_gemini import create_app
+
+MODEL = "gemini-2.0-flash"
+REQUESTS = 40
+PROFILE = {"default": {"latency": {"dist": "fixed", "seconds": 0.2}, "prefill_seconds_per_1k_tokens": 0.1,
+                       "min_cache_tokens": 0}}
+
+
+class PerRequestPrompt(ModelRegistry):
+    """The old behaviour: no system instruction, the whole prompt rendered
+    into every request."""
+
+    def client(self, model_name):
+        self.configure()
+        return self._clients.setdefault(model_name, registry.genai.GenerativeModel(model_name))
+
+    def prompt(self, language):
+        return registry.SYSTEM_INSTRUCTION.replace("<suggested language>", language) + registry.LANGUAGE_HINT.format(language=language)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def run(label, model_registry, payloads):
+    model_registry.warm_up()
+    main.model_registry = model_registry
+    main.verdict_cache = VerdictCache()
+    # No near-duplicate index either: it would answer the look-alike clips.
+    main.fingerprint_index = None
+    main.admission = AdmissionController.unlimited(main.admission.keys)
+    client = TestClient(main.app)
+    before = {kind: sample("voxguard_model_input_tokens_sum", model=MODEL, kind=kind) for kind in ("uncached", "cached")}
+    seconds = sample("voxguard_model_attempt_seconds_sum", model=MODEL, outcome="success")
+    for _ in range(REQUESTS):
+        response = client.post("/api/voice-detection", headers={"x-api-key": "sk_test_123456789"}, json=payloads.next())
+        assert response.status_code == 200, response.text
+    uncached = (sample("voxguard_model_input_tokens_sum", model=MODEL, kind="uncached") - before["uncached"]) / REQUESTS
+    cached = (sample("voxguard_model_input_tokens_sum", model=MODEL, kind="cached") - before["cached"]) / REQUESTS
+    ttft = (sample("voxguard_model_attempt_seconds_sum", model=MODEL, outcome="success") - seconds) / REQUESTS
+    model_registry.delete_context_caches()
+    print(f"{label:<20} uncached input {uncached:6.0f} tokens  cached {cached:5.0f}  "
+          f"prompt text {len(model_registry.prompt('English')):5d} chars  time to first token {ttft * 1000:6.1f} ms")
+    return uncached, ttft
+
+
+if __name__ == "__main__":
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(PROFILE, seed=0), port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.02)
+    endpoint = f"http://127.0.0.1:{port}"
+
+    main.MODEL_CANDIDATES = [MODEL]
+    main.prescreener.enabled = False
+    main.log.disabled = True
+    registry.log.disabled = True
+    payloads = Payloads(make_clips(8))
+
+    def build(cls, ttl):
+        return cls([MODEL], api_key="stub", refresh_seconds=0, api_endpoint=endpoint, context_cache_ttl_seconds=ttl)
+
+    base_tokens, base_ttft = run("per-request prompt", build(PerRequestPrompt, 0), payloads)
+    run("system instruction", build(ModelRegistry, 0), payloads)
+    cache_tokens, cache_ttft = run("context cache", build(ModelRegistry, 600), payloads)
+    print(f"📉 Uncached input tokens/request: {base_tokens:.0f} -> {cache_tokens:.0f}; "
+          f"time to first token {base_ttft * 1000:.0f} ms -> {cache_ttft * 1000:.0f} ms")
+    server.should_exit = True
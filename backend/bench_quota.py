@@ -0,0 +1,55 @@
+"""Upstream 429s during a burst, with and without the quota scheduler.
+
+Spawns stub_gemini.py enforcing per-model quotas (gemini-2.0-flash by
+tokens per minute, the other two flash models by requests per minute) and
+the backend via loadgen.py, then offers a 20 s burst well above the
+combined quota. Without MODEL_QUOTAS the backend fires blindly and learns
+from 429s (and circuit breakers); with it, requests go to models with
+budget left and the excess is refused locally. No network access.
+
+    python bench_quota.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+import httpx
+
+import loadgen
+
+RATE = 12
+DURATION = 20
+QUOTAS = {
+    "gemini-2.0-flash": {"tpm": 20000},
+    "gemini-2.0-flash-001": {"rpm": 60},
+    "gemini-1.5-flash": {"rpm": 60},
+}
+PROFILE = {
+    "default": {"latency": {"dist": "lognormal", "median": 0.3, "sigma": 0.3}},
+    "models": {"gemini-3-pro-preview": {"listed": False}, **QUOTAS},
+}
+
+
+def run(label, env):
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(PROFILE, f)
+    os.makedirs(loadgen.RESULTS_DIR, exist_ok=True)
+    url, stub_url, processes = loadgen.spawn(f.name, seed=0, extra_env=env)
+    try:
+        payloads = loadgen.Payloads(loadgen.make_clips())
+        summary = asyncio.run(loadgen.drive(url, payloads, DURATION, rate=RATE))
+        outcomes = httpx.get(f"{stub_url}/stub/stats").json()["outcomes"]
+    finally:
+        loadgen.stop(processes)
+        os.unlink(f.name)
+    upstream = sum(outcomes.values())
+    throttled = sum(count for key, count in outcomes.items() if key.endswith(":429"))
+    latency = summary["latency_ms"] or {}
+    print(f"{label:<16} client {summary['statuses']}  upstream calls {upstream:>4}  "
+          f"upstream 429s {throttled:>4} ({throttled / max(upstream, 1):.1%})  p95 ok {latency.get('p95')} ms")
+
+
+if __name__ == "__main__":
+    run("blind", {})
+    run("quota scheduler", {"MODEL_QUOTAS": json.dumps(QUOTAS)})
@@ -0,0 +1,84 @@
+"""Offline evaluation of adaptive tiering against stub_gemini.py.
+
+The stub's fast model (gemini-2.0-flash) answers in ~0.5 s with a
+confidenceScore uniform in [0.75, 1.0]. The heavy model
+(gemini-3-pro-preview) takes ~2.5 s and is always confident. The backend
+runs via loadgen.py at a steady 4 clips/s for 20 s per run: once with
+tiering off, then with TIERED_ROUTING=1 at several confidence thresholds.
+Each run reports the escalation rate (heavy calls per answered clip),
+client latency, and upstream tokens per model. Cost uses an illustrative
+12.5:1 heavy:fast price per token (list prices vary; only the ratio
+matters here).
+
+The stub's confidence is random, so this measures routing, latency and
+cost, not whether the fast tier's verdicts are right. That needs labelled
+clips against the real models.
+
+    python bench_tiering.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+import httpx
+
+import loadgen
+
+RATE = 4
+DURATION = 20
+THRESHOLDS = (0.8, 0.85, 0.9)
+FAST, HEAVY = "gemini-2.0-flash", "gemini-3-pro-preview"
+PRICE_PER_MILLION_TOKENS = {HEAVY: 1.25, FAST: 0.10}
+PROFILE = {
+    "default": {"latency": {"dist": "lognormal", "median": 0.8, "sigma": 0.3}},
+    "models": {
+        HEAVY: {"latency": {"dist": "lognormal", "median": 2.5, "sigma": 0.3},
+                "confidence": {"dist": "uniform", "low": 0.85, "high": 0.99}},
+        FAST: {"latency": {"dist": "lognormal", "median": 0.5, "sigma": 0.3},
+               "confidence": {"dist": "uniform", "low": 0.75, "high": 1.0}},
+    },
+}
+
+
+def run(label: str, env: dict, profile_path: str) -> dict:
+    url, stub_url, processes = loadgen.spawn(profile_path, seed=0, extra_env={
+        "CONTEXT_CACHE_TTL_SECONDS": "0",
+        # Enough model workers that no run queues: latency is the models' own.
+        "MODEL_CONCURRENCY": "32", "ADMISSION_MAX_IN_FLIGHT": "256", **env
+    })
+    try:
+        payloads = loadgen.Payloads(loadgen.make_clips())
+        summary = asyncio.run(loadgen.drive(url, payloads, DURATION, rate=RATE))
+        stats = httpx.get(f"{stub_url}/stub/stats").json()
+    finally:
+        loadgen.stop(processes, timeout=30)
+
+    ok = summary["ok"]
+    calls, tokens = stats["calls"], stats["tokens"]
+    escalation = calls.get(HEAVY, 0) / ok if ok else 0.0
+    cost = sum(PRICE_PER_MILLION_TOKENS.get(model, 0.0) * count / 1e6 for model, count in tokens.items())
+    cost_per_1k = 1000 * cost / ok if ok else 0.0
+    latency = summary["latency_ms"] or {}
+    print(f"{label:<16} ok {ok:>3}/{summary['requests']:<3}  escalated {escalation:6.1%}  "
+          f"mean {latency.get('mean')} ms  p50 {latency.get('p50')} ms  p95 {latency.get('p95')} ms  "
+          f"calls {calls}  cost ${cost_per_1k:.3f}/1k clips")
+    return {"mean": latency.get("mean", 0.0), "cost": cost_per_1k, "escalation": escalation}
+
+
+if __name__ == "__main__":
+    os.makedirs(loadgen.RESULTS_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", dir=loadgen.RESULTS_DIR, delete=False) as f:
+        json.dump(PROFILE, f)
+    try:
+        baseline = run("tiering off", {"TIERED_ROUTING": "0"}, f.name)
+        tiered = {
+            threshold: run(f"tiered >= {threshold}", {"TIERED_ROUTING": "1", "TIER_CONFIDENCE_THRESHOLD": str(threshold)}, f.name)
+            for threshold in THRESHOLDS
+        }
+    finally:
+        os.unlink(f.name)
+    for threshold, result in tiered.items():
+        print(f"📉 threshold {threshold}: escalation {result['escalation']:.1%}, "
+              f"mean latency {baseline['mean']:.0f} -> {result['mean']:.0f} ms, "
+              f"cost ${baseline['cost']:.3f} -> ${result['cost']:.3f} per 1k clips")
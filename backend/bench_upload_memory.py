@@ -0,0 +1,81 @@
+"""Peak server-side memory for one 10 MB clip: base64 JSON vs raw upload.
+
+Drives the ASGI app directly with a pre-built request body fed in 64 KB
+chunks, so tracemalloc only sees what the server allocates. The model is
+stubbed; no network access is needed.
+
+    python bench_upload_memory.py
+"""
+import asyncio
+import base64
+import json
+import os
+import tracemalloc
+from types import SimpleNamespace
+
+import main
+
+CLIP_BYTES = 10 * 1024 * 1024
+CHUNK = 64 * 1024
+
+
+class StubModel:
+    def __init__(self, model_name, **kwargs):
+        pass
+
+    def generate_content(self, **kwargs):
+        return SimpleNamespace(text=json.dumps({
+            "status": "success", "language": "English", "classification": "HUMAN",
+            "confidenceScore": 0.9, "explanation": "stub"
+        }))
+
+
+async def call(path, query, content_type, body):
+    chunks = [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)]
+    sent = []
+
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 1), "server": ("test", 80),
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            (b"x-api-key", b"sk_test_123456789"),
+        ],
+    }
+    await main.app(scope, receive, send)
+    return sent[0]["status"]
+
+
+def measure(label, path, query, content_type, body):
+    main.verdict_cache.clear()
+    main.fingerprint_index = None
+    tracemalloc.start()
+    status = asyncio.run(call(path, query, content_type, body))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} status={status}  peak={peak / 1024 / 1024:6.1f} MB")
+    return peak
+
+
+if __name__ == "__main__":
+    main.genai.GenerativeModel = StubModel
+    main.MAX_UPLOAD_BYTES = 2 * CLIP_BYTES
+    clip = os.urandom(CLIP_BYTES)
+    json_body = json.dumps({
+        "language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(clip).decode()
+    }).encode()
+
+    print(f"📦 Clip: {CLIP_BYTES / 1024 / 1024:.0f} MB raw, {len(json_body) / 1024 / 1024:.1f} MB as base64 JSON")
+    json_peak = measure("POST /api/voice-detection", "/api/voice-detection", "", "application/json", json_body)
+    raw_peak = measure("POST .../upload (raw)", "/api/voice-detection/upload", "language=English", "audio/mpeg", clip)
+    print(f"📉 Peak memory reduction: {(1 - raw_peak / json_peak) * 100:.0f}%")
@@ -0,0 +1,78 @@
+"""Bytes sent upstream per request: inline audio on every attempt vs one upload.
+
+Replays 20 distinct 4 MB clips (then the same 20 again under another
+language) through /api/voice-detection against stub models where the
+first candidate always fails and the second fails half the time, so most
+requests take two or three attempts. Reads X-Upstream-Bytes off each
+response. No network access is needed.
+
+    python bench_upstream_bytes.py
+"""
+import base64
+import json
+import random
+import statistics
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import main
+from admission import AdmissionController
+from breaker import BreakerBoard
+from cache import VerdictCache
+from filerefs import AudioUploader, FileRefCache
+
+CLIP_BYTES = 4 * 1024 * 1024
+rng = random.Random(0)
+
+
+class FlakyModel:
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, **kwargs):
+        if self.model_name == main.MODEL_CANDIDATES[0] or (self.model_name == main.MODEL_CANDIDATES[1] and rng.random() < 0.5):
+            raise Exception("503 overloaded")
+        return SimpleNamespace(text=json.dumps({
+            "status": "success", "language": "English", "classification": "HUMAN",
+            "confidenceScore": 0.8, "explanation": "stub"
+        }))
+
+
+def upload_file(file, mime_type):
+    file.read()
+    return SimpleNamespace(name="files/x", uri=f"https://files.example/{rng.random()}", state=SimpleNamespace(name="ACTIVE"),
+                           expiration_time=datetime.now(timezone.utc) + timedelta(hours=48))
+
+
+def run(label, min_bytes, clips):
+    main.verdict_cache = VerdictCache()
+    # No near-duplicate index either: it would answer the look-alike clips.
+    main.fingerprint_index = None
+    main.admission = AdmissionController.unlimited(main.admission.keys)
+    # Breakers would learn to skip the dead primary; keep every request walking the chain.
+    main.model_breakers = BreakerBoard(failure_threshold=10 ** 9)
+    main.audio_uploader = AudioUploader(FileRefCache(), main.upload_audio, min_bytes)
+    client = TestClient(main.app)
+    sent = []
+    for language in ("English", "Hindi"):
+        for clip in clips:
+            response = client.post("/api/voice-detection", headers={"x-api-key": "sk_test_123456789"},
+                                   json={"language": language, "audioFormat": "mp3", "audioBase64": clip})
+            sent.append(int(response.headers.get("x-upstream-bytes", 0)))
+    print(f"{label:<10} mean {statistics.mean(sent) / 2 ** 20:6.2f} MB/request  "
+          f"total {sum(sent) / 2 ** 20:7.1f} MB  uploads {main.audio_uploader.uploads}")
+    return sum(sent)
+
+
+if __name__ == "__main__":
+    main.genai.GenerativeModel = FlakyModel
+    main.genai.upload_file = upload_file
+    main.prescreener.enabled = False
+    main.log.disabled = True
+    clips = [base64.b64encode(bytes([i]) * CLIP_BYTES).decode() for i in range(20)]
+
+    inline = run("inline", 0, clips)
+    uploaded = run("uploaded", 1024 * 1024, clips)
+    print(f"📉 Upstream bytes: {inline / 2 ** 20:.1f} MB -> {uploaded / 2 ** 20:.1f} MB ({uploaded / inline:.0%})")
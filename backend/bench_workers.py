@@ -0,0 +1,46 @@
+"""Throughput vs server.py worker count, against stub_gemini.py.
+
+Spawns the stub (fixed 20 ms model latency, so the backend's own CPU work
+is the bottleneck: base64 decode, normalization, pre-screen, JSON) and
+server.py with WEB_CONCURRENCY = 1, 2, 4, and drives each with 32 closed-
+loop clients for 15 s via loadgen. Scaling can only be near-linear up to
+the number of cores, which is printed alongside.
+
+    python bench_workers.py
+"""
+import asyncio
+import json
+import os
+
+from loadgen import RESULTS_DIR, Payloads, drive, make_clips, spawn, stop
+
+WORKERS = (1, 2, 4)
+PROFILE = {"default": {"latency": {"dist": "fixed", "seconds": 0.02}}}
+
+
+def run(workers: int, profile_path: str, clips) -> float:
+    url, _, processes = spawn(profile_path, 0, {"WEB_CONCURRENCY": str(workers), "ADMISSION_MAX_IN_FLIGHT": "256"})
+    try:
+        summary = asyncio.run(drive(url, Payloads(clips), 15.0, 32, server_pid=processes[0].pid))
+    finally:
+        stop(processes, timeout=60)
+    latency = summary["latency_ms"] or {}
+    print(f"workers {workers}  {summary['throughput_rps']:7.1f} req/s  p50 {latency.get('p50')} ms  "
+          f"p99 {latency.get('p99')} ms  ok {summary['ok']}/{summary['requests']}  "
+          f"RSS {summary['memory_mb']['server_peak']} MB")
+    return summary["throughput_rps"]
+
+
+if __name__ == "__main__":
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    profile_path = os.path.join(RESULTS_DIR, "bench-workers-profile.json")
+    with open(profile_path, "w") as f:
+        json.dump(PROFILE, f)
+    clips = make_clips()
+
+    print(f"{os.cpu_count()} CPU core(s)")
+    throughput = {workers: run(workers, profile_path, clips) for workers in WORKERS}
+    base = throughput[WORKERS[0]]
+    print("📈 Scaling: " + "  ".join(
+        f"{workers} workers {rps / base:.2f}x ({rps / base / workers:.0%} of linear)" for workers, rps in throughput.items()
+    ))
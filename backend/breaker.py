@@ -0,0 +1,143 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Dict, List, Tuple
+
+
+class BreakerOpen(Exception):
+    """Raised instead of calling a model whose breaker refused the call."""
+
+
+# A model that is gone (404) or that this key may not use (403) fails every
+# call until someone notices, so it counts as an outage just like a 5xx.
+UNAVAILABLE_MODEL_CODES = (403, 404)
+
+
+def is_outage(error: Exception) -> bool:
+    """True for failures that say the model itself is unusable: timeouts,
+    transport errors, upstream 5xx and a missing or forbidden model. Other
+    4xx (bad clip, bad request, quota) say nothing about the model and must
+    not open its breaker."""
+    if isinstance(error, (asyncio.TimeoutError, OSError)):
+        return True
+    code = getattr(error, "code", None)
+    if not isinstance(code, int):
+        match = re.match(r"(\d{3})\b", str(error))
+        code = int(match.group(1)) if match else None
+    return code is not None and (500 <= code < 600 or code in UNAVAILABLE_MODEL_CODES)
+
+
+class CircuitBreaker:
+    """Failure/latency memory for one upstream model.
+
+    CLOSED: calls flow normally. After `failure_threshold` consecutive
+    failures the breaker OPENS and the model is skipped for `cooldown_seconds`.
+    Once the cooldown elapses it is HALF_OPEN: a single trial call is let
+    through, and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.avg_latency = None
+        self.successes = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.cooldown_seconds:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def is_available(self) -> bool:
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self.trial_in_flight)
+
+    def acquire(self, force: bool = False) -> bool:
+        """Claim permission for one call; only one trial runs while HALF_OPEN.
+
+        `force` lets the call through regardless, for when every model is open.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED or force:
+                return True
+            if state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+            # Exponentially weighted so a recovering model is judged on recent calls.
+            self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a trial slot without an outcome (e.g. a cancelled hedge)."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutiveFailures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "avgLatencySeconds": round(self.avg_latency, 3) if self.avg_latency is not None else None,
+        }
+
+
+class BreakerBoard:
+    """One CircuitBreaker per model name, created on first use."""
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model_name)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.cooldown_seconds)
+                self._breakers[model_name] = breaker
+            return breaker
+
+    def route(self, candidates: List[str]) -> Tuple[List[str], bool]:
+        """Candidates in priority order, minus those whose breaker is open.
+
+        If every breaker is open the full list is returned with forced=True:
+        trying a model that is probably down beats failing without a call.
+        """
+        available = [name for name in candidates if self.get(name).is_available()]
+        if available:
+            return available, False
+        return list(candidates), True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: breaker.snapshot() for name, breaker in self._breakers.items()}
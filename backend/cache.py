@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def cache_key(audio_bytes: bytes, language: str, version: str) -> str:
+    """Content address for a verdict: audio hash + language + prompt/model version."""
+    digest = hashlib.sha256(audio_bytes).hexdigest()
+    return f"{version}:{language.lower()}:{digest}"
+
+
+class VerdictCache:
+    """Two-tier verdict cache.
+
+    Tier 1 is an in-process LRU bounded by entry count, tier 2 an optional
+    SQLite file that survives restarts and is shared by every process
+    pointed at it (the workers of server.py). Both tiers honour the same
+    TTL. Values are plain dicts (the serialized VoiceAnalysisResponse).
+
+    get/put block on SQLite; from the event loop use aget/aput, which
+    answer from memory inline and send only the SQLite work to a thread.
+    Expired rows are deleted by sweep(), every sweep_seconds once start()
+    has run.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, db_path: Optional[str] = None,
+                 sweep_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sweep_seconds = sweep_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.swept = 0
+        self._sweep_task = None
+
+        self.db_path = db_path
+        self._db = None
+        self._db_pid = None
+        # Separate from _lock so memory hits never wait behind disk I/O.
+        self._db_lock = threading.Lock()
+        if db_path:
+            with self._db_lock:
+                self._conn()
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        # A connection must not cross a fork; each process opens its own.
+        if self.db_path and self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db_pid = os.getpid()
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_expiry ON verdicts (expires_at)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        if value is None and self.db_path:
+            value = self._get_disk(key)
+        return self._counted(value)
+
+    async def aget(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        if value is None and self.db_path:
+            value = await asyncio.to_thread(self._get_disk, key)
+        return self._counted(value)
+
+    def _get_memory(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+            return None
+
+    def _get_disk(self, key: str) -> Optional[dict]:
+        with self._db_lock:
+            row = self._conn().execute("SELECT value, expires_at FROM verdicts WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._remember(key, value, row[1])
+            self.disk_hits += 1
+        return value
+
+    def _counted(self, value: Optional[dict]) -> Optional[dict]:
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self.db_path:
+            self._put_disk(key, value, expires_at)
+
+    async def aput(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self.db_path:
+            await asyncio.to_thread(self._put_disk, key, value, expires_at)
+
+    def _put_disk(self, key: str, value: dict, expires_at: float):
+        with self._db_lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO verdicts (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            db.commit()
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def sweep(self) -> int:
+        """Drop expired entries from both tiers; returns how many rows went."""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+        removed = 0
+        if self.db_path:
+            with self._db_lock:
+                db = self._conn()
+                removed = db.execute("DELETE FROM verdicts WHERE expires_at <= ?", (now,)).rowcount
+                db.commit()
+        with self._lock:
+            self.swept += removed
+        return removed
+
+    async def start(self):
+        if self.db_path and self.sweep_seconds > 0:
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            await asyncio.to_thread(self.sweep)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with self._db_lock:
+                db = self._conn()
+                db.execute("DELETE FROM verdicts")
+                db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "persistent": bool(self.db_path),
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "swept": self.swept,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
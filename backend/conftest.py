@@ -0,0 +1,124 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from google.api_core.exceptions import DeadlineExceeded
+
+import main
+import registry
+from admission import AdmissionController, KeyStore
+from breaker import BreakerBoard
+from cache import VerdictCache
+from fingerprint import FingerprintIndex
+from filerefs import AudioUploader, FileRefCache
+from jobs import JobStore, JobWorkers
+from prescreen import PreScreener
+from quota import QuotaScheduler
+from registry import ModelRegistry
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch, tmp_path):
+    """Give every test its own registry, breakers, cache, pre-screen
+    counters, fingerprint index, job queue, quota budgets, file handles and
+    admission limits, and keep the startup probe off the network.
+
+    The registry memoizes GenerativeModel instances, so without this a stub
+    patched in by one test would leak into the next.
+    """
+    monkeypatch.setattr(main, "model_registry", ModelRegistry(main.MODEL_CANDIDATES, refresh_seconds=0))
+    monkeypatch.setattr(main, "model_breakers", BreakerBoard())
+    monkeypatch.setattr(main, "model_quotas", QuotaScheduler())
+    monkeypatch.setattr(main, "audio_uploader", AudioUploader(
+        FileRefCache(), main.upload_audio, main.audio_uploader.min_bytes, delete=main.delete_upload))
+    monkeypatch.setattr(main, "verdict_cache", VerdictCache())
+    monkeypatch.setattr(main, "prescreener", PreScreener())
+    monkeypatch.setattr(main, "fingerprint_index", FingerprintIndex(str(tmp_path / "fingerprints")))
+    store = JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(main, "job_store", store)
+    monkeypatch.setattr(main, "job_workers", JobWorkers(store, main.run_job, workers=2, poll_seconds=0.05))
+    monkeypatch.setattr(registry.genai, "list_models", lambda: [])
+    # Generous limits; test_admission.py builds its own tight ones.
+    keys = KeyStore({"sk_test_123456789": {"name": "default"}}, rate_per_second=0, max_concurrent=0)
+    monkeypatch.setattr(main, "admission", AdmissionController(keys, max_in_flight=256))
+
+
+class StubModels:
+    """Stands in for every genai.GenerativeModel the backend builds.
+
+    Each call is recorded as (model name, contents). By default every model
+    answers HUMAN at 0.8; the attributes below change that per test.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.contents = []
+        self.verdict = {"status": "success", "language": "English", "classification": "HUMAN",
+                        "confidenceScore": 0.8}
+        self.delay = 0.0
+        self.delays = {}      # model -> seconds, overrides .delay
+        self.confidence = {}  # model -> confidenceScore
+        self.errors = {}      # model -> exception raised instead of answering
+        self.respond = None   # (model, contents) -> verdict dict, or raise
+        self.tokens = None    # usage_metadata.total_token_count, when set
+        self.timeouts = []    # the SDK request timeout of every call
+
+    @property
+    def audio(self):
+        """The audio part of every call, in call order."""
+        return [contents[0]["parts"][1] for contents in self.contents]
+
+    @property
+    def prompts(self):
+        return [contents[0]["parts"][0]["text"] for contents in self.contents]
+
+    def generate(self, model_name, contents, timeout=None):
+        self.calls.append(model_name)
+        self.contents.append(contents)
+        self.timeouts.append(timeout)
+        delay = self.delays.get(model_name, self.delay)
+        if timeout is not None and delay > timeout:
+            # What the SDK does when given request_options={"timeout": ...}.
+            time.sleep(timeout)
+            raise DeadlineExceeded(f"{model_name} took longer than {timeout:g}s")
+        time.sleep(delay)
+        if model_name in self.errors:
+            raise self.errors[model_name]
+        if self.respond is not None:
+            verdict = self.respond(model_name, contents)
+        else:
+            verdict = {**self.verdict, "explanation": self.verdict.get("explanation", f"stub verdict from {model_name}")}
+        if model_name in self.confidence:
+            verdict["confidenceScore"] = self.confidence[model_name]
+        response = SimpleNamespace(text=json.dumps(verdict))
+        if self.tokens is not None:
+            response.usage_metadata = SimpleNamespace(total_token_count=self.tokens)
+        return response
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """Patch the Gemini SDK with StubModels and return it for configuring."""
+    stub = StubModels()
+
+    class GenerativeModel:
+        def __init__(self, model_name, **kwargs):
+            self.model_name = model_name
+
+        def generate_content(self, contents, request_options=None, **kwargs):
+            return stub.generate(self.model_name, contents, (request_options or {}).get("timeout"))
+
+    monkeypatch.setattr(main.genai, "GenerativeModel", GenerativeModel)
+    return stub
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def headers():
+    return {"x-api-key": "sk_test_123456789"}
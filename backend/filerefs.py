@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+log = logging.getLogger("voxguard.filerefs")
+
+
+class FileRef(NamedTuple):
+    uri: str
+    name: str
+    mime_type: str
+    expires_at: float  # epoch seconds
+
+
+class FileRefCache:
+    """Uploaded-file handles by content hash, LRU-bounded.
+
+    Provider files expire (48 h for Gemini); a handle is treated as gone
+    margin_seconds before that so a request never starts with a file that
+    vanishes mid-call.
+    """
+
+    def __init__(self, max_entries: int = 512, margin_seconds: float = 600):
+        self.max_entries = max_entries
+        self.margin_seconds = margin_seconds
+        self._entries: "OrderedDict[str, FileRef]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _usable(self, ref: FileRef, now: float) -> bool:
+        return ref.expires_at - self.margin_seconds > now
+
+    def get(self, key: str) -> Optional[FileRef]:
+        now = time.time()
+        with self._lock:
+            ref = self._entries.get(key)
+            if ref is not None and not self._usable(ref, now):
+                del self._entries[key]
+                self.expired += 1
+                ref = None
+            if ref is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ref
+
+    def put(self, key: str, ref: FileRef) -> List[FileRef]:
+        """Store a handle; returns the handles dropped to make room, whose
+        files the caller should delete."""
+        now = time.time()
+        dropped = []
+        with self._lock:
+            self._entries[key] = ref
+            self._entries.move_to_end(key)
+            # Drop expired handles before evicting live ones. The new handle
+            # may already be too close to expiry to cache, but its request is
+            # about to use the file, so it is not handed back for deletion.
+            for stale in [k for k, v in self._entries.items() if not self._usable(v, now)]:
+                removed = self._entries.pop(stale)
+                if stale != key:
+                    dropped.append(removed)
+                self.expired += 1
+            while len(self._entries) > self.max_entries:
+                dropped.append(self._entries.popitem(last=False)[1])
+                self.evictions += 1
+        return dropped
+
+    def drain(self) -> List[FileRef]:
+        """Remove and return every handle."""
+        with self._lock:
+            refs = list(self._entries.values())
+            self._entries.clear()
+        return refs
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+class AudioUploader:
+    """Turns a clip into the audio part of a generate_content request.
+
+    Clips of at least min_bytes are uploaded once (per content hash, shared
+    by concurrent requests for the same clip) and referenced by URI from
+    every model attempt; smaller clips, or any clip when the upload fails,
+    go inline. `upload(audio, mime_type)` is blocking and returns a FileRef.
+
+    `delete(ref)`, also blocking, removes a file from the provider's storage:
+    in the background when the cache drops its handle, and for every handle
+    left at close(). Otherwise each file would sit there until it expires.
+    """
+
+    def __init__(self, cache: FileRefCache, upload: Callable[[bytes, str], FileRef], min_bytes: int = 1024 * 1024,
+                 delete: Optional[Callable[[FileRef], None]] = None):
+        self.cache = cache
+        self.upload = upload
+        self.min_bytes = min_bytes
+        self.delete = delete
+        self.uploads = 0
+        self.upload_failures = 0
+        self.bytes_uploaded = 0
+        self.deletes = 0
+        self.delete_failures = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._deleting = set()
+
+    async def ref_for(self, audio: bytes, mime_type: str) -> Optional[FileRef]:
+        """The uploaded handle for this clip, or None to send it inline."""
+        if not self.min_bytes or len(audio) < self.min_bytes:
+            return None
+        key = f"{hashlib.sha256(audio).hexdigest()}:{mime_type}"
+        ref = self.cache.get(key)
+        if ref is not None:
+            return ref
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            ref = await asyncio.to_thread(self.upload, audio, mime_type)
+            self.uploads += 1
+            self.bytes_uploaded += len(audio)
+            dropped = self.cache.put(key, ref)
+            if dropped and self.delete is not None:
+                task = asyncio.create_task(asyncio.to_thread(self._delete_all, dropped))
+                self._deleting.add(task)
+                task.add_done_callback(self._deleting.discard)
+        except Exception:
+            self.upload_failures += 1
+            ref = None
+            raise
+        finally:
+            future.set_result(ref)
+            del self._pending[key]
+        return ref
+
+    def _delete_all(self, refs: List[FileRef]):
+        for ref in refs:
+            try:
+                self.delete(ref)
+                self.deletes += 1
+            except Exception as e:
+                self.delete_failures += 1
+                log.warning("file_delete_failed", extra={"file": ref.name, "error": str(e)})
+
+    async def close(self):
+        """Finish background deletes, then delete every file still held."""
+        await asyncio.gather(*self._deleting, return_exceptions=True)
+        refs = self.cache.drain()
+        if refs and self.delete is not None:
+            await asyncio.to_thread(self._delete_all, refs)
+
+    def stats(self) -> dict:
+        return {
+            "minBytes": self.min_bytes,
+            "uploads": self.uploads,
+            "uploadFailures": self.upload_failures,
+            "bytesUploaded": self.bytes_uploaded,
+            "deletes": self.deletes,
+            "deleteFailures": self.delete_failures,
+            "handles": self.cache.stats(),
+        }
@@ -0,0 +1,381 @@
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from audio import resample, trim_silence
+from prescreen import SILENCE_PEAK, frame_signal
+
+log = logging.getLogger("voxguard.fingerprint")
+
+# Haitsma-Kalker style sub-fingerprints: one 32-bit word per frame, each bit
+# the sign of an energy difference between adjacent bands (33 log-spaced,
+# 300-2000 Hz) and consecutive frames. Signs of differences ignore gain,
+# coarse band energies survive re-encoding and resampling, and frames
+# overlap 15/16 so a trimmed copy still lines up to within a fraction of
+# a hop.
+SAMPLE_RATE = 8000
+FRAME_SECONDS = 0.37
+HOP_SECONDS = FRAME_SECONDS / 16
+BAND_EDGES_HZ = np.geomspace(300, 2000, 34)
+MAX_SECONDS = 30.0
+MIN_FRAMES = 32
+# A query also probes every combination of flips of its WEAK_BITS least
+# reliable bits per frame (smallest energy differences), which noise is
+# most likely to have flipped: 2**WEAK_BITS hash probes per frame.
+WEAK_BITS = 3
+
+# Only every INDEX_STRIDE-th stored frame goes into the hash index; a query
+# probes all of its frames, so any aligned exact hit finds the clip.
+INDEX_STRIDE = 4
+# Keys shared by more clips than this (steady tones, near-silence) say
+# nothing about which clip it is, and are skipped.
+MAX_POSTINGS_PER_KEY = 64
+# Alignments (clip, offset) with the most exact hits that get a full
+# bit-by-bit comparison.
+MAX_CANDIDATES = 8
+
+ENTRY = np.dtype("<i8")
+ENTRY_FIELDS = 4  # first frame, frame count, record offset, record length
+ENTRY_BYTES = ENTRY.itemsize * ENTRY_FIELDS
+
+
+class Fingerprint(NamedTuple):
+    frames: np.ndarray  # uint32 sub-fingerprint per 23 ms hop
+    weak: np.ndarray  # (frames, WEAK_BITS) uint32 single-bit masks, least reliable first
+
+
+def fingerprint(samples: np.ndarray, rate: int) -> Optional[Fingerprint]:
+    """Sub-fingerprints of a mono clip, or None if it is silent or shorter
+    than about a second."""
+    samples = trim_silence(samples[: int(MAX_SECONDS * rate)], rate)
+    if len(samples) == 0 or float(np.max(np.abs(samples))) < SILENCE_PEAK:
+        return None
+    samples = resample(samples, rate, SAMPLE_RATE)
+    size = int(FRAME_SECONDS * SAMPLE_RATE)
+    hop = int(HOP_SECONDS * SAMPLE_RATE)
+    if len(samples) < size + MIN_FRAMES * hop:
+        return None
+
+    frames = frame_signal(samples, size, hop) * np.hanning(size).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    bins = np.round(BAND_EDGES_HZ * size / SAMPLE_RATE).astype(int)
+    energy = np.add.reduceat(power[:, bins[0]:bins[-1]], bins[:-1] - bins[0], axis=1)
+    differences = np.diff(energy[:, :-1] - energy[:, 1:], axis=0)
+    frames = np.packbits(differences > 0, axis=1, bitorder="little").view("<u4").ravel()
+    weakest = np.argsort(np.abs(differences), axis=1)[:, :WEAK_BITS]
+    return Fingerprint(frames, (np.uint32(1) << weakest.astype(np.uint32)).astype("<u4"))
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Fraction of equal bits between two aligned runs of sub-fingerprints."""
+    differing = np.unpackbits(np.bitwise_xor(a, b).view(np.uint8)).sum()
+    return 1.0 - float(differing) / (32 * len(a))
+
+
+class Match(NamedTuple):
+    verdict: dict
+    similarity: float
+    coverage: float
+
+
+class FingerprintIndex:
+    """Verdicts of previously classified clips, found by perceptual
+    similarity instead of exact bytes.
+
+    Files under `directory`, all append-only except the sorted index:
+    - frames.u32: every clip's sub-fingerprints, back to back;
+    - entries.i64: per clip its first frame, frame count, and the offset
+      and length of its record;
+    - records.jsonl: per clip the scope (prompt version, models, language)
+      and the verdict;
+    - keys-<n>.npy / postings-<n>.npy: the indexed sub-fingerprints of the
+      first n clips, sorted, with the (clip, frame) of each.
+    Everything is memory-mapped, so a process only pages in what lookups
+    touch. Clips added since the last merge sit in an in-memory hash table
+    until it holds merge_every postings, then a background thread merges
+    them into a new sorted generation while adds and lookups go on against
+    the current one.
+
+    A lookup binary-searches each query frame in the sorted keys and probes
+    the hash table, O(frames * log n), then compares the few best-aligned
+    candidates bit by bit. A candidate matches when at least `threshold` of
+    the bits agree over an overlap covering `min_coverage` of the longer
+    clip. Processes sharing the directory (server.py workers) append under
+    an flock and pick up each other's clips from entries.i64.
+    """
+
+    def __init__(self, directory: str, threshold: float = 0.8, min_coverage: float = 0.75, merge_every: int = 1 << 18):
+        self.directory = directory
+        self.threshold = threshold
+        self.min_coverage = min_coverage
+        self.merge_every = merge_every
+        self._lock = threading.Lock()
+        self._pid = None
+        self._merger = None
+        self.lookups = 0
+        self.hits = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        # On first use, not in __init__, so importing the app creates no
+        # files; and again after a fork, since descriptors (and the flock on
+        # them) must not cross one.
+        if self._pid == os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        flags = os.O_RDWR | os.O_APPEND | os.O_CREAT
+        self._frames_fd = os.open(self._path("frames.u32"), flags, 0o644)
+        self._entries_fd = os.open(self._path("entries.i64"), flags, 0o644)
+        self._records_fd = os.open(self._path("records.jsonl"), flags, 0o644)
+        self._pid = os.getpid()
+        self._merger = None
+        self._clips = 0
+        self._frames = np.zeros(0, "<u4")
+        self._entries = np.zeros((0, ENTRY_FIELDS), ENTRY)
+        self._index_stamp = None
+        self._keys = np.zeros(0, "<u4")
+        self._postings = np.zeros((0, 2), "<u4")
+        self._indexed = 0
+        # key -> [clip << 16 | frame]; MAX_SECONDS keeps frames below 2**16.
+        self._pending = {}
+        self._pending_postings = 0
+        self._sync()
+
+    @contextmanager
+    def _exclusive(self):
+        fcntl.flock(self._entries_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._entries_fd, fcntl.LOCK_UN)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._path("index.json"))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _sync(self):
+        """Catch up with merges and appends made by any process."""
+        stamp = self._stamp()
+        for attempt in range(3):
+            if stamp == self._index_stamp:
+                break
+            try:
+                with open(self._path("index.json")) as f:
+                    indexed = json.load(f)["clips"]
+                keys = np.load(self._path(f"keys-{indexed}.npy"), mmap_mode="r")
+                postings = np.load(self._path(f"postings-{indexed}.npy"), mmap_mode="r")
+            except FileNotFoundError:
+                # Other processes merged twice while we read, retiring the
+                # generation we were pointed at; read the manifest again.
+                if attempt == 2:
+                    raise
+                stamp = self._stamp()
+                continue
+            self._keys, self._postings = keys, postings
+            self._index_stamp, self._indexed = stamp, indexed
+            self._pending = {}
+            self._pending_postings = 0
+            self._index_pending(indexed, self._clips)
+            break
+
+        clips = os.fstat(self._entries_fd).st_size // ENTRY_BYTES
+        if clips > self._clips:
+            self._index_pending(max(self._clips, self._indexed), clips)
+            self._clips = clips
+
+    def _index_pending(self, first: int, last: int):
+        """Put clips [first, last) into the hash table, read straight from
+        the files: they are contiguous in both."""
+        keys, packed = self._read_postings(first, last)
+        for key, posting in zip(keys.tolist(), packed.tolist()):
+            self._pending.setdefault(key, []).append(posting)
+        self._pending_postings += len(keys)
+
+    def _read_postings(self, first: int, last: int):
+        """The indexed sub-fingerprints of clips [first, last) and their
+        packed (clip << 16 | frame) postings, clip by clip."""
+        if last <= first:
+            return np.zeros(0, "<u4"), np.zeros(0, np.int64)
+        rows = np.frombuffer(os.pread(self._entries_fd, (last - first) * ENTRY_BYTES, first * ENTRY_BYTES), ENTRY)
+        rows = rows.reshape(-1, ENTRY_FIELDS).astype(np.int64)
+        base, end = int(rows[0, 0]), int(rows[-1, 0] + rows[-1, 1])
+        frames = np.frombuffer(os.pread(self._frames_fd, (end - base) * 4, base * 4), "<u4")
+        counts = -(-rows[:, 1] // INDEX_STRIDE)
+        frame = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) * INDEX_STRIDE
+        keys = frames[np.repeat(rows[:, 0] - base, counts) + frame]
+        return keys, np.repeat(np.arange(first, last), counts) << 16 | frame
+
+    def _mapped(self, clip: int):
+        """Make sure the memory maps reach `clip`; they are only extended
+        when a lookup needs it."""
+        if clip >= len(self._entries):
+            self._entries = np.memmap(self._path("entries.i64"), ENTRY, "r", shape=(self._clips, ENTRY_FIELDS))
+            end = int(self._entries[-1, 0] + self._entries[-1, 1])
+            self._frames = np.memmap(self._path("frames.u32"), "<u4", "r", shape=(end,))
+
+    def add(self, fp: Fingerprint, scope: str, verdict: dict):
+        """Remember a verdict for this fingerprint; call it off the event
+        loop. Starts a background merge once enough clips are pending."""
+        record = json.dumps({"scope": scope, "verdict": verdict}).encode() + b"\n"
+        with self._lock:
+            self._open()
+            with self._exclusive():
+                first_frame = os.fstat(self._frames_fd).st_size // 4
+                record_offset = os.fstat(self._records_fd).st_size
+                os.write(self._frames_fd, fp.frames.astype("<u4").tobytes())
+                os.write(self._records_fd, record)
+                # The entry row goes last: once it is there, the clip is complete.
+                os.write(self._entries_fd, np.array([first_frame, len(fp.frames), record_offset, len(record)], ENTRY).tobytes())
+                self._sync()
+            if self._pending_postings >= self.merge_every and self._merger is None:
+                self._merger = threading.Thread(target=self._merge_in_background, daemon=True)
+                self._merger.start()
+
+    def _merge_in_background(self):
+        try:
+            self.merge()
+        except Exception:
+            log.exception("fingerprint index merge failed")
+        finally:
+            with self._lock:
+                self._merger = None
+
+    def flush(self):
+        """Wait for a background merge, then merge anything still due."""
+        merger = self._merger
+        if merger is not None:
+            merger.join()
+        self.merge()
+
+    def merge(self):
+        """Fold the clips pending since the last generation into a new sorted
+        one covering every clip so far. Both sides are sorted, so this is a
+        linear merge; it holds no lock adds or lookups wait on, only one
+        that keeps two merges (of any process) from running at once."""
+        with self._lock:
+            self._open()
+        fd = os.open(self._path("merge.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            with self._lock:
+                self._sync()
+                if self._pending_postings < self.merge_every:
+                    return
+                clips, indexed = self._clips, self._indexed
+                base_keys, base_postings = self._keys, self._postings
+            self._write_generation(clips, indexed, base_keys, base_postings)
+            with self._lock:
+                self._sync()
+        finally:
+            os.close(fd)
+
+    def _write_generation(self, clips: int, indexed: int, base_keys: np.ndarray, base_postings: np.ndarray):
+        keys, packed = self._read_postings(indexed, clips)
+        postings = np.stack([packed >> 16, packed & 0xFFFF], axis=1).astype("<u4")
+        order = np.argsort(keys, kind="stable")
+        at = np.searchsorted(base_keys, keys[order], "right")
+        merged_keys = np.insert(base_keys, at, keys[order])
+        merged_postings = np.insert(base_postings, at, postings[order], axis=0)
+
+        np.save(self._path(f"keys-{clips}.npy"), merged_keys)
+        np.save(self._path(f"postings-{clips}.npy"), merged_postings)
+        with open(self._path("index.json.tmp"), "w") as f:
+            json.dump({"clips": clips}, f)
+        os.replace(self._path("index.json.tmp"), self._path("index.json"))
+        # Keep the generation just replaced: another process may have read
+        # the old index.json and not opened its files yet. Anything older
+        # has been unreachable for a whole merge cycle. Readers already
+        # holding a retired generation keep their mappings.
+        for name in os.listdir(self.directory):
+            generation = re.fullmatch(r"(?:keys|postings)-(\d+)\.npy", name)
+            if generation and int(generation.group(1)) < indexed:
+                os.remove(self._path(name))
+
+    def lookup(self, fp: Fingerprint, scope: str) -> Optional[Match]:
+        """The stored verdict of the most similar clip in this scope, if one
+        clears the similarity threshold."""
+        with self._lock:
+            self._open()
+            self._sync()
+            self.lookups += 1
+            for clip, offset in self._candidates(fp):
+                self._mapped(clip)
+                start, count, record_offset, record_length = (int(v) for v in self._entries[clip])
+                # A copy trimmed by a fraction of a hop can line up best
+                # one frame either side of where the exact hits put it.
+                score, coverage = max(self._compare(fp.frames, start, count, o) for o in (offset - 1, offset, offset + 1))
+                if coverage < self.min_coverage or score < self.threshold:
+                    continue
+                record = json.loads(os.pread(self._records_fd, record_length, record_offset))
+                if record["scope"] != scope:
+                    continue
+                self.hits += 1
+                return Match(record["verdict"], score, coverage)
+            return None
+
+    def _compare(self, frames: np.ndarray, start: int, count: int, offset: int):
+        """(similarity, coverage) with query frame i aligned to stored frame i + offset."""
+        first, last = max(0, -offset), min(len(frames), count - offset)
+        if last <= first:
+            return 0.0, 0.0
+        stored = self._frames[start + first + offset:start + last + offset]
+        return similarity(frames[first:last], stored), (last - first) / max(len(frames), count)
+
+    def _candidates(self, fp: Fingerprint):
+        """(clip, offset) alignments with the most exact sub-fingerprint hits."""
+        flips = np.zeros((len(fp.frames), 1), "<u4")
+        for bit in range(fp.weak.shape[1]):
+            flips = np.concatenate([flips, flips ^ fp.weak[:, bit:bit + 1]], axis=1)
+        probes = (fp.frames[:, None] ^ flips).ravel()
+        probe_frames = np.repeat(np.arange(len(fp.frames)), flips.shape[1])
+
+        lo = np.searchsorted(self._keys, probes, "left")
+        counts = np.searchsorted(self._keys, probes, "right") - lo
+        usable = (counts > 0) & (counts <= MAX_POSTINGS_PER_KEY)
+        counts, lo = counts[usable], lo[usable]
+        # Every posting of every usable key, without a Python loop.
+        rows = np.arange(counts.sum()) + np.repeat(lo - np.cumsum(counts) + counts, counts)
+        found = np.asarray(self._postings[rows], dtype=np.int64).reshape(-1, 2)
+        clips, offsets = [found[:, 0]], [found[:, 1] - np.repeat(probe_frames[usable], counts)]
+
+        for key, i in zip(probes.tolist(), probe_frames.tolist()):
+            postings = self._pending.get(key)
+            if postings and len(postings) <= MAX_POSTINGS_PER_KEY:
+                packed = np.array(postings, np.int64)
+                clips.append(packed >> 16)
+                offsets.append((packed & 0xFFFF) - i)
+
+        alignments = np.concatenate(clips) << 32 | (np.concatenate(offsets) + (1 << 31))
+        alignments, votes = np.unique(alignments, return_counts=True)
+        best = alignments[np.argsort(-votes, kind="stable")[:MAX_CANDIDATES]]
+        return [(int(a >> 32), int(a & 0xFFFFFFFF) - (1 << 31)) for a in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._open()
+            self._sync()
+            return {
+                "clips": self._clips,
+                "indexedClips": self._indexed,
+                "pendingPostings": self._pending_postings,
+                "threshold": self.threshold,
+                "minCoverage": self.min_coverage,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hitRate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            }
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+log = logging.getLogger("voxguard.jobs")
+
+
+class RetryLater(Exception):
+    """Raised by a handler for a transient failure (e.g. upstream quota):
+    the job goes back in the queue and is not claimed again for `delay`
+    seconds."""
+
+    def __init__(self, message: str, delay: float):
+        super().__init__(message)
+        self.delay = delay
+
+
+class JobStore:
+    """SQLite-backed job queue; no broker, survives restarts.
+
+    The connection is opened on first use (and again after a fork) so
+    importing the app does not create the database file. Claims run inside
+    BEGIN IMMEDIATE, so several processes can drain the same file without
+    taking the same job twice.
+
+    A job is tried at most max_attempts times, counting retries and runs cut
+    short by a crash. Finished jobs are deleted by purge() once they are
+    older than retention_seconds.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, retention_seconds: float = 86400):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._db = None
+        self._db_pid = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db_pid != os.getpid():
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    mime_type TEXT NOT NULL,
+                    audio BLOB,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    not_before REAL
+                )
+            """)
+            if "not_before" not in {column["name"] for column in db.execute("PRAGMA table_info(jobs)")}:
+                db.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at)")
+            self._db = db
+            self._db_pid = os.getpid()
+        return self._db
+
+    def enqueue(self, language: str, audio: bytes, mime_type: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn().execute(
+                "INSERT INTO jobs (id, status, language, mime_type, audio, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, language, mime_type, audio, time.time())
+            )
+        return job_id
+
+    def claim(self) -> Optional[sqlite3.Row]:
+        """Mark the oldest queued job that is due running and return it, or None."""
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND COALESCE(not_before, 0) <= ? ORDER BY created_at LIMIT 1",
+                    (QUEUED, time.time())
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, time.time(), row["id"])
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return row
+
+    def complete(self, job_id: str, result: dict):
+        self._finish(job_id, DONE, json.dumps(result), None)
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, FAILED, None, error)
+
+    def retry(self, job_id: str, error: str, delay: float) -> bool:
+        """Requeue a running job to be claimed again after `delay` seconds,
+        or fail it if it has used up its attempts. True if requeued."""
+        with self._lock:
+            cursor = self._conn().execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, error = ?, not_before = ? WHERE id = ? AND attempts < ?",
+                (QUEUED, error, time.time() + delay, job_id, self.max_attempts)
+            )
+        if cursor.rowcount:
+            return True
+        self.fail(job_id, f"{error} (gave up after {self.max_attempts} attempts)")
+        return False
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]):
+        # The audio is no longer needed once the job has an outcome.
+        with self._lock:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, audio = NULL WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT id, status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "jobId": row["id"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "message": row["error"],
+            "createdAt": row["created_at"],
+            "startedAt": row["started_at"],
+            "finishedAt": row["finished_at"],
+            "waitSeconds": round(row["started_at"] - row["created_at"], 3) if row["started_at"] else None,
+        }
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left RUNNING by a crashed or restarted process back in the
+        queue. Jobs that have used up their attempts fail instead: a clip that
+        kills its worker every time must not crash-loop the pool forever."""
+        with self._lock:
+            db = self._conn()
+            given_up = db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, audio = NULL WHERE status = ? AND attempts >= ?",
+                (FAILED, f"Interrupted {self.max_attempts} times; gave up", time.time(), RUNNING, self.max_attempts)
+            ).rowcount
+            cursor = db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING)
+            )
+        if given_up:
+            log.warning("jobs_given_up", extra={"count": given_up, "max_attempts": self.max_attempts})
+        return cursor.rowcount
+
+    def purge(self) -> int:
+        """Delete finished jobs older than retention_seconds; returns how many."""
+        with self._lock:
+            cursor = self._conn().execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - self.retention_seconds)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = db.execute(
+                "SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+            avg_wait = db.execute(
+                "SELECT AVG(started_at - created_at) FROM jobs WHERE started_at IS NOT NULL AND finished_at > ?",
+                (now - 300,)
+            ).fetchone()[0]
+        return {
+            "queueDepth": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+            "oldestQueuedSeconds": round(now - oldest, 3) if oldest else None,
+            "avgWaitSeconds5m": round(avg_wait, 3) if avg_wait is not None else None,
+        }
+
+
+class JobWorkers:
+    """A fixed pool of asyncio workers draining a JobStore.
+
+    `handler(language, audio, mime_type)` returns the result dict or raises;
+    the exception text becomes the job's error message, and RetryLater puts
+    the job back in the queue after a delay. Jobs left running
+    by a previous process are requeued at start unless requeue_on_start is
+    off (server.py requeues once, before forking, so a restarted worker
+    does not steal jobs its siblings are still running). Finished jobs are
+    purged from the store every sweep_seconds.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[str, bytes, str], Awaitable[dict]], workers: int = 4,
+                 poll_seconds: float = 0.5, sweep_seconds: float = 3600):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.sweep_seconds = sweep_seconds
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.requeue_on_start = True
+        self._wake = None
+        self._tasks = []
+
+    async def start(self):
+        if self.requeue_on_start:
+            requeued = await asyncio.to_thread(self.store.requeue_interrupted)
+            if requeued:
+                log.info("jobs_requeued", extra={"count": requeued})
+        self.started_at = time.monotonic()
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.sweep_seconds > 0:
+            self._tasks.append(asyncio.create_task(self._sweep_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers now instead of at their next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _work(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.busy += 1
+            started = time.monotonic()
+            try:
+                result = await self.handler(job["language"], job["audio"], job["mime_type"])
+                await asyncio.to_thread(self.store.complete, job["id"], result)
+            except asyncio.CancelledError:
+                # Shutting down mid-job: leave it RUNNING so the next start re-queues it.
+                raise
+            except RetryLater as e:
+                if await asyncio.to_thread(self.store.retry, job["id"], str(e), e.delay):
+                    log.info("job_retry", extra={"job": job["id"], "attempt": job["attempts"] + 1,
+                                                 "delay_s": round(e.delay, 1), "error": str(e)})
+            except Exception as e:
+                await asyncio.to_thread(self.store.fail, job["id"], str(e))
+            finally:
+                self.busy -= 1
+                self.busy_seconds += time.monotonic() - started
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            purged = await asyncio.to_thread(self.store.purge)
+            if purged:
+                log.info("jobs_purged", extra={"count": purged})
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "busyWorkers": self.busy,
+            "utilization": round(self.busy_seconds / (uptime * self.workers), 4) if uptime and self.workers else 0.0,
+        }
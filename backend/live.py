@@ -0,0 +1,80 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class RollingWindow:
+    """Fixed-size ring buffer over a live PCM stream.
+
+    Holds at most window_seconds of mono float32 audio regardless of how
+    long the call runs, and reports when another cadence_seconds of audio
+    has arrived so a new window is due for analysis.
+    """
+
+    def __init__(self, rate: int, window_seconds: float, cadence_seconds: float):
+        self.rate = rate
+        self.capacity = max(int(window_seconds * rate), 1)
+        self.cadence = max(int(cadence_seconds * rate), 1)
+        self._ring = np.zeros(self.capacity, dtype=np.float32)
+        self._write = 0
+        self.total_samples = 0
+        self._next_due = self.cadence
+
+    def feed_pcm16(self, frame: bytes) -> bool:
+        """Append little-endian 16-bit PCM; True if a window is now due."""
+        usable = len(frame) - len(frame) % 2
+        self.feed(np.frombuffer(frame[:usable], dtype="<i2").astype(np.float32) / 32768.0)
+        if self.total_samples >= self._next_due:
+            # Skip cadence points we blew past in one large frame.
+            while self._next_due <= self.total_samples:
+                self._next_due += self.cadence
+            return True
+        return False
+
+    def feed(self, samples: np.ndarray):
+        # Count the whole frame, even the part too old to keep.
+        self.total_samples += len(samples)
+        if len(samples) >= self.capacity:
+            samples = samples[-self.capacity:]
+        first = min(len(samples), self.capacity - self._write)
+        self._ring[self._write:self._write + first] = samples[:first]
+        rest = len(samples) - first
+        if rest:
+            self._ring[:rest] = samples[first:]
+        self._write = (self._write + len(samples)) % self.capacity
+
+    def snapshot(self) -> Tuple[float, float, np.ndarray]:
+        """(start_s, end_s, samples) for the most recent window, oldest first."""
+        filled = min(self.total_samples, self.capacity)
+        if filled < self.capacity:
+            samples = self._ring[:filled].copy()
+        else:
+            samples = np.concatenate([self._ring[self._write:], self._ring[:self._write]])
+        end = self.total_samples / self.rate
+        return end - filled / self.rate, end, samples
+
+
+class Coalescer:
+    """At most one window in flight and one waiting; newer windows replace
+    the waiting one, so a slow model never builds a backlog."""
+
+    def __init__(self):
+        self.in_flight = False
+        self.pending: Optional[tuple] = None
+        self.dropped = 0
+
+    def offer(self, item) -> bool:
+        """True if the caller should start analyzing item now."""
+        if not self.in_flight:
+            self.in_flight = True
+            return True
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = item
+        return False
+
+    def done(self):
+        """Finish the in-flight item; returns the pending one to start, if any."""
+        item, self.pending = self.pending, None
+        self.in_flight = item is not None
+        return item
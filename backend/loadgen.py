@@ -0,0 +1,327 @@
+"""Load generator for /api/voice-detection, with reproducible JSON results.
+
+Drives the endpoint at a fixed concurrency (closed loop: N clients, each
+sending its next request when the last one returns) or at a fixed request
+rate (open loop: requests start on schedule whether or not earlier ones
+have finished; latency is measured from the scheduled start, so a stalled
+server cannot hide its queueing delay). Reports throughput, p50/p95/p99
+latency, status counts and peak RSS, and writes everything to JSON.
+
+With --spawn it starts stub_gemini.py and the backend itself (server.py,
+one worker unless --env WEB_CONCURRENCY=N), so the whole run needs no
+network access:
+
+    python loadgen.py --spawn --concurrency 16 --duration 20
+    python loadgen.py --spawn --rate 40 --duration 20 --profile stub_profile.json
+    python loadgen.py --url http://127.0.0.1:8000 --concurrency 8 --server-pid 1234
+    python loadgen.py --compare bench_results/a.json bench_results/b.json
+
+Each request carries a distinct 3 s speech-like WAV so the verdict cache
+never short-circuits the run.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+import numpy as np
+
+from audio import encode_wav
+
+HEADERS = {"x-api-key": os.getenv("CALLGUARD_AI_API_KEY", "sk_test_123456789")}
+RESULTS_DIR = "bench_results"
+
+
+def make_clips(count: int = 32, seconds: float = 3.0, rate: int = 16000) -> List[bytes]:
+    """Speech-like WAVs (gliding harmonics, syllable envelope, noise floor)
+    that the local pre-screen forwards to the model."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    clips = []
+    for _ in range(count):
+        f0 = rng.uniform(100, 220) + 25 * np.sin(2 * np.pi * rng.uniform(0.3, 1.2) * t)
+        phase = 2 * np.pi * np.cumsum(f0) / rate
+        envelope = np.clip(np.sin(2 * np.pi * rng.uniform(2.5, 5) * t), 0, None) ** 0.5
+        samples = 0.3 * envelope * sum(np.sin(k * phase) / k for k in range(1, 8)) + rng.normal(0, 0.003, len(t))
+        clips.append(encode_wav(samples.astype(np.float32), rate))
+    return clips
+
+
+class Payloads:
+    """Cycles through the clips, overwriting the last sample with a counter
+    so every request body (and verdict cache key) is unique."""
+
+    def __init__(self, clips: List[bytes]):
+        self.clips = clips
+        self.sent = 0
+
+    def next(self) -> dict:
+        clip = bytearray(self.clips[self.sent % len(self.clips)])
+        clip[-2:] = (self.sent % 65536).to_bytes(2, "little")
+        self.sent += 1
+        return {"language": "English", "audioFormat": "wav", "audioBase64": base64.b64encode(bytes(clip)).decode()}
+
+
+def child_pids(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def rss_mb(pid: int) -> Optional[dict]:
+    """Current and peak resident set size of a process plus its direct
+    children (server.py workers), from /proc."""
+    total = None
+    for each in [pid] + child_pids(pid):
+        try:
+            with open(f"/proc/{each}/status") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        total = total or {"rss": 0.0, "peak": 0.0}
+        total["rss"] += int(fields["VmRSS"].split()[0]) / 1024
+        total["peak"] += int(fields["VmHWM"].split()[0]) / 1024
+    return total
+
+
+def summarize(latencies: List[float], statuses: Counter, elapsed: float) -> dict:
+    ok = statuses.get(200, 0)
+    result = {
+        "requests": sum(statuses.values()),
+        "ok": ok,
+        "statuses": {str(code): count for code, count in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": None,
+    }
+    if latencies:
+        values = np.array(latencies) * 1000
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        result["latency_ms"] = {
+            "p50": round(float(p50), 1), "p95": round(float(p95), 1), "p99": round(float(p99), 1),
+            "mean": round(float(values.mean()), 1), "max": round(float(values.max()), 1),
+        }
+    return result
+
+
+async def drive(url: str, payloads: Payloads, duration: float, concurrency: Optional[int] = None,
+                rate: Optional[float] = None, timeout: float = 60.0, server_pid: Optional[int] = None) -> dict:
+    """Run one load scenario and return its summary. Only successful
+    responses contribute latencies; every response counts by status."""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    server_memory = {"peak": 0.0}
+    limits = httpx.Limits(max_connections=concurrency or 1000, max_keepalive_connections=concurrency or 1000)
+
+    async with httpx.AsyncClient(base_url=url, headers=HEADERS, timeout=timeout, limits=limits) as client:
+        async def one(scheduled: float):
+            try:
+                response = await client.post("/api/voice-detection", json=payloads.next())
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - scheduled)
+
+        async def sample_memory():
+            while True:
+                memory = rss_mb(server_pid) if server_pid else None
+                if memory:
+                    server_memory["peak"] = max(server_memory["peak"], memory["peak"])
+                    server_memory["rss"] = memory["rss"]
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.create_task(sample_memory())
+        started = time.perf_counter()
+        deadline = started + duration
+        if rate:
+            tasks = []
+            interval = 1.0 / rate
+            scheduled = started
+            while scheduled < deadline:
+                await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+                tasks.append(asyncio.create_task(one(scheduled)))
+                scheduled += interval
+            await asyncio.gather(*tasks)
+        else:
+            async def worker():
+                while time.perf_counter() < deadline:
+                    await one(time.perf_counter())
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+
+    summary = summarize(latencies, statuses, elapsed)
+    summary["memory_mb"] = {
+        "server_peak": round(server_memory["peak"], 1) if server_pid else None,
+        "server_end": round(server_memory.get("rss", 0.0), 1) if server_pid else None,
+        "client_peak": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    return summary
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:g}s")
+
+
+def spawn(profile: Optional[str], seed: int, extra_env: dict):
+    """Start stub_gemini.py and the backend on free ports; returns
+    (backend url, stub url, processes). Shut them down with stop(), which
+    also removes the backend's temporary state (jobs DB, shared state)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    state = tempfile.TemporaryDirectory(prefix="loadgen-state-")
+    stub_port, app_port = free_port(), free_port()
+    stub_cmd = [sys.executable, "stub_gemini.py", "--port", str(stub_port), "--seed", str(seed)]
+    if profile:
+        stub_cmd += ["--profile", profile]
+    stub = subprocess.Popen(stub_cmd, cwd=here)
+    wait_for(f"http://127.0.0.1:{stub_port}/v1beta/models")
+
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "stub",
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{stub_port}",
+        "VERDICT_CACHE_DB": "",
+        # Payloads differ only in their last sample: near-duplicates of each other.
+        "FINGERPRINT_INDEX_DIR": "",
+        # Measure the backend, not the per-key limits in front of it.
+        "KEY_RATE_PER_SECOND": "0",
+        "KEY_MAX_CONCURRENT": "0",
+        "JOBS_DB": os.path.join(state.name, "jobs.db"),
+        "LOG_LEVEL": "WARNING",
+        "PORT": str(app_port),
+        "HOST": "127.0.0.1",
+        "WEB_CONCURRENCY": "1",
+        "STATE_DIR": state.name,
+        **extra_env,
+    }
+    app = subprocess.Popen([sys.executable, "server.py"], cwd=here, env=env)
+    app.state_dir = state
+    wait_for(f"http://127.0.0.1:{app_port}/health")
+    return f"http://127.0.0.1:{app_port}", f"http://127.0.0.1:{stub_port}", [app, stub]
+
+
+def stop(processes: list, timeout: float = 10):
+    """Terminate processes from spawn() and remove their temporary state."""
+    for process in processes:
+        process.terminate()
+        process.wait(timeout=timeout)
+        state = getattr(process, "state_dir", None)
+        if state is not None:
+            state.cleanup()
+
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        return {"commit": None, "dirty": None}
+    return {"commit": commit or None, "dirty": dirty}
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'':<16}{old.get('commit') or old_path:>14}{new.get('commit') or new_path:>14}{'change':>10}")
+    rows = [("throughput_rps", old["throughput_rps"], new["throughput_rps"])]
+    for key in ("p50", "p95", "p99"):
+        rows.append((f"{key} ms", (old["latency_ms"] or {}).get(key), (new["latency_ms"] or {}).get(key)))
+    rows.append(("server peak MB", old["memory_mb"]["server_peak"], new["memory_mb"]["server_peak"]))
+    for label, a, b in rows:
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "n/a"
+        print(f"{label:<16}{a if a is not None else '-':>14}{b if b is not None else '-':>14}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, help="closed loop with N clients (default 8)")
+    mode.add_argument("--rate", type=float, help="open loop at this many requests per second")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--server-pid", type=int, help="sample this process's RSS (automatic with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="start stub_gemini.py and the backend locally")
+    parser.add_argument("--profile", help="stub_gemini.py latency/error profile (with --spawn)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra backend environment (with --spawn), repeatable")
+    parser.add_argument("--name", default="voice-detection", help="scenario name used in the output file")
+    parser.add_argument("--out", help=f"result file (default {RESULTS_DIR}/<name>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.rate and not args.concurrency:
+        args.concurrency = 8
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    processes = []
+    url, server_pid = args.url, args.server_pid
+    if args.spawn:
+        extra_env = dict(item.split("=", 1) for item in args.env)
+        url, _, processes = spawn(args.profile, args.seed, extra_env)
+        server_pid = processes[0].pid
+
+    try:
+        payloads = Payloads(make_clips())
+        summary = asyncio.run(drive(url, payloads, args.duration, args.concurrency, args.rate, server_pid=server_pid))
+    finally:
+        stop(processes)
+
+    result = {
+        "name": args.name,
+        **git_revision(),
+        "timestamp": round(time.time(), 3),
+        "scenario": {
+            "mode": "open" if args.rate else "closed",
+            "concurrency": args.concurrency, "rate": args.rate, "duration_s": args.duration,
+            "spawned": args.spawn, "profile": args.profile, "seed": args.seed, "env": args.env,
+        },
+        **summary,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{args.name}-{result['commit'] or 'nogit'}.json")
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+
+    latency = result["latency_ms"] or {}
+    print(f"📈 {result['ok']}/{result['requests']} ok  {result['throughput_rps']} req/s  "
+          f"p50 {latency.get('p50')} ms  p95 {latency.get('p95')} ms  p99 {latency.get('p99')} ms  "
+          f"server peak {result['memory_mb']['server_peak']} MB")
+    print(f"💾 Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,63 @@
-from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 import uvicorn
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
 import json
+import math
 import base64
 import requests
-from typing import Optional
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from cache import VerdictCache, cache_key
+from breaker import BreakerBoard, BreakerOpen, is_outage
+from registry import SYSTEM_INSTRUCTION, ModelRegistry
+from audio import decode_pcm, encode_wav, mime_type_for, normalize_audio, split_windows
+from prescreen import PreScreener
+from fingerprint import FingerprintIndex, fingerprint
+from jobs import JobStore, JobWorkers, RetryLater
+from live import Coalescer, RollingWindow
+from admission import AdmissionController, AdmissionMiddleware, KeyStore, Rejected
+from quota import QuotaExhausted, QuotaScheduler, estimate_tokens, is_quota_error
+from filerefs import AudioUploader, FileRef, FileRefCache
+from observability import (
+    FALLBACK_DEPTH, INPUT_TOKENS, MODEL_ERRORS, MODEL_SECONDS, PAYLOAD_BYTES, TIER_VERDICTS, VERDICTS,
+    ObservabilityMiddleware, child, configure_logging, count_upstream, mark_validated, timed
+)
+from uploads import UploadTooLarge, limit_stream, spool_stream, read_all
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Voice Detection API")
+configure_logging(os.getenv("LOG_LEVEL", "INFO"))
+log = logging.getLogger("voxguard")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build clients and prompts once and keep the live-model list fresh.
+    await model_registry.start()
+    await job_workers.start()
+    await verdict_cache.start()
+    yield
+    await audio_uploader.close()
+    await verdict_cache.stop()
+    await job_workers.stop()
+    await model_registry.stop()
+
+app = FastAPI(title="Voice Detection API", lifespan=lifespan)
 
+# Innermost, so rejections still get CORS headers and show up in metrics.
+app.add_middleware(AdmissionMiddleware, controller=lambda: admission, prefixes=("/api/", "/jobs/", "/ws/"))
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -22,12 +65,210 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ObservabilityMiddleware)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Point the SDK somewhere other than Google, e.g. http://127.0.0.1:8090 for stub_gemini.py.
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+# --- Model Worker Pool ---
+# The Gemini SDK is blocking, so model calls run on a bounded thread pool
+# instead of the event loop. MODEL_CONCURRENCY caps simultaneous upstream
+# calls per process; extra calls queue for a free worker. MODEL_TIMEOUT_SECONDS
+# bounds both that wait and the call itself.
+MODEL_CONCURRENCY = int(os.getenv("MODEL_CONCURRENCY", 8))
+MODEL_TIMEOUT_SECONDS = float(os.getenv("MODEL_TIMEOUT_SECONDS", 45))
+
+model_executor = ThreadPoolExecutor(max_workers=MODEL_CONCURRENCY, thread_name_prefix="gemini")
+
+# Candidate models from user's availability list
+# We prioritize the "3 Pro Preview" as requested, then 2.0 Flash
+MODEL_CANDIDATES = [
+    "gemini-3-pro-preview",
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-001",
+    "gemini-1.5-flash"
+]
+
+# --- Adaptive Tiering ---
+# TIERED_ROUTING=1 asks the FAST_TIER_MODELS first and returns their verdict
+# when confidenceScore >= TIER_CONFIDENCE_THRESHOLD. Ambiguous clips, or a
+# failed fast tier, escalate to the heavy ESCALATION_MODELS only: another
+# flash model is no second opinion. If the fast tier failed outright and the
+# escalation fails too, the remaining candidates answer as "fallback".
+TIERED_ROUTING = os.getenv("TIERED_ROUTING", "0") != "0"
+FAST_TIER_MODELS = [m for m in os.getenv("FAST_TIER_MODELS", "gemini-2.0-flash").split(",") if m]
+TIER_CONFIDENCE_THRESHOLD = float(os.getenv("TIER_CONFIDENCE_THRESHOLD", 0.85))
+ESCALATION_MODELS = [m for m in os.getenv("ESCALATION_MODELS", "gemini-3-pro-preview").split(",") if m]
+FALLBACK_MODELS = [m for m in MODEL_CANDIDATES if m not in FAST_TIER_MODELS + ESCALATION_MODELS]
+
+# --- Model Registry ---
+# Configured once at startup; probes which candidates are reachable every
+# MODEL_REFRESH_SECONDS (0 = probe once at startup only). With
+# CONTEXT_CACHE_TTL_SECONDS > 0 the forensic instruction goes to each model
+# once, as a context cache kept alive that long at a time. Off by default:
+# SYSTEM_INSTRUCTION (~440 tokens) is below Gemini's minimum cacheable size,
+# so it only pays once the instruction grows past that.
+model_registry = ModelRegistry(
+    MODEL_CANDIDATES,
+    api_key=GEMINI_API_KEY,
+    refresh_seconds=float(os.getenv("MODEL_REFRESH_SECONDS", 600)),
+    api_endpoint=GEMINI_API_ENDPOINT,
+    context_cache_ttl_seconds=float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", 0))
+)
+
+# --- Circuit Breakers ---
+# Models that keep failing are skipped for a cooldown instead of being
+# retried first on every request. HEDGE_AFTER_SECONDS > 0 additionally
+# starts the next candidate when the current one is slow to answer.
+model_breakers = BreakerBoard(
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", 3)),
+    cooldown_seconds=float(os.getenv("BREAKER_COOLDOWN_SECONDS", 30))
+)
+HEDGE_AFTER_SECONDS = float(os.getenv("HEDGE_AFTER_SECONDS", 0))
+
+# --- Upstream Quotas ---
+# MODEL_QUOTAS maps model -> {"rpm": n, "tpm": n} (split evenly across
+# server.py workers). Requests go
+# to candidates with budget left first and wait up to QUOTA_MAX_WAIT_SECONDS
+# when none has any; a model that answers 429 anyway sits out
+# QUOTA_BACKOFF_SECONDS.
+model_quotas = QuotaScheduler(
+    json.loads(os.getenv("MODEL_QUOTAS") or "{}"),
+    max_wait_seconds=float(os.getenv("QUOTA_MAX_WAIT_SECONDS", 2)),
+    backoff_seconds=float(os.getenv("QUOTA_BACKOFF_SECONDS", 10))
+)
+
+# --- Provider File Uploads ---
+# Clips of FILE_UPLOAD_MIN_BYTES or more (0 = never) are uploaded to the
+# provider's file storage once and referenced from every model attempt,
+# instead of riding inline in each fallback call. Handles are cached by
+# content hash until shortly before the provider expires them; a file is
+# deleted when its handle leaves the FILE_HANDLE_CACHE_SIZE cache, and the
+# rest at shutdown.
+def upload_audio(audio: bytes, mime_type: str):
+    ref = model_registry.upload(audio, mime_type)
+    count_upstream("upload", len(audio))
+    return ref
+
+def delete_upload(ref: FileRef):
+    model_registry.delete_upload(ref.name)
+
+audio_uploader = AudioUploader(
+    FileRefCache(max_entries=int(os.getenv("FILE_HANDLE_CACHE_SIZE", 512))),
+    upload=upload_audio,
+    min_bytes=int(os.getenv("FILE_UPLOAD_MIN_BYTES", 1024 * 1024)),
+    delete=delete_upload
+)
+
+# Bump whenever the forensic prompt changes so cached verdicts are not reused.
+PROMPT_VERSION = "forensic-v6"
+
+# --- Verdict Cache ---
+# Replayed clips are answered from a content-addressed cache instead of a
+# fresh model round trip. Set VERDICT_CACHE_DB to persist across restarts;
+# expired rows are deleted every VERDICT_CACHE_SWEEP_SECONDS.
+verdict_cache = VerdictCache(
+    max_entries=int(os.getenv("VERDICT_CACHE_SIZE", 1024)),
+    ttl_seconds=float(os.getenv("VERDICT_CACHE_TTL_SECONDS", 86400)),
+    db_path=os.getenv("VERDICT_CACHE_DB") or None,
+    sweep_seconds=float(os.getenv("VERDICT_CACHE_SWEEP_SECONDS", 3600))
+)
+
+# --- Binary Uploads ---
+# /api/voice-detection/upload takes raw audio/* bodies or multipart files.
+# Bodies above UPLOAD_SPOOL_BYTES are spooled to disk while they arrive.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 1024 * 1024))
+
+# --- Audio Normalization ---
+# Decodable clips are downmixed, trimmed, resampled to NORMALIZE_SAMPLE_RATE
+# and capped at MAX_ANALYSIS_SECONDS before upload. Others pass through.
+NORMALIZE_AUDIO = os.getenv("NORMALIZE_AUDIO", "1") != "0"
+NORMALIZE_SAMPLE_RATE = int(os.getenv("NORMALIZE_SAMPLE_RATE", 16000))
+MAX_ANALYSIS_SECONDS = float(os.getenv("MAX_ANALYSIS_SECONDS", 60))
+
+# --- Local Pre-Screen ---
+# Silent clips and obvious synthetic tones are answered from NumPy features
+# without a model call; other decodable clips carry the features upstream.
+prescreener = PreScreener(enabled=os.getenv("PRESCREEN_ENABLED", "1") != "0")
+
+# --- Near-Duplicate Lookup ---
+# Decodable clips get a perceptual fingerprint. One that matches a clip
+# classified before (at least FINGERPRINT_MATCH_THRESHOLD of the bits over
+# FINGERPRINT_MIN_COVERAGE of its length) gets that verdict without a model
+# call, so re-encoded, trimmed or louder copies are answered like replays.
+# The index lives in FINGERPRINT_INDEX_DIR; empty disables the lookup.
+FINGERPRINT_INDEX_DIR = os.getenv("FINGERPRINT_INDEX_DIR", "fingerprints")
+fingerprint_index = FingerprintIndex(
+    FINGERPRINT_INDEX_DIR,
+    threshold=float(os.getenv("FINGERPRINT_MATCH_THRESHOLD", 0.8)),
+    min_coverage=float(os.getenv("FINGERPRINT_MIN_COVERAGE", 0.75))
+) if FINGERPRINT_INDEX_DIR else None
+
+# --- Batch Analysis ---
+BATCH_MAX_CLIPS = int(os.getenv("BATCH_MAX_CLIPS", 200))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", MODEL_CONCURRENCY))
+
+# --- Long Recordings ---
+# /api/voice-detection/stream splits decodable recordings into overlapping
+# windows, analyzes up to STREAM_CONCURRENCY at once and streams verdicts.
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", 10))
+STREAM_OVERLAP_SECONDS = float(os.getenv("STREAM_OVERLAP_SECONDS", 2))
+STREAM_CONCURRENCY = int(os.getenv("STREAM_CONCURRENCY", MODEL_CONCURRENCY))
+
+# --- Live Monitoring ---
+# /ws/voice-detection keeps a rolling LIVE_WINDOW_SECONDS buffer per call and
+# analyzes it every LIVE_CADENCE_SECONDS of received audio.
+LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", 6))
+LIVE_CADENCE_SECONDS = float(os.getenv("LIVE_CADENCE_SECONDS", 2))
+LIVE_MAX_WINDOW_SECONDS = float(os.getenv("LIVE_MAX_WINDOW_SECONDS", 30))
+LIVE_MAX_FRAME_BYTES = int(os.getenv("LIVE_MAX_FRAME_BYTES", 256 * 1024))
+
+# --- Background Jobs ---
+# POST /api/voice-detection/jobs returns a job id at once; JOB_WORKERS
+# workers per process drain a SQLite queue at JOBS_DB that survives restarts.
+# A job hitting a 503 (upstream quota) is requeued after its Retry-After, or
+# JOB_RETRY_SECONDS, up to JOB_MAX_ATTEMPTS tries in all. Finished jobs are
+# deleted after JOB_RETENTION_SECONDS.
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", 30))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_SECONDS = float(os.getenv("JOB_RETRY_SECONDS", 10))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", 7 * 86400))
+
+# --- Admission Control ---
+# API keys come from API_KEYS (inline JSON) and/or API_KEYS_FILE, mapping
+# key -> {"name", "ratePerSecond", "burst", "maxConcurrent"}; the legacy
+# CALLGUARD_AI_API_KEY is always accepted with the KEY_* defaults. Past
+# ADMISSION_MAX_IN_FLIGHT requests in the process, new ones get 503 +
+# Retry-After instead of queueing behind work we cannot finish in time.
+# Covers /api/, the /jobs/ long-poll and /ws/ connections.
+admission = AdmissionController(
+    KeyStore.from_sources(
+        os.getenv("CALLGUARD_AI_API_KEY", "sk_test_123456789"),
+        keys_json=os.getenv("API_KEYS"),
+        keys_file=os.getenv("API_KEYS_FILE"),
+        rate_per_second=float(os.getenv("KEY_RATE_PER_SECOND", 10)),
+        burst=float(os.getenv("KEY_BURST", 20)),
+        max_concurrent=int(os.getenv("KEY_MAX_CONCURRENT", MODEL_CONCURRENCY))
+    ),
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 4 * MODEL_CONCURRENCY))
+)
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
+]
+
+def is_valid_api_key(key: Optional[str]) -> bool:
+    return admission.keys.get(key) is not None
 
 async def verify_api_key(x_api_key: str = Header(...)):
-    valid_key = os.getenv("CALLGUARD_AI_API_KEY", "sk_test_123456789")
-    if x_api_key != valid_key:
+    if not is_valid_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     return x_api_key
 
@@ -42,112 +283,742 @@ class VoiceAnalysisResponse(BaseModel):
     classification: str
     confidenceScore: float
     explanation: str
+    # What decided the verdict: "local" (pre-screen), "fast" (fast tier was
+    # confident), "escalated" (a heavy model, fast tier unsure or failed),
+    # "fast_unconfirmed" (fast tier unsure and the escalation failed; never
+    # cached), "fallback" (fast tier and escalation both failed) or "full"
+    # (the candidate chain, tiering off). None on verdicts cached before tiers.
+    tier: Optional[str] = None
 
 class ErrorResponse(BaseModel):
     status: str
     message: str
 
-# --- Core Logic ---
+class StreamAnalysisRequest(VoiceAnalysisRequest):
+    windowSeconds: float = Field(STREAM_WINDOW_SECONDS, ge=2, le=120)
+    overlapSeconds: float = Field(STREAM_OVERLAP_SECONDS, ge=0)
+
+class JobAccepted(BaseModel):
+    status: str
+    jobId: str
+    statusUrl: str
+
+class JobStatus(BaseModel):
+    jobId: str
+    status: str
+    result: Optional[VoiceAnalysisResponse] = None
+    message: Optional[str] = None
+    createdAt: float
+    startedAt: Optional[float] = None
+    finishedAt: Optional[float] = None
+    waitSeconds: Optional[float] = None
+
+class BatchClip(VoiceAnalysisRequest):
+    id: Optional[str] = None
+
+class BatchAnalysisRequest(BaseModel):
+    clips: List[BatchClip] = Field(..., min_length=1)
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str
+    result: Optional[VoiceAnalysisResponse] = None
+    message: Optional[str] = None
+
+class BatchAnalysisResponse(BaseModel):
+    status: str
+    uniqueClips: int
+    duplicates: int
+    results: List[BatchItemResult]
+
+def generate(model_name: str, prompt_text: str, audio_part: dict, timeout: float):
+    """Blocking Gemini call. Runs on model_executor, never on the event loop.
+
+    `timeout` goes to the SDK too, so a hung call gives its worker back
+    instead of holding it after run_model has stopped waiting.
+    """
+    # Configure Generation Config with Thinking Budget if supported (v2/v3 mainly)
+    # We map the user's "thinkingBudget: 4000" to "max_output_tokens" for compatibility
+    generation_config = {
+        "temperature": 0.0,
+        "max_output_tokens": 4000, 
+        "response_mime_type": "application/json"
+    }
+
+    model = model_registry.client(model_name)
+
+    # Construct content part similar to SDK format
+    return model.generate_content(
+        contents=[
+            {"role": "user", "parts": [
+                {"text": prompt_text},
+                audio_part
+            ]}
+        ],
+        generation_config=generation_config,
+        safety_settings=SAFETY_SETTINGS,
+        request_options={"timeout": timeout}
+    )
+
+class WorkerPoolBusy(Exception):
+    """A model call that never reached a worker. Says nothing about the
+    model, so it does not count against its circuit breaker."""
+
+async def run_model(model_name: str, prompt_text: str, audio_part: dict):
+    """Run one model attempt on the worker pool with a per-call timeout.
+
+    MODEL_TIMEOUT_SECONDS bounds the wait for a free worker and, starting
+    only once a worker picks the call up, the call itself. A call still
+    queued when its wait expires is dropped and raises WorkerPoolBusy.
+    """
+    loop = asyncio.get_running_loop()
+    picked_up = asyncio.Event()
+
+    def call():
+        loop.call_soon_threadsafe(picked_up.set)
+        return generate(model_name, prompt_text, audio_part, MODEL_TIMEOUT_SECONDS)
+
+    work = loop.run_in_executor(model_executor, call)
+    try:
+        await asyncio.wait_for(picked_up.wait(), timeout=MODEL_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        work.cancel()
+        raise WorkerPoolBusy(f"No model worker free within {MODEL_TIMEOUT_SECONDS:g}s")
+    except asyncio.CancelledError:
+        work.cancel()
+        raise
+    try:
+        return await asyncio.wait_for(work, timeout=MODEL_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"No response within {MODEL_TIMEOUT_SECONDS:g}s")
+
+def verdict_key(language: str, audio: bytes) -> str:
+    version = f"{PROMPT_VERSION}:{','.join(MODEL_CANDIDATES)}"
+    return cache_key(audio, language, version)
+
+def fingerprint_scope(language: str) -> str:
+    """Near-duplicate verdicts are only shared under the same prompt, models and language."""
+    return f"{PROMPT_VERSION}:{','.join(MODEL_CANDIDATES)}:{language.lower()}"
+
+def api_error(status_code: int, message: str) -> HTTPException:
+    return HTTPException(status_code=status_code, detail={"status": "error", "message": message})
+
+def error_message(e: HTTPException) -> str:
+    return e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+
+def decode_audio(audio_base64: str) -> bytes:
+    try:
+        return base64.b64decode(audio_base64)
+    except ValueError:
+        raise api_error(400, "audioBase64 is not valid base64")
+
 # --- Core Logic ---
 @app.post("/api/voice-detection", response_model=VoiceAnalysisResponse)
 async def detect_voice_origin(request: VoiceAnalysisRequest, api_key: str = Depends(verify_api_key)):
-    # Candidate models from user's availability list
-    # We prioritize the "3 Pro Preview" as requested, then 2.0 Flash
-    candidates = [
-        "gemini-3-pro-preview",
-        "gemini-2.0-flash",
-        "gemini-2.0-flash-001",
-        "gemini-1.5-flash"
-    ]
+    mark_validated()
+    return await analyze_request(request)
 
-    last_error = None
-    genai.configure(api_key=GEMINI_API_KEY)
-
-    # Forensic Inversion Strategy (The Secret Sauce)
-    prompt_text = f"""
-    You are an advanced forensic acoustic engineer. Your objective is to perform a high-fidelity audit of the provided audio to distinguish between organic human speech and synthetic (AI) generation.
-    
-    AUTHENTICATION PROTOCOL:
-    IDENTIFY LANGUAGE: Determine if the sample is Tamil, English, Hindi, Malayalam, or Telugu ({request.language} suggested).
-    SPECTRAL AUDIT: Analyze for 'Phase Locking' or 'Harmonic Ghosting' typical of neural vocoders.
-    TEMPORAL ANALYSIS: Check for micro-timing irregularities. AI speech often has unnatural rhythmic precision even when simulating 'naturalness.'
-    
-    PROOF OF LIFE (POL) MARKERS: Scrutinize for involuntary human artifacts:
-    - Natural aspiration (breathing patterns correlated with phrasing).
-    - Dental/Labial clicks (moisture sounds in the mouth).
-    - Involuntary vocal fold tremors or organic fatigue.
-    - Background environment 'bleed' or room-tone variance.
-    
-    CLASSIFICATION RULES:
-    - Classify as 'HUMAN' if you detect POL markers or irregular spectral noise consistent with organic physiology.
-    - Classify as 'AI_GENERATED' if the speech shows hyper-consistent pitch modulation, a flat 'digital' noise floor, or lack of micro-prosodic emotional resonance.
-    
-    IMPORTANT: Do not be fooled by high audio quality. Focus on the underlying physical authenticity of the vocal source.
-    
-    Return exactly this JSON structure:
-    {{
-        "status": "success",
-        "language": "{request.language}",
-        "classification": "AI_GENERATED" | "HUMAN",
-        "confidenceScore": float (0.0 - 1.0),
-        "explanation": "Detailed technical justification focusing on the presence or absence of organic artifacts."
-    }}
+async def analyze_request(request: VoiceAnalysisRequest) -> VoiceAnalysisResponse:
+    with timed("decode"):
+        audio = decode_audio(request.audioBase64)
+    return await analyze(request.language, audio, mime_type_for(request.audioFormat, audio))
+
+@app.post("/api/voice-detection/jobs", response_model=JobAccepted, status_code=202)
+async def enqueue_voice_detection(request: VoiceAnalysisRequest, api_key: str = Depends(verify_api_key)):
+    """Queue a clip and return immediately; poll GET /jobs/{jobId} for the verdict."""
+    mark_validated()
+    audio = decode_audio(request.audioBase64)
+    job_id = await asyncio.to_thread(job_store.enqueue, request.language, audio, mime_type_for(request.audioFormat, audio))
+    job_workers.notify()
+    return JobAccepted(status="queued", jobId=job_id, statusUrl=f"/jobs/{job_id}")
+
+@app.get("/jobs/stats")
+async def jobs_stats(api_key: str = Depends(verify_api_key)):
+    return {**await asyncio.to_thread(job_store.stats), **job_workers.stats()}
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, wait: float = 0, api_key: str = Depends(verify_api_key)):
+    """Job status. With ?wait=N, long-poll up to N seconds (capped at
+    JOB_MAX_WAIT_SECONDS) for the job to finish."""
+    deadline = time.monotonic() + min(max(wait, 0), JOB_MAX_WAIT_SECONDS)
+    while True:
+        job = await asyncio.to_thread(job_store.get, job_id)
+        if job is None:
+            raise api_error(404, "Unknown job id")
+        if job["status"] in ("done", "failed") or time.monotonic() >= deadline:
+            return JobStatus(**job)
+        await asyncio.sleep(0.2)
+
+async def run_job(language: str, audio: bytes, mime_type: str) -> dict:
+    try:
+        return (await analyze(language, audio, mime_type)).model_dump()
+    except HTTPException as e:
+        if e.status_code == 503:
+            retry_after = (e.headers or {}).get("Retry-After")
+            raise RetryLater(error_message(e), float(retry_after) if retry_after else JOB_RETRY_SECONDS)
+        raise Exception(error_message(e))
+
+job_store = JobStore(JOBS_DB, max_attempts=JOB_MAX_ATTEMPTS, retention_seconds=JOB_RETENTION_SECONDS)
+job_workers = JobWorkers(job_store, run_job, workers=JOB_WORKERS)
+
+@app.post("/api/voice-detection/batch", response_model=BatchAnalysisResponse)
+async def detect_voice_origin_batch(request: BatchAnalysisRequest, api_key: str = Depends(verify_api_key)):
+    """Analyze up to BATCH_MAX_CLIPS clips in one call.
+
+    Each clip costs the key a rate token (the first was paid on admission),
+    and no more clips are in flight than the key's concurrency cap or
+    BATCH_CONCURRENCY allow. Identical clips are analyzed once, and a
+    failing clip becomes an error item instead of failing the batch.
+    Results come back in request order.
     """
+    mark_validated()
+    if len(request.clips) > BATCH_MAX_CLIPS:
+        raise api_error(413, f"Batch exceeds {BATCH_MAX_CLIPS} clips")
+    try:
+        admission.charge(api_key, len(request.clips) - 1)
+    except Rejected as e:
+        raise HTTPException(status_code=e.status, detail={"status": "error", "message": e.message},
+                            headers={"Retry-After": str(e.retry_after)})
 
-    for model_name in candidates:
+    def dedup_key(clip: BatchClip):
+        return (clip.language.lower(), clip.audioFormat.lower(), clip.audioBase64)
+
+    unique = {}
+    for clip in request.clips:
+        unique.setdefault(dedup_key(clip), clip)
+
+    tenant = admission.keys.get(api_key)
+    slots = asyncio.Semaphore(min(BATCH_CONCURRENCY, tenant.max_concurrent or BATCH_CONCURRENCY))
+
+    async def run_one(clip: BatchClip):
+        async with slots:
+            try:
+                return await analyze_request(clip), None
+            except HTTPException as e:
+                return None, error_message(e)
+            except Exception as e:
+                return None, f"{type(e).__name__}: {e}"
+
+    outcomes = dict(zip(unique, await asyncio.gather(*[run_one(clip) for clip in unique.values()])))
+
+    results = []
+    for index, clip in enumerate(request.clips):
+        result, message = outcomes[dedup_key(clip)]
+        results.append(BatchItemResult(
+            index=index,
+            id=clip.id,
+            status="success" if result is not None else "error",
+            result=result,
+            message=message
+        ))
+
+    return BatchAnalysisResponse(
+        status="success",
+        uniqueClips=len(unique),
+        duplicates=len(request.clips) - len(unique),
+        results=results
+    )
+
+@app.post("/api/voice-detection/upload", response_model=VoiceAnalysisResponse)
+async def detect_voice_origin_upload(request: Request, language: Optional[str] = None, api_key: str = Depends(verify_api_key)):
+    """Same analysis as /api/voice-detection without base64-in-JSON.
+
+    Send the clip either as the raw body (Content-Type: audio/*) with
+    ?language=..., or as multipart/form-data with a "file" part and a
+    "language" field. The bytes go to the model as-is.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise api_error(413, f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        # Parsed from our own size-limited stream rather than request.form(),
+        # which would read a chunked body of any size before we could check it.
+        parser = MultiPartParser(request.headers, limit_stream(request.stream(), MAX_UPLOAD_BYTES),
+                                 max_files=1, max_fields=4)
         try:
-            print(f"👉 SDK Trying model: {model_name}...")
-            
-            # Configure Generation Config with Thinking Budget if supported (v2/v3 mainly)
-            # We map the user's "thinkingBudget: 4000" to "max_output_tokens" for compatibility
-            generation_config = {
-                "temperature": 0.0,
-                "max_output_tokens": 4000, 
-                "response_mime_type": "application/json"
-            }
-
-            model = genai.GenerativeModel(model_name)
-            
-            # Construct content part similar to SDK format
-            response = model.generate_content(
-                contents=[
-                    {"role": "user", "parts": [
-                        {"text": prompt_text},
-                        {"inline_data": {"mime_type": "audio/mp3", "data": request.audioBase64}}
-                    ]}
-                ],
-                generation_config=generation_config,
-                safety_settings=[
-                    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-                ]
-            )
-            
-            # Parse result
-            if response.text:
-                print(f"✅ SUCCESS with {model_name}!")
-                result_json = json.loads(response.text)
-                
-                return VoiceAnalysisResponse(
-                    status="success",
-                    language=result_json.get("language", request.language),
-                    classification=result_json.get("classification", "AI_GENERATED"),
-                    confidenceScore=result_json.get("confidenceScore", 0.0),
-                    explanation=result_json.get("explanation", f"Verified by Forensic Engine ({model_name}).")
-                )
-            else:
-                 raise Exception("Empty response from model")
+            form = await parser.parse()
+        except UploadTooLarge as e:
+            raise api_error(413, str(e))
+        except MultiPartException as e:
+            raise api_error(400, e.message)
+        try:
+            upload = form.get("file")
+            if not isinstance(upload, UploadFile):
+                raise api_error(422, "Multipart upload needs a 'file' part")
+            language = language or form.get("language")
+            audio = read_all(upload.file)
+            mime_type = mime_type_for(upload.content_type or "", audio)
+        finally:
+            await form.close()
+    elif content_type.startswith(("audio/", "application/octet-stream")):
+        try:
+            spool = await spool_stream(request.stream(), MAX_UPLOAD_BYTES, UPLOAD_SPOOL_BYTES)
+        except UploadTooLarge as e:
+            raise api_error(413, str(e))
+        audio = read_all(spool)
+        mime_type = mime_type_for(content_type.split(";")[0], audio)
+    else:
+        raise api_error(415, "Send audio/* or multipart/form-data")
+
+    if not language:
+        raise api_error(422, "language is required")
+    if not audio:
+        raise api_error(400, "Empty audio upload")
+    return await analyze(language, audio, mime_type)
+
+@app.post("/api/voice-detection/stream")
+async def detect_voice_origin_stream(request: StreamAnalysisRequest, http_request: Request, api_key: str = Depends(verify_api_key)):
+    """Windowed analysis of a long recording, streamed as it completes.
+
+    Emits one NDJSON line per window ({"type": "window", ...}) in completion
+    order, then a {"type": "summary", ...} line with the overall verdict and
+    the time ranges judged synthetic. Send Accept: text/event-stream to get
+    the same events as server-sent events.
+    """
+    mark_validated()
+    if request.overlapSeconds >= request.windowSeconds:
+        raise api_error(422, "overlapSeconds must be shorter than windowSeconds")
+    audio = decode_audio(request.audioBase64)
+    mime_type = mime_type_for(request.audioFormat, audio)
+    events = stream_windows(request.language, audio, mime_type, request.windowSeconds, request.overlapSeconds)
+
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        body = (f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" async for event in events)
+        return StreamingResponse(body, media_type="text/event-stream")
+    body = (json.dumps(event) + "\n" async for event in events)
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+async def stream_windows(language: str, audio: bytes, mime_type: str, window_seconds: float, overlap_seconds: float):
+    """Yield per-window verdicts as they finish, then an aggregate summary.
+
+    Windows are started in time order behind a STREAM_CONCURRENCY
+    semaphore, so the first verdict arrives after roughly one model call
+    whatever the recording length. Clips we cannot decode are analyzed as a
+    single window.
+    """
+    decoded = await asyncio.to_thread(decode_pcm, audio)
+    if decoded is None:
+        windows = [(0.0, None, None)]
+    else:
+        samples, rate = decoded
+        windows = split_windows(samples, rate, window_seconds, overlap_seconds)
+
+    slots = asyncio.Semaphore(STREAM_CONCURRENCY)
+
+    async def run_window(index: int, start: float, end: Optional[float], window):
+        async with slots:
+            event = {"type": "window", "index": index, "start": start, "end": end}
+            try:
+                if window is None:
+                    result = await analyze(language, audio, mime_type, near_duplicates=False)
+                else:
+                    clip = await asyncio.to_thread(encode_wav, window, rate)
+                    result = await analyze(language, clip, "audio/wav", near_duplicates=False)
+                event.update(status="success", classification=result.classification,
+                             confidenceScore=result.confidenceScore, explanation=result.explanation)
+            except HTTPException as e:
+                event.update(status="error", message=error_message(e))
+            except Exception as e:
+                log.exception("window_failed", extra={"index": index})
+                event.update(status="error", message=f"{type(e).__name__}: {e}")
+            return event
+
+    tasks = [asyncio.ensure_future(run_window(i, *w)) for i, w in enumerate(windows)]
+    finished = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            event = await next_done
+            finished.append(event)
+            yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield summarize_windows(language, finished)
+
+@app.websocket("/ws/voice-detection")
+async def live_voice_detection(websocket: WebSocket):
+    """Live-call monitoring over a WebSocket.
+
+    Authenticate with the x-api-key header or ?api_key=...; optional query
+    parameters: language, sampleRate, windowSeconds, cadenceSeconds. Send
+    binary frames of mono 16-bit little-endian PCM. Every cadenceSeconds of
+    audio the latest windowSeconds are analyzed and a {"type": "verdict"}
+    message is pushed back. When analysis falls behind, waiting windows are
+    coalesced (only the newest is kept), so memory per connection stays at
+    about three windows. Send the text "stop" to flush and close.
+    """
+    params = websocket.query_params
+    if not is_valid_api_key(websocket.headers.get("x-api-key") or params.get("api_key")):
+        await websocket.close(code=1008)
+        return
+    try:
+        language = params.get("language", "English")
+        rate = int(params.get("sampleRate", 16000))
+        window_seconds = float(params.get("windowSeconds", LIVE_WINDOW_SECONDS))
+        cadence_seconds = float(params.get("cadenceSeconds", LIVE_CADENCE_SECONDS))
+        if not (8000 <= rate <= 48000 and 1 <= window_seconds <= LIVE_MAX_WINDOW_SECONDS and cadence_seconds >= 0.25):
+            raise ValueError
+    except ValueError:
+        await websocket.close(code=1003)
+        return
+
+    await websocket.accept()
+    buffer = RollingWindow(rate, window_seconds, cadence_seconds)
+    coalescer = Coalescer()
+    tasks = set()
+
+    async def run(item):
+        while item is not None:
+            start, end, samples, due_at = item
+            try:
+                try:
+                    clip = await asyncio.to_thread(encode_wav, samples, rate)
+                    result = await analyze(language, clip, "audio/wav", near_duplicates=False)
+                    message = {
+                        "type": "verdict", "start": round(start, 3), "end": round(end, 3),
+                        "classification": result.classification, "confidenceScore": result.confidenceScore,
+                        "explanation": result.explanation
+                    }
+                except HTTPException as e:
+                    message = {"type": "error", "start": round(start, 3), "end": round(end, 3), "message": error_message(e)}
+                except Exception as e:
+                    log.exception("live_window_failed", extra={"start": round(start, 3), "end": round(end, 3)})
+                    message = {"type": "error", "start": round(start, 3), "end": round(end, 3),
+                               "message": f"{type(e).__name__}: {e}"}
+                message["latencySeconds"] = round(time.perf_counter() - due_at, 3)
+                message["coalesced"] = coalescer.dropped
+                await websocket.send_json(message)
+            finally:
+                # Even if sending failed or we were cancelled: a window left
+                # in flight would block every later one on this connection.
+                item = coalescer.done()
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = message.get("bytes")
+            if frame:
+                if len(frame) > LIVE_MAX_FRAME_BYTES:
+                    await websocket.close(code=1009)
+                    break
+                if buffer.feed_pcm16(frame):
+                    item = (*buffer.snapshot(), time.perf_counter())
+                    if coalescer.offer(item):
+                        task = asyncio.create_task(run(item))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+            elif message.get("text") == "stop":
+                await asyncio.gather(*tasks)
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def summarize_windows(language: str, events: list) -> dict:
+    """Overall verdict: AI_GENERATED if any window is, with merged ranges."""
+    judged = sorted((e for e in events if e["status"] == "success"), key=lambda e: e["index"])
+    synthetic = [e for e in judged if e["classification"] == "AI_GENERATED"]
+
+    ranges = []
+    for e in synthetic:
+        if ranges and ranges[-1][1] is not None and e["start"] <= ranges[-1][1]:
+            ranges[-1][1] = e["end"]
+        else:
+            ranges.append([e["start"], e["end"]])
+
+    if not judged:
+        classification, confidence = None, 0.0
+    elif synthetic:
+        classification, confidence = "AI_GENERATED", max(e["confidenceScore"] for e in synthetic)
+    else:
+        classification, confidence = "HUMAN", sum(e["confidenceScore"] for e in judged) / len(judged)
+
+    return {
+        "type": "summary",
+        "status": "success" if judged else "error",
+        "language": language,
+        "classification": classification,
+        "confidenceScore": round(confidence, 4),
+        "syntheticRanges": ranges,
+        "windows": len(events),
+        "failedWindows": len(events) - len(judged),
+    }
 
+def prepare_clip(audio: bytes, mime_type: str, near_duplicates: bool = True):
+    """Normalize the clip, pre-screen it and, if near_duplicates, fingerprint
+    it. CPU-bound; run off the loop."""
+    if NORMALIZE_AUDIO:
+        normalized = normalize_audio(audio, mime_type, NORMALIZE_SAMPLE_RATE, MAX_ANALYSIS_SECONDS)
+        if normalized.changed:
+            log.info("audio_normalized", extra={"bytes_in": normalized.original_bytes, "bytes_out": len(normalized.audio), "seconds": round(normalized.duration_seconds, 2)})
+        audio, mime_type = normalized.audio, normalized.mime_type
+    features, local_verdict = prescreener.screen(audio)
+    fp = None
+    if near_duplicates and fingerprint_index is not None and local_verdict is None:
+        decoded = decode_pcm(audio)
+        if decoded is not None:
+            fp = fingerprint(*decoded)
+    return audio, mime_type, features, local_verdict, fp
+
+async def analyze(language: str, audio: bytes, mime_type: str, near_duplicates: bool = True) -> VoiceAnalysisResponse:
+    """Classify one clip: verdict cache, then normalization and the local
+    pre-screen, then the near-duplicate index, then the candidate model
+    chain.
+
+    Callers analyzing overlapping windows of one recording pass
+    near_duplicates=False: neighbouring windows share most of their audio,
+    so they would answer each other from the index instead of being judged
+    on their own, and their fragments would crowd out whole clips.
+    """
+    child(PAYLOAD_BYTES, "received").observe(len(audio))
+    with timed("cache"):
+        key = verdict_key(language, audio)
+        cached = await verdict_cache.aget(key)
+    if cached is not None:
+        log.info("cache_hit")
+        child(VERDICTS, "cache").inc()
+        return VoiceAnalysisResponse(**cached)
+
+    with timed("prepare"):
+        audio, mime_type, features, local_verdict, fp = await asyncio.to_thread(prepare_clip, audio, mime_type, near_duplicates)
+    if local_verdict is not None:
+        classification, confidence, explanation = local_verdict
+        log.info("answered_locally", extra={"classification": classification})
+        child(VERDICTS, "prescreen").inc()
+        return VoiceAnalysisResponse(
+            status="success",
+            language=language,
+            classification=classification,
+            confidenceScore=confidence,
+            explanation=explanation,
+            tier="local"
+        )
+
+    if fp is not None:
+        with timed("fingerprint"):
+            match = await asyncio.to_thread(fingerprint_index.lookup, fp, fingerprint_scope(language))
+        if match is not None:
+            log.info("near_duplicate_hit", extra={"similarity": round(match.similarity, 3), "coverage": round(match.coverage, 3)})
+            child(VERDICTS, "fingerprint").inc()
+            await verdict_cache.aput(key, match.verdict)
+            return VoiceAnalysisResponse(**match.verdict)
+
+    prompt_text = model_registry.prompt(language)
+    if features is not None:
+        prompt_text += f"""
+    LOCAL ACOUSTIC MEASUREMENTS (computed server-side from the same audio; weigh them as supporting evidence):
+    {json.dumps(features)}
+    """
+    with timed("model_chain"):
+        if TIERED_ROUTING:
+            result = await run_tiered(language, prompt_text, audio, mime_type)
+        else:
+            result = (await run_candidates(language, prompt_text, audio, mime_type)).model_copy(update={"tier": "full"})
+    child(VERDICTS, "model").inc()
+    child(TIER_VERDICTS, result.tier).inc()
+    if result.tier == "fast_unconfirmed":
+        # Below the confidence we trust; the next request should try again.
+        return result
+    await verdict_cache.aput(key, result.model_dump())
+    if fp is not None:
+        await asyncio.to_thread(fingerprint_index.add, fp, fingerprint_scope(language), result.model_dump())
+    return result
+
+async def attempt_model(model_name: str, language: str, prompt_text: str, audio_part: dict, forced: bool = False,
+                        tokens: int = 0) -> VoiceAnalysisResponse:
+    """One model attempt, reported to that model's circuit breaker and
+    charged against its upstream quota."""
+    breaker = model_breakers.get(model_name)
+    if not breaker.acquire(force=forced):
+        raise BreakerOpen("circuit open, skipped")
+    reservation = model_quotas.reserve(model_name, tokens)
+    if reservation is None:
+        breaker.release()
+        raise QuotaExhausted("upstream quota used up, skipped")
+
+    log.debug("model_attempt", extra={"model": model_name})
+    count_upstream("prompt", len(prompt_text))
+    if "inline_data" in audio_part:
+        count_upstream("inline", len(audio_part["inline_data"]["data"]))
+    started = time.perf_counter()
+    try:
+        response = await run_model(model_name, prompt_text, audio_part)
+        if not response.text:
+            raise Exception("Empty response from model")
+        with timed("parse"):
+            result_json = json.loads(response.text)
+    except asyncio.CancelledError:
+        breaker.release()
+        child(MODEL_SECONDS, model_name, "cancelled").observe(time.perf_counter() - started)
+        raise
+    except Exception as e:
+        if is_outage(e):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        if is_quota_error(e):
+            model_quotas.throttle(model_name)
+        if "CachedContent" in str(e):
+            # Expired or deleted under us; use the plain instruction until the next refresh.
+            model_registry.forget_context_cache(model_name)
+        child(MODEL_SECONDS, model_name, "error").observe(time.perf_counter() - started)
+        child(MODEL_ERRORS, model_name, type(e).__name__).inc()
+        raise
+    latency = time.perf_counter() - started
+    breaker.record_success(latency)
+    usage = getattr(response, "usage_metadata", None)
+    model_quotas.settle(model_name, reservation, getattr(usage, "total_token_count", None))
+    child(MODEL_SECONDS, model_name, "success").observe(latency)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    if prompt_tokens:
+        cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+        child(INPUT_TOKENS, model_name, "uncached").observe(prompt_tokens - cached_tokens)
+        child(INPUT_TOKENS, model_name, "cached").observe(cached_tokens)
+
+    log.info("model_success", extra={"model": model_name, "latency_s": round(latency, 3)})
+    return VoiceAnalysisResponse(
+        status="success",
+        language=result_json.get("language", language),
+        classification=result_json.get("classification", "AI_GENERATED"),
+        confidenceScore=result_json.get("confidenceScore", 0.0),
+        explanation=result_json.get("explanation", f"Verified by Forensic Engine ({model_name}).")
+    )
+
+async def audio_part_for(audio: bytes, mime_type: str) -> dict:
+    """The clip as a file reference when it is worth uploading, else inline."""
+    try:
+        with timed("upload"):
+            ref = await audio_uploader.ref_for(audio, mime_type)
+    except Exception as e:
+        log.warning("file_upload_failed", extra={"bytes": len(audio), "error": str(e)})
+        ref = None
+    if ref is None:
+        return {"inline_data": {"mime_type": mime_type, "data": audio}}
+    return {"file_data": {"mime_type": ref.mime_type, "file_uri": ref.uri}}
+
+async def run_tiered(language: str, prompt_text: str, audio: bytes, mime_type: str) -> VoiceAnalysisResponse:
+    """Fast tier first; keep its verdict when it is confident, else escalate.
+    If the escalation fails too, the fast tier's verdict is better than none,
+    but it goes back tagged "fast_unconfirmed" and is not remembered."""
+    fast = None
+    fast_models = [name for name in FAST_TIER_MODELS if model_breakers.get(name).is_available()]
+    if fast_models:
+        try:
+            fast = await run_candidates(language, prompt_text, audio, mime_type, fast_models)
+        except HTTPException as e:
+            log.warning("fast_tier_failed", extra={"error": error_message(e)})
+        else:
+            if fast.confidenceScore >= TIER_CONFIDENCE_THRESHOLD:
+                return fast.model_copy(update={"tier": "fast"})
+
+    log.info("tier_escalated", extra={"fast_confidence": fast.confidenceScore if fast else None})
+    try:
+        result = await run_candidates(language, prompt_text, audio, mime_type, ESCALATION_MODELS)
+    except HTTPException as e:
+        log.warning("escalation_failed", extra={"error": error_message(e), "fast_confidence": fast.confidenceScore if fast else None})
+        if fast is not None:
+            return fast.model_copy(update={"tier": "fast_unconfirmed"})
+        if not FALLBACK_MODELS:
+            raise
+        result = await run_candidates(language, prompt_text, audio, mime_type, FALLBACK_MODELS)
+        return result.model_copy(update={"tier": "fallback"})
+    return result.model_copy(update={"tier": "escalated"})
+
+async def run_candidates(language: str, prompt_text: str, audio: bytes, mime_type: str,
+                         models: Optional[List[str]] = None) -> VoiceAnalysisResponse:
+    """Walk the healthy candidates (default MODEL_CANDIDATES) in priority
+    order, sequentially or hedged."""
+    candidates, forced = model_breakers.route(model_registry.live(models or MODEL_CANDIDATES))
+    tokens = estimate_tokens(audio, len(SYSTEM_INSTRUCTION) + len(prompt_text))
+    try:
+        candidates = await model_quotas.schedule(candidates, tokens)
+    except QuotaExhausted as e:
+        log.warning("quota_exhausted", extra={"tokens": tokens, "retry_after_s": round(e.retry_after, 1)})
+        raise HTTPException(
+            status_code=503,
+            detail={"status": "error", "message": str(e)},
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    audio_part = await audio_part_for(audio, mime_type)
+    if HEDGE_AFTER_SECONDS > 0:
+        return await run_hedged(candidates, forced, language, prompt_text, audio_part, tokens)
+
+    last_error = None
+    attempts = 0
+    for model_name in candidates:
+        try:
+            attempts += 1
+            result = await attempt_model(model_name, language, prompt_text, audio_part, forced, tokens)
+            child(FALLBACK_DEPTH, str(attempts)).inc()
+            return result
         except Exception as e:
-            print(f"❌ {model_name} exception: {e}")
+            log.warning("model_failed", extra={"model": model_name, "error": str(e), "exception": type(e).__name__})
             last_error = f"{model_name} Error: {str(e)}"
             continue
 
+    raise all_models_failed(last_error)
+
+async def run_hedged(candidates: list, forced: bool, language: str, prompt_text: str, audio_part: dict,
+                     tokens: int = 0) -> VoiceAnalysisResponse:
+    """Start the next candidate whenever the running ones are slower than
+    HEDGE_AFTER_SECONDS (or one fails), and keep the first success."""
+    queue = list(candidates)
+    pending = {}
+    last_error = None
+
+    attempts = 0
+
+    def launch():
+        nonlocal attempts
+        attempts += 1
+        model_name = queue.pop(0)
+        task = asyncio.ensure_future(attempt_model(model_name, language, prompt_text, audio_part, forced, tokens))
+        pending[task] = model_name
+
+    launch()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=HEDGE_AFTER_SECONDS if queue else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                log.info("hedge_started", extra={"model": queue[0], "after_s": HEDGE_AFTER_SECONDS})
+                launch()
+                continue
+
+            for task in done:
+                model_name = pending.pop(task)
+                try:
+                    result = task.result()
+                    child(FALLBACK_DEPTH, str(attempts)).inc()
+                    return result
+                except Exception as e:
+                    log.warning("model_failed", extra={"model": model_name, "error": str(e), "exception": type(e).__name__})
+                    last_error = f"{model_name} Error: {str(e)}"
+                    if queue:
+                        launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise all_models_failed(last_error)
+
+def all_models_failed(last_error: Optional[str]) -> HTTPException:
     # If we made it here, ALL models failed.
-    print(f"🔥 FATAL: All models failed. Last error: {last_error}")
-    raise HTTPException(
+    log.error("all_models_failed", extra={"last_error": last_error})
+    child(FALLBACK_DEPTH, "failed").inc()
+    return HTTPException(
         status_code=500, 
         detail={"status": "error", "message": f"Service Unavailable. Tried all models. Last error: {last_error}"}
     )
@@ -156,10 +1027,59 @@ async def detect_voice_origin(request: VoiceAnalysisRequest, api_key: str = Depe
 def home():
     return {"status": "online", "system": "VoxGuard Neural Forensic Engine", "version": "5.0.0"}
 
+@app.get("/cache/stats")
+def cache_stats(api_key: str = Depends(verify_api_key)):
+    return verdict_cache.stats()
+
+@app.get("/prescreen/stats")
+def prescreen_stats(api_key: str = Depends(verify_api_key)):
+    return prescreener.stats()
+
+@app.get("/fingerprints/stats")
+def fingerprint_stats(api_key: str = Depends(verify_api_key)):
+    if fingerprint_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **fingerprint_index.stats()}
+
+@app.get("/admission/stats")
+def admission_stats(api_key: str = Depends(verify_api_key)):
+    return admission.stats()
+
+@app.get("/models/status")
+def models_status(api_key: str = Depends(verify_api_key)):
+    return {
+        "candidates": MODEL_CANDIDATES,
+        "hedgeAfterSeconds": HEDGE_AFTER_SECONDS,
+        "tiering": {
+            "enabled": TIERED_ROUTING,
+            "fastModels": FAST_TIER_MODELS,
+            "escalationModels": ESCALATION_MODELS,
+            "fallbackModels": FALLBACK_MODELS,
+            "confidenceThreshold": TIER_CONFIDENCE_THRESHOLD
+        },
+        "breakers": model_breakers.snapshot(),
+        "quotas": model_quotas.stats(),
+        "fileUploads": audio_uploader.stats(),
+        "contextCache": model_registry.context_cache_status()
+    }
+
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "model_backend": "gemini-1.5-flash-001"}
+    live = model_registry.live(MODEL_CANDIDATES)
+    return {"status": "ok", "model_backend": live[0], **model_registry.status()}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus exposition. Unauthenticated so scrapers need no API key;
+    keep it off the public ingress. Under server.py every worker writes to
+    PROMETHEUS_MULTIPROC_DIR and this aggregates the whole pool."""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
 
 if __name__ == "__main__":
+    # Single process, for development; production runs server.py.
     port = int(os.environ.get("PORT", 10000))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,167 @@
+import contextvars
+import functools
+import json
+import logging
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+request_started_var = contextvars.ContextVar("request_started", default=None)
+# One mutable [bytes] cell per HTTP request; tasks spawned by the handler
+# copy the context but share the cell.
+upstream_bytes_var = contextvars.ContextVar("upstream_bytes", default=None)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45, 90)
+SIZE_BUCKETS = (1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+REQUEST_SECONDS = Histogram(
+    "voxguard_request_seconds", "HTTP request latency", ["route", "method", "status"], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge("voxguard_in_flight_requests", "HTTP requests currently being handled", multiprocess_mode="livesum")
+STAGE_SECONDS = Histogram(
+    "voxguard_stage_seconds", "Time spent per forensic pipeline stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+MODEL_SECONDS = Histogram(
+    "voxguard_model_attempt_seconds", "Latency of individual model attempts", ["model", "outcome"], buckets=LATENCY_BUCKETS
+)
+MODEL_ERRORS = Counter("voxguard_model_errors_total", "Failed model attempts", ["model", "exception"])
+FALLBACK_DEPTH = Counter(
+    "voxguard_fallback_depth_total", "Requests by number of model attempts needed (failed = none succeeded)", ["depth"]
+)
+PAYLOAD_BYTES = Histogram(
+    "voxguard_payload_bytes", "Audio payload sizes", ["kind"], buckets=SIZE_BUCKETS
+)
+UPSTREAM_BYTES = Counter(
+    "voxguard_upstream_bytes_total", "Bytes sent to the model provider (inline audio, uploads, prompt text)", ["kind"]
+)
+INPUT_TOKENS = Histogram(
+    "voxguard_model_input_tokens", "Input tokens per successful model call, as the provider reported them "
+    "(cached = served from a context cache)", ["model", "kind"], buckets=TOKEN_BUCKETS
+)
+VERDICTS = Counter("voxguard_verdicts_total", "Verdicts returned by source", ["source"])
+TIER_VERDICTS = Counter(
+    "voxguard_tier_verdicts_total", "Model verdicts by the routing tier that decided them", ["tier"]
+)
+
+
+@functools.lru_cache(maxsize=None)
+def child(metric, *labels):
+    """metric.labels(*labels), memoized so the hot path skips the client's
+    label lock and string coercion. Only for bounded label sets."""
+    return metric.labels(*labels)
+
+
+@contextmanager
+def timed(stage: str):
+    """Observe the wall time of a pipeline stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        child(STAGE_SECONDS, stage).observe(time.perf_counter() - started)
+
+
+def mark_validated():
+    """Record time from request arrival to handler entry (body read, JSON
+    parsing, pydantic validation and auth) as the "validation" stage."""
+    started = request_started_var.get()
+    if started is not None:
+        child(STAGE_SECONDS, "validation").observe(time.perf_counter() - started)
+
+
+def count_upstream(kind: str, size: int):
+    """Bytes sent to the provider, added to the metric and to the current
+    request's total (reported as X-Upstream-Bytes)."""
+    child(UPSTREAM_BYTES, kind).inc(size)
+    cell = upstream_bytes_var.get()
+    if cell is not None:
+        cell[0] += size
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, carrying the current request id and any
+    extra= fields passed to the logging call."""
+
+    _standard = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        request_id = request_id_var.get()
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in self._standard:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = "INFO"):
+    root = logging.getLogger("voxguard")
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+        root.propagate = False
+    root.setLevel(level.upper())
+
+
+class ObservabilityMiddleware:
+    """ASGI middleware: request id, in-flight gauge and latency per route.
+
+    Uses the X-Request-ID header when the caller sends one and echoes it
+    back, and reports the bytes sent upstream for the request in
+    X-Upstream-Bytes. Routes are labelled by their template (/jobs/{job_id}), never by
+    the raw path, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        started_token = request_started_var.set(started)
+        upstream = [0]
+        upstream_token = upstream_bytes_var.set(upstream)
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+                if upstream[0]:
+                    message["headers"].append((b"x-upstream-bytes", str(upstream[0]).encode()))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            label = getattr(route, "path", None) or "unmatched"
+            child(REQUEST_SECONDS, label, scope["method"], str(status["code"])).observe(time.perf_counter() - started)
+            request_id_var.reset(token)
+            request_started_var.reset(started_token)
+            upstream_bytes_var.reset(upstream_token)
+            if upstream[0]:
+                child(PAYLOAD_BYTES, "upstream_per_request").observe(upstream[0])
@@ -0,0 +1,191 @@
+import asyncio
+import io
+import threading
+import time
+import wave
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from audio import is_wav
+
+WINDOW_SECONDS = 60.0
+# Upstream stamps a request when it arrives, a little after we reserve it,
+# so our window frees a slot slightly later than theirs.
+WINDOW_SLACK_SECONDS = 1.0
+
+# Gemini bills audio at a flat 32 tokens per second and text at roughly
+# 4 characters per token; the JSON verdict is a few hundred tokens.
+AUDIO_TOKENS_PER_SECOND = 32
+CHARS_PER_TOKEN = 4
+OUTPUT_TOKENS = 300
+# Compressed formats we cannot parse are assumed to be ~128 kbps.
+COMPRESSED_BYTES_PER_SECOND = 16000
+
+
+def audio_seconds(audio: bytes) -> float:
+    """Clip duration from the WAV header, else estimated from the byte size."""
+    if is_wav(audio):
+        try:
+            with wave.open(io.BytesIO(audio)) as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (wave.Error, EOFError, ZeroDivisionError):
+            pass
+    return len(audio) / COMPRESSED_BYTES_PER_SECOND
+
+
+def estimate_tokens(audio: bytes, prompt_chars: int) -> int:
+    """Upper-end token cost of one generate_content call, before sending it."""
+    return int(audio_seconds(audio) * AUDIO_TOKENS_PER_SECOND + prompt_chars / CHARS_PER_TOKEN + OUTPUT_TOKENS)
+
+
+def is_quota_error(error: Exception) -> bool:
+    """True for upstream 429 / RESOURCE_EXHAUSTED."""
+    return getattr(error, "code", None) == 429 or str(error).startswith("429")
+
+
+class QuotaExhausted(Exception):
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ModelQuota:
+    """Sliding 60 s window of requests and tokens sent to one model."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.sent: deque = deque()
+        self.tokens = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+
+    def _expire(self, now: float):
+        while self.sent and self.sent[0][0] <= now - WINDOW_SECONDS - WINDOW_SLACK_SECONDS:
+            self.tokens -= self.sent.popleft()[1]
+
+    def wait_for(self, tokens: int, now: float) -> float:
+        """Seconds until a request of `tokens` fits in both budgets (0 = now)."""
+        self._expire(now)
+        wait = max(self.blocked_until - now, 0.0)
+        if self.rpm and len(self.sent) >= self.rpm:
+            wait = max(wait, self.sent[len(self.sent) - self.rpm][0] + WINDOW_SECONDS + WINDOW_SLACK_SECONDS - now)
+        if self.tpm and self.tokens + tokens > self.tpm:
+            if tokens > self.tpm:
+                return float("inf")
+            # Wait until enough of the oldest entries have aged out.
+            excess = self.tokens + tokens - self.tpm
+            for sent_at, cost in self.sent:
+                excess -= cost
+                if excess <= 0:
+                    wait = max(wait, sent_at + WINDOW_SECONDS + WINDOW_SLACK_SECONDS - now)
+                    break
+        return wait
+
+    def snapshot(self, now: float) -> dict:
+        self._expire(now)
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "requestsInWindow": len(self.sent),
+            "tokensInWindow": self.tokens,
+            "remainingRequests": self.rpm - len(self.sent) if self.rpm else None,
+            "remainingTokens": self.tpm - self.tokens if self.tpm else None,
+            "blockedSeconds": round(max(self.blocked_until - now, 0.0), 3),
+            "throttled": self.throttled,
+        }
+
+
+class QuotaScheduler:
+    """Per-model RPM/TPM budgets, so bursts are spread over models with
+    headroom (or briefly delayed) instead of drawing upstream 429s.
+
+    `limits` maps model -> {"rpm": n, "tpm": n}; a model without limits is
+    only held back after it has actually answered 429 (for backoff_seconds).
+    Budgets are per process; see share().
+    """
+
+    def __init__(self, limits: Optional[Dict[str, dict]] = None, max_wait_seconds: float = 2.0, backoff_seconds: float = 10.0):
+        self.limits = limits or {}
+        self.max_wait_seconds = max_wait_seconds
+        self.backoff_seconds = backoff_seconds
+        self.waited = 0
+        self.rejected = 0
+        self._models: Dict[str, ModelQuota] = {}
+        self._lock = threading.Lock()
+
+    def share(self, workers: int):
+        """Keep 1/workers of every budget, for each of `workers` processes
+        sending to the same upstream project (server.py)."""
+        with self._lock:
+            self.limits = {
+                model: {name: max(1, limit // workers) for name, limit in limits.items() if limit}
+                for model, limits in self.limits.items()
+            }
+            self._models.clear()
+
+    def quota(self, model: str) -> ModelQuota:
+        quota = self._models.get(model)
+        if quota is None:
+            limits = self.limits.get(model, {})
+            quota = self._models.setdefault(model, ModelQuota(limits.get("rpm"), limits.get("tpm")))
+        return quota
+
+    def plan(self, candidates: List[str], tokens: int) -> Tuple[List[str], float]:
+        """Candidates with headroom first (priority order kept within each
+        group), and how long until the first of them has room."""
+        now = time.monotonic()
+        with self._lock:
+            waits = {model: self.quota(model).wait_for(tokens, now) for model in candidates}
+        ready = [model for model in candidates if waits[model] == 0]
+        later = sorted((model for model in candidates if waits[model] > 0), key=lambda model: waits[model])
+        return ready + later, min(waits.values(), default=0.0)
+
+    async def schedule(self, candidates: List[str], tokens: int) -> List[str]:
+        """Order candidates by headroom, waiting up to max_wait_seconds if
+        none has any. Raises QuotaExhausted (with retry_after) otherwise."""
+        ordered, wait = self.plan(candidates, tokens)
+        if wait > 0:
+            if wait > self.max_wait_seconds:
+                self.rejected += 1
+                raise QuotaExhausted(f"All models are over their upstream quota; retry in {wait:.1f}s", wait)
+            self.waited += 1
+            await asyncio.sleep(wait)
+            ordered, _ = self.plan(candidates, tokens)
+        return ordered
+
+    def reserve(self, model: str, tokens: int) -> Optional[list]:
+        """Claim budget for one call right before sending it; None if the
+        model has no room left (another request got there first)."""
+        now = time.monotonic()
+        with self._lock:
+            quota = self.quota(model)
+            if quota.wait_for(tokens, now) > 0:
+                return None
+            entry = [now, tokens]
+            quota.sent.append(entry)
+            quota.tokens += tokens
+        return entry
+
+    def settle(self, model: str, reservation: list, actual_tokens: Optional[int]):
+        """Replace the estimate with the usage the API reported."""
+        if not actual_tokens:
+            return
+        with self._lock:
+            quota = self.quota(model)
+            if any(entry is reservation for entry in quota.sent):
+                quota.tokens += actual_tokens - reservation[1]
+                reservation[1] = actual_tokens
+
+    def throttle(self, model: str, seconds: Optional[float] = None):
+        """Upstream said 429: keep the model out of rotation for a while."""
+        with self._lock:
+            quota = self.quota(model)
+            quota.blocked_until = max(quota.blocked_until, time.monotonic() + (seconds or self.backoff_seconds))
+            quota.throttled += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            models = {model: quota.snapshot(now) for model, quota in self._models.items()}
+        return {"waited": self.waited, "rejected": self.rejected, "models": models}
@@ -0,0 +1,313 @@
+import asyncio
+import io
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import google.generativeai as genai
+from google.generativeai import caching
+
+from filerefs import FileRef
+
+log = logging.getLogger("voxguard.registry")
+
+# Forensic Inversion Strategy (The Secret Sauce)
+# Identical on every call, so it is sent once as the models' system
+# instruction (or context cache) rather than in each request.
+SYSTEM_INSTRUCTION = """
+    You are an advanced forensic acoustic engineer. Your objective is to perform a high-fidelity audit of the provided audio to distinguish between organic human speech and synthetic (AI) generation.
+
+    AUTHENTICATION PROTOCOL:
+    IDENTIFY LANGUAGE: Determine if the sample is Tamil, English, Hindi, Malayalam, or Telugu (each request names the suggested language).
+    SPECTRAL AUDIT: Analyze for 'Phase Locking' or 'Harmonic Ghosting' typical of neural vocoders.
+    TEMPORAL ANALYSIS: Check for micro-timing irregularities. AI speech often has unnatural rhythmic precision even when simulating 'naturalness.'
+
+    PROOF OF LIFE (POL) MARKERS: Scrutinize for involuntary human artifacts:
+    - Natural aspiration (breathing patterns correlated with phrasing).
+    - Dental/Labial clicks (moisture sounds in the mouth).
+    - Involuntary vocal fold tremors or organic fatigue.
+    - Background environment 'bleed' or room-tone variance.
+
+    CLASSIFICATION RULES:
+    - Classify as 'HUMAN' if you detect POL markers or irregular spectral noise consistent with organic physiology.
+    - Classify as 'AI_GENERATED' if the speech shows hyper-consistent pitch modulation, a flat 'digital' noise floor, or lack of micro-prosodic emotional resonance.
+
+    IMPORTANT: Do not be fooled by high audio quality. Focus on the underlying physical authenticity of the vocal source.
+
+    Return exactly this JSON structure, echoing the suggested language:
+    {
+        "status": "success",
+        "language": "<suggested language>",
+        "classification": "AI_GENERATED" | "HUMAN",
+        "confidenceScore": float (0.0 - 1.0),
+        "explanation": "Detailed technical justification focusing on the presence or absence of organic artifacts."
+    }
+    """
+
+# The only per-request text.
+LANGUAGE_HINT = "Suggested language: {language}. Audit the attached audio."
+
+SUPPORTED_LANGUAGES = ["Tamil", "English", "Hindi", "Malayalam", "Telugu"]
+
+
+class ModelRegistry:
+    """Process-wide Gemini setup, done once instead of per request.
+
+    Holds the configured SDK, one GenerativeModel per candidate, the
+    pre-rendered prompt per language, and the set of models the API key can
+    actually reach (refreshed in the background, as check_models.py does).
+
+    Every client carries SYSTEM_INSTRUCTION. With context_cache_ttl_seconds
+    set, the instruction is also put in a provider context cache per model
+    at startup and its TTL extended every half TTL; a model whose cache
+    cannot be created (Gemini has a minimum cacheable size, and not every
+    model supports caching) keeps the plain system instruction. Failures
+    are retried at the next refresh, except "too small": the instruction
+    will not grow, so that model is not asked again.
+    """
+
+    def __init__(self, candidates: List[str], api_key: Optional[str] = None, refresh_seconds: float = 600,
+                 api_endpoint: Optional[str] = None, context_cache_ttl_seconds: float = 0):
+        self.candidates = list(candidates)
+        self.api_key = api_key
+        self.api_endpoint = api_endpoint
+        self.refresh_seconds = refresh_seconds
+        self.live_models: Optional[List[str]] = None
+        self.probed_at: Optional[float] = None
+        self.probe_error: Optional[str] = None
+        self._clients: Dict[str, object] = {}
+        self._prompts: Dict[str, str] = {}
+        self.context_cache_ttl_seconds = context_cache_ttl_seconds
+        self._context_caches: Dict[str, caching.CachedContent] = {}
+        self._cache_owners: Dict[str, int] = {}
+        self.context_cache_errors: Dict[str, str] = {}
+        self.uncacheable: set = set()
+        self._configured_pid = None
+        # server.py sets "rest": gRPC channels opened before a fork are not fork-safe.
+        self.transport: Optional[str] = None
+        self._lock = threading.Lock()
+        self._refresh_task = None
+        self._cache_task = None
+
+    def configure(self):
+        # Again in each forked worker: SDK transports must not cross a fork.
+        with self._lock:
+            if self._configured_pid != os.getpid():
+                if self.api_endpoint:
+                    # e.g. stub_gemini.py; only the REST transport honours plain http:// hosts.
+                    genai.configure(api_key=self.api_key, transport="rest",
+                                    client_options={"api_endpoint": self.api_endpoint})
+                elif self.transport:
+                    genai.configure(api_key=self.api_key, transport=self.transport)
+                else:
+                    genai.configure(api_key=self.api_key)
+                self._configured_pid = os.getpid()
+
+    def warm_up(self):
+        """Configure the SDK, create the context caches, and pre-build
+        clients and prompt templates."""
+        self.configure()
+        if self.context_cache_ttl_seconds > 0:
+            for model_name in self.candidates:
+                # Workers forked after a preload inherit the parent's caches.
+                if model_name not in self._context_caches and model_name not in self.uncacheable:
+                    self.cache_context(model_name)
+        for model_name in self.candidates:
+            self.client(model_name)
+        for language in SUPPORTED_LANGUAGES:
+            self.prompt(language)
+
+    def client(self, model_name: str):
+        model = self._clients.get(model_name)
+        if model is None:
+            self.configure()
+            with self._lock:
+                model = self._clients.get(model_name)
+                if model is None:
+                    cache = self._context_caches.get(model_name)
+                    if cache is not None:
+                        model = genai.GenerativeModel.from_cached_content(cache)
+                    else:
+                        model = genai.GenerativeModel(model_name, system_instruction=SYSTEM_INSTRUCTION)
+                    self._clients[model_name] = model
+        return model
+
+    def _use_cache(self, model_name: str, cache: Optional[caching.CachedContent]):
+        with self._lock:
+            if cache is None:
+                self._context_caches.pop(model_name, None)
+                self._cache_owners.pop(model_name, None)
+            else:
+                self._context_caches[model_name] = cache
+                self._cache_owners[model_name] = os.getpid()
+            # Rebuilt on next use against the new cache (or none).
+            self._clients.pop(model_name, None)
+
+    def cache_context(self, model_name: str) -> bool:
+        """Create the SYSTEM_INSTRUCTION context cache for one model.
+        Blocking; on failure the model falls back to the plain instruction."""
+        self.configure()
+        try:
+            cache = caching.CachedContent.create(
+                model=model_name,
+                display_name=f"voxguard-forensic-{model_name}",
+                system_instruction=SYSTEM_INSTRUCTION,
+                ttl=timedelta(seconds=self.context_cache_ttl_seconds),
+            )
+        except Exception as e:
+            log.warning("context_cache_failed", extra={"model": model_name, "error": str(e)})
+            self.context_cache_errors[model_name] = str(e)
+            if "too small" in str(e):
+                self.uncacheable.add(model_name)
+            self._use_cache(model_name, None)
+            return False
+        self.context_cache_errors.pop(model_name, None)
+        self._use_cache(model_name, cache)
+        log.info("context_cache_created", extra={"model": model_name, "cache": cache.name})
+        return True
+
+    def refresh_context_caches(self):
+        """Extend every cache's TTL, recreating any that are gone and
+        retrying models that have none. Blocking; run off the loop."""
+        for model_name in self.candidates:
+            cache = self._context_caches.get(model_name)
+            if cache is None:
+                if model_name not in self.uncacheable:
+                    self.cache_context(model_name)
+                continue
+            try:
+                cache.update(ttl=timedelta(seconds=self.context_cache_ttl_seconds))
+            except Exception as e:
+                log.warning("context_cache_refresh_failed", extra={"model": model_name, "error": str(e)})
+                self.cache_context(model_name)
+
+    def forget_context_cache(self, model_name: str):
+        if model_name in self._context_caches:
+            self.context_cache_errors[model_name] = "cache lost; recreated on next refresh"
+            self._use_cache(model_name, None)
+
+    def delete_context_caches(self):
+        """Drop the caches this process created so they stop accruing
+        storage; inherited ones are left to the parent. Blocking."""
+        for model_name, cache in list(self._context_caches.items()):
+            if self._cache_owners.get(model_name) != os.getpid():
+                continue
+            try:
+                cache.delete()
+            except Exception as e:
+                log.warning("context_cache_delete_failed", extra={"model": model_name, "error": str(e)})
+            self._use_cache(model_name, None)
+
+    def prompt(self, language: str) -> str:
+        text = self._prompts.get(language)
+        if text is None:
+            text = LANGUAGE_HINT.format(language=language)
+            # Language is caller-supplied; don't let odd values grow this forever.
+            if len(self._prompts) < 64:
+                self._prompts[language] = text
+        return text
+
+    def upload(self, audio: bytes, mime_type: str, timeout: float = 30.0) -> FileRef:
+        """Put a clip in the provider's file storage. Blocking; run off the loop.
+
+        Waits for the file to leave PROCESSING so the first model attempt
+        does not race the provider's ingestion.
+        """
+        self.configure()
+        uploaded = genai.upload_file(io.BytesIO(audio), mime_type=mime_type)
+        deadline = time.monotonic() + timeout
+        while uploaded.state.name == "PROCESSING":
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Uploaded file {uploaded.name} still processing after {timeout:g}s")
+            time.sleep(0.5)
+            uploaded = genai.get_file(uploaded.name)
+        if uploaded.state.name != "ACTIVE":
+            raise RuntimeError(f"Uploaded file {uploaded.name} is {uploaded.state.name}")
+        return FileRef(uploaded.uri, uploaded.name, mime_type, uploaded.expiration_time.timestamp())
+
+    def delete_upload(self, name: str):
+        """Remove an uploaded clip from the provider's file storage. Blocking."""
+        self.configure()
+        genai.delete_file(name)
+
+    def probe(self):
+        """Refresh live_models from list_models(). Blocking; run off the loop."""
+        self.configure()
+        try:
+            available = {
+                m.name.split("/", 1)[-1]
+                for m in genai.list_models()
+                if "generateContent" in m.supported_generation_methods
+            }
+        except Exception as e:
+            log.warning("model_probe_failed", extra={"error": str(e)})
+            self.probe_error = str(e)
+            return
+        self.live_models = [name for name in self.candidates if name in available]
+        self.probed_at = time.time()
+        self.probe_error = None
+        log.info("models_probed", extra={"live_models": self.live_models})
+
+    def live(self, candidates: List[str]) -> List[str]:
+        """Candidates the last probe saw, in priority order.
+
+        Before the first successful probe, or if the probe found none of the
+        candidates, every candidate is returned unfiltered.
+        """
+        if not self.live_models:
+            return list(candidates)
+        live = [name for name in candidates if name in self.live_models]
+        return live or list(candidates)
+
+    async def start(self):
+        """Warm up, then probe now and every refresh_seconds in the background."""
+        await asyncio.to_thread(self.warm_up)
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        if self.context_cache_ttl_seconds > 0:
+            self._cache_task = asyncio.create_task(self._cache_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._cache_task is not None:
+            self._cache_task.cancel()
+            self._cache_task = None
+        if self._context_caches:
+            await asyncio.to_thread(self.delete_context_caches)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.to_thread(self.probe)
+            if self.refresh_seconds <= 0:
+                return
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def _cache_loop(self):
+        # Half the TTL leaves a whole retry period before anything expires.
+        while True:
+            await asyncio.sleep(self.context_cache_ttl_seconds / 2)
+            await asyncio.to_thread(self.refresh_context_caches)
+
+    def context_cache_status(self) -> dict:
+        return {
+            "ttlSeconds": self.context_cache_ttl_seconds,
+            "caches": {
+                model_name: {"name": cache.name, "expiresAt": cache.expire_time.timestamp()}
+                for model_name, cache in list(self._context_caches.items())
+            },
+            "errors": dict(self.context_cache_errors),
+            "uncacheable": sorted(self.uncacheable),
+        }
+
+    def status(self) -> dict:
+        return {
+            "candidates": self.candidates,
+            "liveModels": self.live_models,
+            "probedAt": self.probed_at,
+            "probeAgeSeconds": round(time.time() - self.probed_at, 1) if self.probed_at else None,
+            "probeError": self.probe_error,
+        }
@@ -0,0 +1,197 @@
+"""Pre-fork production server: the app is loaded once, then forked into
+WEB_CONCURRENCY worker processes sharing one listening socket.
+
+The parent imports main and warms the model registry (SDK config, clients,
+prompt templates, context caches) before forking, so workers start with
+all of it in place. Workers share:
+- per-key rate and concurrency limits, in shared memory;
+- the verdict cache's SQLite tier, the near-duplicate fingerprint index
+  and the job queue, as files;
+- Prometheus metrics, via PROMETHEUS_MULTIPROC_DIR (GET /metrics on any
+  worker reports the whole pool).
+Upstream model quotas are split evenly between workers. Breakers and
+uploaded-file handles stay per worker.
+
+On SIGTERM or SIGINT every worker stops accepting, finishes its in-flight
+requests for up to DRAIN_SECONDS, and exits. A worker that dies on its
+own is replaced, after a growing delay if it keeps dying on startup.
+
+    WEB_CONCURRENCY=4 PORT=10000 python server.py
+"""
+import glob
+import logging
+import os
+import signal
+import socket
+import tempfile
+import time
+
+import uvicorn
+from dotenv import load_dotenv
+
+log = logging.getLogger("voxguard.server")
+
+# A worker that dies within CRASH_WINDOW_SECONDS of starting counts as a
+# crash; each one in a row doubles its restart delay, up to the cap.
+CRASH_WINDOW_SECONDS = 10
+CRASH_BACKOFF_MAX_SECONDS = 30
+
+
+def prepare_state(state_dir: str):
+    """Point the shared-state settings at state_dir unless set explicitly.
+    Must run before main (and prometheus_client) is imported."""
+    os.makedirs(state_dir, exist_ok=True)
+    metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(state_dir, "metrics"))
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Files left by a previous run would be summed into this one's metrics.
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+    os.environ.setdefault("VERDICT_CACHE_DB", os.path.join(state_dir, "verdicts.db"))
+    os.environ.setdefault("FINGERPRINT_INDEX_DIR", os.path.join(state_dir, "fingerprints"))
+
+
+def preload(workers: int):
+    """Import and warm the app in the parent, ready to fork."""
+    import main
+    from admission import SharedLimits
+
+    main.model_registry.transport = main.model_registry.transport or "rest"
+    main.model_registry.warm_up()
+    # Once for the pool; a replacement worker must not requeue its siblings' jobs.
+    requeued = main.job_store.requeue_interrupted()
+    if requeued:
+        log.info("jobs_requeued", extra={"count": requeued})
+    main.job_workers.requeue_on_start = False
+    main.model_quotas.share(workers)
+    main.admission.shared = SharedLimits(main.admission.keys, workers)
+    return main
+
+
+def listen(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    # proto must be IPPROTO_TCP, not 0: asyncio only sets TCP_NODELAY on
+    # accepted sockets that say so, and without it every keep-alive
+    # response waits ~40 ms on Nagle + delayed ACK.
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    """Forks and supervises the workers of one preloaded app."""
+
+    def __init__(self, app_module, sock: socket.socket, workers: int, drain_seconds: float = 30):
+        self.app_module = app_module
+        self.sock = sock
+        self.workers = workers
+        self.drain_seconds = drain_seconds
+        self.children = {}  # pid -> worker index
+        self.started_at = {}  # worker index -> monotonic start
+        self.crashes = {}  # worker index -> early deaths in a row
+        self.respawn_at = {}  # worker index -> monotonic time to fork it again
+        self.stopping = False
+        self.kill_at = None
+
+    def spawn(self, worker: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self.run_worker(worker)
+                code = 0
+            except BaseException:
+                # os._exit skips the interpreter's own traceback printing.
+                log.exception("worker_crashed", extra={"worker": worker, "pid": os.getpid()})
+            finally:
+                os._exit(code)
+        self.children[pid] = worker
+        self.started_at[worker] = time.monotonic()
+        log.info("worker_started", extra={"worker": worker, "pid": pid})
+
+    def run_worker(self, worker: int):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # Out of the terminal's process group: Ctrl+C reaches the parent only,
+        # which then drains every worker with exactly one SIGTERM.
+        os.setpgid(0, 0)
+        self.app_module.admission.shared.worker = worker
+        config = uvicorn.Config(self.app_module.app, log_level=os.getenv("LOG_LEVEL", "INFO").lower(),
+                                timeout_graceful_shutdown=self.drain_seconds)
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def stop(self, signum=None, frame=None):
+        if self.stopping:
+            return
+        self.stopping = True
+        self.kill_at = time.monotonic() + self.drain_seconds + 5
+        self.respawn_at.clear()
+        log.info("draining", extra={"workers": len(self.children), "drain_s": self.drain_seconds})
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGTERM)
+
+    def reap(self, pid: int, status: int):
+        from prometheus_client import multiprocess
+
+        worker = self.children.pop(pid)
+        self.app_module.admission.shared.clear_worker(worker)
+        multiprocess.mark_process_dead(pid)
+        if self.stopping:
+            return
+        # Don't fork-loop on a worker that cannot start at all.
+        if time.monotonic() - self.started_at[worker] < CRASH_WINDOW_SECONDS:
+            self.crashes[worker] = self.crashes.get(worker, 0) + 1
+        else:
+            self.crashes[worker] = 0
+        delay = min(CRASH_BACKOFF_MAX_SECONDS, 2 ** (self.crashes[worker] - 1)) if self.crashes[worker] else 0
+        log.warning("worker_died", extra={"worker": worker, "pid": pid, "status": status, "restart_in_s": delay})
+        self.respawn_at[worker] = time.monotonic() + delay
+
+    def run(self):
+        for worker in range(self.workers):
+            self.spawn(worker)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while self.children or self.respawn_at:
+            pid, status = os.waitpid(-1, os.WNOHANG) if self.children else (0, 0)
+            if pid:
+                self.reap(pid, status)
+                continue
+            now = time.monotonic()
+            for worker, due in list(self.respawn_at.items()):
+                if now >= due:
+                    del self.respawn_at[worker]
+                    self.spawn(worker)
+            if self.kill_at is not None and time.monotonic() > self.kill_at:
+                log.warning("drain_timeout", extra={"workers": len(self.children)})
+                for pid in list(self.children):
+                    os.kill(pid, signal.SIGKILL)
+                self.kill_at = None
+            time.sleep(0.1)
+
+        self.app_module.model_registry.delete_context_caches()
+        log.info("server_stopped")
+
+
+if __name__ == "__main__":
+    # main loads .env too, but only once preload() imports it; the server's
+    # own settings below must come from the same place.
+    load_dotenv()
+    port = int(os.environ.get("PORT", 10000))
+    host = os.environ.get("HOST", "0.0.0.0")
+    # Worker processes; defaults to one per core.
+    workers = int(os.environ.get("WEB_CONCURRENCY") or os.cpu_count() or 1)
+    # How long a stopping worker may spend finishing in-flight requests.
+    drain_seconds = float(os.environ.get("DRAIN_SECONDS", 30))
+    # Shared verdict cache, fingerprint index and metrics files (overridable
+    # one by one with VERDICT_CACHE_DB, FINGERPRINT_INDEX_DIR and
+    # PROMETHEUS_MULTIPROC_DIR). Unset or empty: <tmp>/voxguard-<port>.
+    state_dir = os.environ.get("STATE_DIR") or os.path.join(tempfile.gettempdir(), f"voxguard-{port}")
+
+    prepare_state(state_dir)
+    app_module = preload(workers)
+    sock = listen(host, port)
+    log.info("server_started", extra={"port": port, "workers": workers, "state_dir": state_dir})
+    PreforkServer(app_module, sock, workers, drain_seconds).run()
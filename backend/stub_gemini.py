@@ -0,0 +1,261 @@
+"""Offline stand-in for the Gemini REST API, for load tests and benchmarks.
+
+Serves the calls the backend makes, GET /v1beta/models,
+POST /v1beta/models/{model}:generateContent and the /v1beta/cachedContents
+context-cache calls, with per-model latency distributions, random error
+rates and hard failures. Point the backend at
+it with GEMINI_API_ENDPOINT:
+
+    python stub_gemini.py --port 8090 --profile stub_profile.json
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8090 GEMINI_API_KEY=stub uvicorn main:app
+
+A profile is JSON; "default" applies to every model and "models"
+overrides it per model name:
+
+    {
+      "default": {"latency": {"dist": "lognormal", "median": 0.8, "sigma": 0.35},
+                  "error_rate": 0.02, "error_status": 503},
+      "models": {"gemini-3-pro-preview": {"fail": 404}}
+    }
+
+Latency dists: {"dist": "fixed", "seconds": s}, {"dist": "uniform",
+"low": a, "high": b}, {"dist": "lognormal", "median": m, "sigma": s}.
+"fail" returns that status on every call; "listed": false hides a model
+from list_models; "rpm" / "tpm" enforce per-minute request and token
+quotas with 429 RESOURCE_EXHAUSTED, counting tokens the way Gemini does
+(32 per second of audio, ~4 characters per text token).
+"prefill_seconds_per_1k_tokens" adds latency per 1000 input tokens not
+served from a context cache; "min_cache_tokens" (default 1024, the
+smallest minimum Gemini documents for any model) rejects smaller caches
+with 400, as Gemini does. "confidence" sets the verdict's confidenceScore,
+a number or a dist as above (clamped to [0, 1]; default 0.82).
+--seed makes the random draws reproducible.
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import random
+import time
+import uuid
+import wave
+from collections import Counter, deque
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# What we advertise from list_models unless the profile names others.
+DEFAULT_MODELS = ["gemini-3-pro-preview", "gemini-2.0-flash", "gemini-2.0-flash-001", "gemini-1.5-flash"]
+
+DEFAULT_PROFILE = {
+    "default": {"latency": {"dist": "lognormal", "median": 0.8, "sigma": 0.35}, "error_rate": 0.0},
+    "models": {"gemini-3-pro-preview": {"fail": 404}},
+}
+
+# Context caches below this many tokens are refused. Gemini's floor is
+# model-specific and never lower than this.
+MIN_CACHE_TOKENS = 1024
+
+STATUS_NAMES = {
+    400: "INVALID_ARGUMENT", 403: "PERMISSION_DENIED", 404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL", 503: "UNAVAILABLE", 504: "DEADLINE_EXCEEDED",
+}
+
+VERDICT = {
+    "status": "success", "language": "English", "classification": "HUMAN",
+    "confidenceScore": 0.82, "explanation": "Stub verdict: natural breathing and micro-timing variation."
+}
+
+
+def draw_latency(spec: dict, rng: random.Random) -> float:
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        return float(spec.get("seconds", 0.0))
+    if dist == "uniform":
+        return rng.uniform(spec["low"], spec["high"])
+    if dist == "lognormal":
+        # median = exp(mu), so mu = ln(median)
+        return rng.lognormvariate(0, spec.get("sigma", 0.0)) * spec["median"]
+    raise ValueError(f"Unknown latency dist: {dist}")
+
+
+def draw_confidence(spec, rng: random.Random) -> float:
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    return round(min(max(draw_latency(spec, rng), 0.0), 1.0), 3)
+
+
+def count_tokens(body: dict) -> int:
+    """Input tokens of a generateContent (or cachedContents) request body."""
+    tokens = 0
+    contents = list(body.get("contents", []))
+    if body.get("systemInstruction"):
+        contents.append(body["systemInstruction"])
+    for content in contents:
+        for part in content.get("parts", []):
+            if "text" in part:
+                tokens += len(part["text"]) // 4
+            inline = part.get("inlineData") or part.get("inline_data")
+            if inline:
+                audio = base64.b64decode(inline.get("data", ""))
+                try:
+                    with wave.open(io.BytesIO(audio)) as wav:
+                        seconds = wav.getnframes() / wav.getframerate()
+                except (wave.Error, EOFError, ZeroDivisionError):
+                    seconds = len(audio) / 16000
+                tokens += int(seconds * 32)
+    return tokens
+
+
+def google_error(status: int, message: str) -> JSONResponse:
+    return JSONResponse(
+        {"error": {"code": status, "message": message, "status": STATUS_NAMES.get(status, "UNKNOWN")}},
+        status_code=status
+    )
+
+
+def create_app(profile: Optional[dict] = None, seed: Optional[int] = None) -> FastAPI:
+    profile = profile or DEFAULT_PROFILE
+    rng = random.Random(seed)
+    calls = Counter()
+    outcomes = Counter()
+    cache_hits = Counter()
+    tokens = Counter()
+    windows = {}
+    caches = {}
+    app = FastAPI(title="Gemini stub")
+
+    def settings(model: str) -> dict:
+        return {**profile.get("default", {}), **profile.get("models", {}).get(model, {})}
+
+    @app.get("/v1beta/models")
+    async def list_models():
+        names = list(dict.fromkeys(DEFAULT_MODELS + list(profile.get("models", {}))))
+        return {"models": [
+            {"name": f"models/{name}", "supportedGenerationMethods": ["generateContent", "countTokens"]}
+            for name in names if settings(name).get("listed", True)
+        ]}
+
+    def over_quota(model: str, config: dict, tokens: int) -> bool:
+        window = windows.setdefault(model, deque())
+        now = time.monotonic()
+        while window and window[0][0] <= now - 60:
+            window.popleft()
+        if config.get("rpm") and len(window) >= config["rpm"]:
+            return True
+        if config.get("tpm") and sum(cost for _, cost in window) + tokens > config["tpm"]:
+            return True
+        window.append((now, tokens))
+        return False
+
+    def expire_time(seconds: float) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + seconds))
+
+    def cache_resource(name: str) -> dict:
+        cache = caches[name]
+        return {"name": name, "model": cache["model"], "displayName": cache.get("displayName", ""),
+                "expireTime": expire_time(cache["expires_at"] - time.time()),
+                "usageMetadata": {"totalTokenCount": cache["tokens"]}}
+
+    def live_cache(name: str) -> Optional[dict]:
+        cache = caches.get(name)
+        if cache is not None and cache["expires_at"] <= time.time():
+            del caches[name]
+            cache = None
+        return cache
+
+    @app.post("/v1beta/cachedContents")
+    async def create_cache(request: Request):
+        body = await request.json()
+        model = body.get("model", "").split("/", 1)[-1]
+        calls["cachedContents.create"] += 1
+        tokens = count_tokens(body)
+        if tokens < settings(model).get("min_cache_tokens", MIN_CACHE_TOKENS):
+            return google_error(400, f"Cached content is too small. total_token_count={tokens}")
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        caches[name] = {"model": f"models/{model}", "displayName": body.get("displayName", ""), "tokens": tokens,
+                        "expires_at": time.time() + float(body.get("ttl", "3600s").rstrip("s"))}
+        return cache_resource(name)
+
+    @app.patch("/v1beta/cachedContents/{cache_id}")
+    async def update_cache(cache_id: str, request: Request):
+        name = f"cachedContents/{cache_id}"
+        calls["cachedContents.update"] += 1
+        if live_cache(name) is None:
+            return google_error(404, f"{name} not found (stub)")
+        body = await request.json()
+        caches[name]["expires_at"] = time.time() + float(body.get("ttl", "3600s").rstrip("s"))
+        return cache_resource(name)
+
+    @app.delete("/v1beta/cachedContents/{cache_id}")
+    async def delete_cache(cache_id: str):
+        calls["cachedContents.delete"] += 1
+        caches.pop(f"cachedContents/{cache_id}", None)
+        return {}
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        body = await request.json()
+        calls[model] += 1
+        config = settings(model)
+        cached_tokens = 0
+        if body.get("cachedContent"):
+            cache = live_cache(body["cachedContent"])
+            if cache is None:
+                outcomes[f"{model}:403"] += 1
+                return google_error(403, f"CachedContent not found (or expired): {body['cachedContent']}")
+            cached_tokens = cache["tokens"]
+            cache_hits[model] += 1
+        prompt_tokens = count_tokens(body) + cached_tokens
+        output_tokens = len(json.dumps(VERDICT)) // 4
+
+        if over_quota(model, config, prompt_tokens + output_tokens):
+            outcomes[f"{model}:429"] += 1
+            return google_error(429, f"Quota exceeded for models/{model} (stub)")
+
+        prefill = config.get("prefill_seconds_per_1k_tokens", 0.0) * (prompt_tokens - cached_tokens) / 1000
+        await asyncio.sleep(draw_latency(config.get("latency", {}), rng) + prefill)
+        if config.get("fail"):
+            outcomes[f"{model}:{config['fail']}"] += 1
+            return google_error(config["fail"], f"models/{model} is not available (stub)")
+        if rng.random() < config.get("error_rate", 0.0):
+            status = config.get("error_status", 503)
+            outcomes[f"{model}:{status}"] += 1
+            return google_error(status, "The model is overloaded (stub)")
+
+        outcomes[f"{model}:200"] += 1
+        tokens[model] += prompt_tokens + output_tokens
+        verdict = {**VERDICT, "confidenceScore": draw_confidence(config.get("confidence", VERDICT["confidenceScore"]), rng)}
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(verdict)}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "cachedContentTokenCount": cached_tokens,
+                              "candidatesTokenCount": output_tokens, "totalTokenCount": prompt_tokens + output_tokens},
+        }
+
+    @app.get("/stub/stats")
+    async def stats():
+        return {"calls": dict(calls), "outcomes": dict(outcomes),
+                "caches": len(caches), "cacheHits": dict(cache_hits), "tokens": dict(tokens)}
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--profile", help="JSON profile file (default: 404 for gemini-3-pro-preview, ~0.8 s lognormal)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    profile = None
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+    uvicorn.run(create_app(profile, args.seed), host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,176 @@
+import asyncio
+import base64
+import itertools
+import json
+import time
+
+import httpx
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from admission import AdmissionController, KeyStore, Rejected, TokenBucket
+
+NOISY = {"x-api-key": "sk_noisy"}
+QUIET = {"x-api-key": "sk_quiet"}
+clip_ids = itertools.count()
+
+
+def payload():
+    audio = f"admission-{next(clip_ids)}".encode()
+    return {"language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(audio).decode()}
+
+
+@pytest.fixture
+def limits(monkeypatch, models):
+    models.delay = 0.3
+
+    def install(max_in_flight=32, **keys):
+        controller = AdmissionController(KeyStore(keys), max_in_flight=max_in_flight)
+        monkeypatch.setattr(main, "admission", controller)
+        return controller
+    return install
+
+
+async def fire(requests):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[
+            client.post("/api/voice-detection", headers=headers, json=payload()) for headers in requests
+        ])
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.take() == 0 and bucket.take() == 0
+    wait = bucket.take()
+    assert 0 < wait <= 0.1
+    time.sleep(wait + 0.01)
+    assert bucket.take() == 0
+    assert TokenBucket(rate=0, burst=0).take() == 0
+
+
+def test_rate_limited_key_gets_429_with_retry_after(limits, client):
+    limits(sk_noisy={"name": "noisy", "ratePerSecond": 0.5, "burst": 1})
+
+    first = client.post("/api/voice-detection", headers=NOISY, json=payload())
+    second = client.post("/api/voice-detection", headers=NOISY, json=payload())
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.headers["retry-after"] == "2"
+    assert second.json()["detail"] == {"status": "error", "message": "Rate limit exceeded for key 'noisy'"}
+
+
+def test_concurrency_cap_isolates_noisy_tenant(limits):
+    controller = limits(
+        sk_noisy={"name": "noisy", "ratePerSecond": 0, "maxConcurrent": 2},
+        sk_quiet={"name": "quiet", "ratePerSecond": 0, "maxConcurrent": 2},
+    )
+
+    responses = asyncio.run(fire([NOISY] * 6 + [QUIET]))
+    noisy = [r.status_code for r in responses[:6]]
+
+    assert noisy.count(200) == 2 and noisy.count(429) == 4
+    assert responses[6].status_code == 200
+    stats = {key["name"]: key for key in controller.stats()["keys"]}
+    assert stats["noisy"]["concurrencyLimited"] == 4
+    assert stats["noisy"]["inFlight"] == 0
+
+
+def test_saturated_server_sheds_with_503(limits):
+    controller = limits(max_in_flight=3, sk_noisy={"ratePerSecond": 0, "maxConcurrent": 0})
+
+    started = time.perf_counter()
+    responses = asyncio.run(fire([NOISY] * 8))
+    elapsed = time.perf_counter() - started
+
+    codes = [r.status_code for r in responses]
+    assert codes.count(200) == 3 and codes.count(503) == 5
+    shed = next(r for r in responses if r.status_code == 503)
+    assert int(shed.headers["retry-after"]) >= 1
+    # Shed requests are turned away, not queued behind the admitted ones.
+    assert elapsed < 0.3 * 2
+    assert controller.stats()["shed"] == 5
+
+
+def test_turned_away_request_keeps_its_rate_token():
+    controller = AdmissionController(KeyStore({"sk_noisy": {"ratePerSecond": 0.01, "burst": 2, "maxConcurrent": 1}}))
+    tenant = controller.admit("sk_noisy")
+
+    with pytest.raises(Rejected) as rejected:
+        controller.admit("sk_noisy")
+    assert rejected.value.status == 429 and "concurrent" in rejected.value.message
+
+    controller.release(tenant, 0.1)
+    assert controller.admit("sk_noisy") is tenant
+
+
+def test_job_long_poll_is_admitted(limits, client):
+    limits(sk_noisy={"name": "noisy", "ratePerSecond": 0.5, "burst": 1})
+
+    assert client.get("/jobs/nope", headers=NOISY).status_code == 404
+    assert client.get("/jobs/nope", headers=NOISY).status_code == 429
+
+
+def test_websocket_holds_a_slot_until_it_closes(limits, client):
+    controller = limits(sk_noisy={"name": "noisy", "ratePerSecond": 0, "maxConcurrent": 1})
+
+    with client.websocket_connect("/ws/voice-detection?api_key=sk_noisy"):
+        assert controller.stats()["inFlight"] == 1
+        with pytest.raises(WebSocketDisconnect) as rejected:
+            with client.websocket_connect("/ws/voice-detection", headers=NOISY):
+                pass
+    assert rejected.value.code == 1013
+    assert rejected.value.reason == "Too many concurrent requests for key 'noisy'"
+    assert controller.stats()["inFlight"] == 0
+
+
+def test_batch_pays_a_rate_token_per_clip(limits, client):
+    limits(sk_noisy={"ratePerSecond": 0.01, "burst": 4}, sk_quiet={"ratePerSecond": 0.01, "burst": 4})
+
+    def batch(headers, n):
+        return client.post("/api/voice-detection/batch", headers=headers, json={"clips": [payload() for _ in range(n)]})
+
+    assert batch(NOISY, 3).status_code == 200
+    # Admitted with the last token, then short of one for its second clip.
+    limited = batch(NOISY, 2)
+    assert limited.status_code == 429 and int(limited.headers["retry-after"]) > 1
+    # More clips than the burst could ever pay for.
+    assert batch(QUIET, 6).status_code == 413
+
+
+def test_batch_fan_out_stays_within_the_key_concurrency_cap(limits, client, models):
+    limits(sk_noisy={"ratePerSecond": 0, "maxConcurrent": 2})
+    running, peak = [0], [0]
+
+    def respond(model_name, contents):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        time.sleep(0.1)
+        running[0] -= 1
+        return models.verdict
+
+    models.respond = respond
+    response = client.post("/api/voice-detection/batch", headers=NOISY, json={"clips": [payload() for _ in range(6)]})
+
+    assert response.status_code == 200
+    assert peak[0] == 2
+
+
+def test_unknown_key_is_left_to_endpoint_auth(limits, client):
+    limits(sk_noisy={})
+
+    assert client.post("/api/voice-detection", headers={"x-api-key": "nope"}, json=payload()).status_code == 401
+    assert client.get("/", headers=NOISY).status_code == 200
+
+
+def test_keys_from_json_and_legacy_key(tmp_path):
+    path = tmp_path / "keys.json"
+    path.write_text(json.dumps({"sk_file": {"name": "file", "maxConcurrent": 3}}))
+    keys = KeyStore.from_sources("sk_legacy", keys_json='{"sk_env": {"ratePerSecond": 2}}', keys_file=str(path), burst=5)
+
+    assert keys.get("sk_file").max_concurrent == 3
+    assert keys.get("sk_env").bucket.rate == 2 and keys.get("sk_env").bucket.burst == 5
+    assert keys.get("sk_legacy").name == "default"
+    assert keys.get("sk_missing") is None and keys.get(None) is None
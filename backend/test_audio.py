@@ -0,0 +1,87 @@
+import base64
+import io
+import wave
+
+import numpy as np
+
+import main
+from audio import decode_pcm, mime_type_for, normalize_audio, resample, trim_silence
+from prescreen import PreScreener
+
+
+def stereo_wav(seconds_voice=2.0, seconds_silence=3.0, rate=44100):
+    """Stereo 16-bit call recording: silence, a wobbling voice-band tone, silence."""
+    t = np.arange(int(rate * seconds_voice)) / rate
+    voice = 0.4 * np.sin(2 * np.pi * (180 + 30 * np.sin(2 * np.pi * 2 * t)) * t)
+    gap = np.zeros(int(rate * seconds_silence))
+    mono = np.concatenate([gap, voice, gap])
+    pcm = (np.stack([mono, mono], axis=1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def test_mime_type_follows_audio_format():
+    assert mime_type_for("mp3") == "audio/mp3"
+    assert mime_type_for("OGG") == "audio/ogg"
+    assert mime_type_for("audio/x-wav") == "audio/wav"
+    assert mime_type_for("mp3", stereo_wav(0.1, 0.0)) == "audio/wav"
+    assert mime_type_for("something-else") == "audio/mp3"
+
+
+def test_trim_silence_keeps_padding():
+    rate = 1000
+    samples = np.concatenate([np.zeros(2000), np.full(500, 0.5), np.zeros(2000)]).astype(np.float32)
+
+    trimmed = trim_silence(samples, rate)
+
+    assert len(trimmed) == 500 + 2 * 100
+    assert len(trim_silence(np.zeros(1000, dtype=np.float32), rate)) == 0
+
+
+def test_resample_preserves_pitch():
+    t = np.arange(44100) / 44100
+    out = resample(np.sin(2 * np.pi * 440 * t).astype(np.float32), 44100, 16000)
+
+    assert len(out) == 16000
+    assert np.argmax(np.abs(np.fft.rfft(out))) == 440
+
+
+def test_normalize_shrinks_stereo_call_recording():
+    original = stereo_wav()
+
+    result = normalize_audio(original, "audio/wav", target_rate=16000, max_seconds=60)
+    samples, rate = decode_pcm(result.audio)
+
+    assert result.changed and result.mime_type == "audio/wav"
+    assert rate == 16000
+    assert 2.0 <= len(samples) / rate <= 2.3
+    assert len(result.audio) < len(original) / 10
+
+
+def test_normalize_caps_duration_and_passes_through_unknown_formats():
+    capped = normalize_audio(stereo_wav(10.0, 0.0), "audio/wav", max_seconds=4)
+    assert abs(capped.duration_seconds - 4.0) < 0.01
+
+    mp3 = b"\xff\xf3\x84\x00" * 100
+    assert normalize_audio(mp3, "audio/mp3").audio is mp3
+
+
+def test_endpoint_uploads_normalized_audio(models, client, headers, monkeypatch):
+    monkeypatch.setattr(main, "prescreener", PreScreener(enabled=False))
+    original = stereo_wav()
+    client.post("/api/voice-detection", headers=headers, json={
+        "language": "English", "audioFormat": "wav", "audioBase64": base64.b64encode(original).decode()
+    })
+    client.post("/api/voice-detection", headers=headers, json={
+        "language": "English", "audioFormat": "ogg", "audioBase64": base64.b64encode(b"OggS-not-decodable").decode()
+    })
+
+    received = [part["inline_data"] for part in models.audio]
+    assert received[0]["mime_type"] == "audio/wav"
+    assert len(received[0]["data"]) < len(original) / 10
+    assert received[1] == {"mime_type": "audio/ogg", "data": b"OggS-not-decodable"}
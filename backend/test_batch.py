@@ -0,0 +1,71 @@
+import base64
+import time
+
+import pytest
+
+import main
+
+
+def clip(payload: bytes, clip_id=None):
+    return {"id": clip_id, "language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(payload).decode()}
+
+
+def sent(models):
+    return [part["inline_data"]["data"] for part in models.audio]
+
+
+@pytest.fixture
+def stub(models):
+    """Echoes each clip's audio back as the explanation."""
+    def respond(model_name, contents):
+        data = contents[0]["parts"][1]["inline_data"]["data"]
+        if data == b"poison":
+            raise Exception("400 unsupported audio")
+        time.sleep(0.05)
+        return {**models.verdict, "explanation": data.decode()}
+
+    models.respond = respond
+    return models
+
+
+def test_batch_deduplicates_and_keeps_order(stub, client, headers):
+    resp = client.post("/api/voice-detection/batch", headers=headers, json={"clips": [
+        clip(b"a", "first"), clip(b"b"), clip(b"a", "again")
+    ]})
+
+    body = resp.json()
+    assert resp.status_code == 200
+    assert body["uniqueClips"] == 2 and body["duplicates"] == 1
+    assert [r["result"]["explanation"] for r in body["results"]] == ["a", "b", "a"]
+    assert [r["id"] for r in body["results"]] == ["first", None, "again"]
+    assert sorted(sent(stub)) == [b"a", b"b"]
+
+
+def test_one_bad_clip_does_not_sink_the_batch(stub, client, headers):
+    resp = client.post("/api/voice-detection/batch", headers=headers, json={"clips": [
+        clip(b"fine"), clip(b"poison"), {"language": "English", "audioFormat": "mp3", "audioBase64": "not base64!"}
+    ]})
+
+    statuses = [(r["status"], r["message"]) for r in resp.json()["results"]]
+    assert resp.status_code == 200
+    assert statuses[0] == ("success", None)
+    assert statuses[1][0] == "error" and "unsupported audio" in statuses[1][1]
+    assert statuses[2] == ("error", "audioBase64 is not valid base64")
+
+
+def test_batch_fans_out_concurrently(stub, client, headers, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_CONCURRENCY", 8)
+
+    start = time.perf_counter()
+    client.post("/api/voice-detection/batch", headers=headers, json={"clips": [clip(f"c{i}".encode()) for i in range(8)]})
+
+    assert time.perf_counter() - start < 8 * 0.05
+
+
+def test_batch_size_limit(stub, client, headers, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_CLIPS", 2)
+
+    resp = client.post("/api/voice-detection/batch", headers=headers, json={"clips": [clip(b"1"), clip(b"2"), clip(b"3")]})
+
+    assert resp.status_code == 413
+    assert sent(stub) == []
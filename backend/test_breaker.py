@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+import time
+
+from google.api_core.exceptions import NotFound
+
+import main
+from breaker import BreakerBoard, CircuitBreaker, is_outage
+
+clip_ids = itertools.count()
+
+
+def analyze_fresh_clip():
+    audio = f"breaker-clip-{next(clip_ids)}".encode()
+    return asyncio.run(main.analyze("English", audio, "audio/mp3"))
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.acquire()
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.acquire()
+    assert not breaker.acquire()  # only one trial call at a time
+
+    breaker.record_success(0.2)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_route_forces_full_list_when_everything_is_open():
+    board = BreakerBoard(failure_threshold=1, cooldown_seconds=60)
+    board.get("a").record_failure()
+    assert board.route(["a", "b"]) == (["b"], False)
+
+    board.get("b").record_failure()
+    assert board.route(["a", "b"]) == (["a", "b"], True)
+
+
+def test_only_timeouts_transport_errors_5xx_and_missing_models_are_outages():
+    assert is_outage(TimeoutError("No response within 30s"))
+    assert is_outage(ConnectionResetError("connection reset by peer"))
+    assert is_outage(Exception("503 overloaded"))
+    assert is_outage(NotFound("models/gemini-3-pro-preview is not found"))
+    assert is_outage(Exception("403 permission denied"))
+    assert not is_outage(Exception("400 corrupt audio"))
+    assert not is_outage(Exception("429 quota"))
+    assert not is_outage(ValueError("Expecting value: line 1 column 1"))
+
+
+def test_client_errors_leave_the_breaker_closed(models, monkeypatch):
+    models.errors["gemini-3-pro-preview"] = Exception("400 unsupported audio")
+    monkeypatch.setattr(main, "model_breakers", BreakerBoard(failure_threshold=2, cooldown_seconds=60))
+
+    for _ in range(3):
+        analyze_fresh_clip()
+
+    assert models.calls.count("gemini-3-pro-preview") == 3
+    assert main.model_breakers.get("gemini-3-pro-preview").state == CircuitBreaker.CLOSED
+
+
+def test_unavailable_model_is_skipped_after_threshold(models, monkeypatch):
+    models.errors["gemini-3-pro-preview"] = Exception("503 model overloaded")
+    monkeypatch.setattr(main, "model_breakers", BreakerBoard(failure_threshold=2, cooldown_seconds=60))
+
+    for _ in range(5):
+        assert "gemini-2.0-flash" in analyze_fresh_clip().explanation
+
+    assert models.calls.count("gemini-3-pro-preview") == 2
+    assert main.model_breakers.get("gemini-3-pro-preview").state == CircuitBreaker.OPEN
+
+
+def test_model_that_keeps_returning_404_is_skipped(models, monkeypatch):
+    models.errors["gemini-3-pro-preview"] = NotFound("models/gemini-3-pro-preview is not found")
+    monkeypatch.setattr(main, "model_breakers", BreakerBoard(failure_threshold=2, cooldown_seconds=60))
+
+    for _ in range(6):
+        assert "gemini-2.0-flash" in analyze_fresh_clip().explanation
+
+    assert len(models.calls) == 6 + 2
+    assert main.model_breakers.get("gemini-3-pro-preview").snapshot()["state"] == CircuitBreaker.OPEN
+
+
+def test_hedged_mode_keeps_first_answer(models, monkeypatch):
+    models.delays["gemini-3-pro-preview"] = 1.0
+    monkeypatch.setattr(main, "model_breakers", BreakerBoard())
+    monkeypatch.setattr(main, "HEDGE_AFTER_SECONDS", 0.1)
+
+    start = time.perf_counter()
+    result = analyze_fresh_clip()
+    elapsed = time.perf_counter() - start
+
+    assert "gemini-2.0-flash" in result.explanation
+    assert elapsed < 0.5
@@ -0,0 +1,117 @@
+import asyncio
+import base64
+import multiprocessing
+import sqlite3
+import threading
+import time
+
+import main
+from cache import VerdictCache, cache_key
+
+VERDICT = {
+    "status": "success",
+    "language": "Tamil",
+    "classification": "AI_GENERATED",
+    "confidenceScore": 0.97,
+    "explanation": "flat noise floor"
+}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = VerdictCache(max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    cache.get("a")
+    cache.put("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = VerdictCache(ttl_seconds=0.05)
+    cache.put("a", {"v": 1})
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "verdicts.db")
+    VerdictCache(db_path=db).put("a", VERDICT)
+
+    reopened = VerdictCache(db_path=db)
+    assert reopened.get("a") == VERDICT
+    assert reopened.stats()["diskHits"] == 1
+
+
+def test_sqlite_tier_is_shared_across_forked_workers(tmp_path):
+    cache = VerdictCache(db_path=str(tmp_path / "verdicts.db"))
+    cache.get("warm")  # parent's connection is open before the fork
+
+    worker = multiprocessing.get_context("fork").Process(target=cache.put, args=("k", VERDICT))
+    worker.start()
+    worker.join(10)
+
+    assert worker.exitcode == 0
+    assert cache.get("k") == VERDICT
+    assert cache.stats()["diskHits"] == 1
+
+
+def test_async_access_keeps_sqlite_off_the_event_loop(tmp_path):
+    cache = VerdictCache(db_path=str(tmp_path / "verdicts.db"))
+    threads = []
+    conn = cache._conn
+    cache._conn = lambda: threads.append(threading.current_thread()) or conn()
+
+    async def roundtrip():
+        await cache.aput("a", VERDICT)
+        cache._entries.clear()  # force the disk tier
+        return await cache.aget("a")
+
+    assert asyncio.run(roundtrip()) == VERDICT
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    assert cache.stats()["diskHits"] == 1
+
+
+def test_expired_rows_are_swept(tmp_path):
+    db = str(tmp_path / "verdicts.db")
+    cache = VerdictCache(ttl_seconds=0.05, db_path=db)
+    cache.put("old", VERDICT)
+    time.sleep(0.1)
+    cache.put("new", VERDICT)
+
+    def rows():
+        return sqlite3.connect(db).execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    assert rows() == 2
+    assert cache.sweep() == 1
+    assert rows() == 1 and cache.stats()["swept"] == 1
+
+
+def test_key_depends_on_audio_language_and_version():
+    base = cache_key(b"clip", "Tamil", "v1")
+
+    assert base == cache_key(b"clip", "tamil", "v1")
+    assert base != cache_key(b"clip2", "Tamil", "v1")
+    assert base != cache_key(b"clip", "Hindi", "v1")
+    assert base != cache_key(b"clip", "Tamil", "v2")
+
+
+def test_repeated_clip_skips_model(models, client, headers, monkeypatch):
+    models.verdict = VERDICT
+    monkeypatch.setattr(main, "verdict_cache", VerdictCache())
+    payload = {
+        "language": "Tamil",
+        "audioFormat": "mp3",
+        "audioBase64": base64.b64encode(b"replayed scam recording").decode()
+    }
+
+    first = client.post("/api/voice-detection", headers=headers, json=payload)
+    second = client.post("/api/voice-detection", headers=headers, json=payload)
+
+    assert first.json() == second.json() == {**VERDICT, "tier": "full"}
+    assert len(models.calls) == 1
+    stats = client.get("/cache/stats", headers=headers).json()
+    assert stats["hits"] == 1 and stats["misses"] == 1
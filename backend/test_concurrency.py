@@ -0,0 +1,71 @@
+import asyncio
+import base64
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+import main
+
+STUB_DELAY = 0.5
+clip_ids = itertools.count()
+
+
+def unique_payload():
+    # Distinct audio per request so the verdict cache never short-circuits the stub.
+    audio = f"clip-{next(clip_ids)}".encode()
+    return {"language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(audio).decode()}
+
+
+async def fire(n, headers):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/voice-detection", headers=headers, json=unique_payload())
+            for _ in range(n)
+        ])
+        return time.perf_counter() - start, responses
+
+
+def test_concurrent_requests_do_not_serialize(models, headers):
+    models.delay = STUB_DELAY
+
+    n = main.MODEL_CONCURRENCY
+    single, _ = asyncio.run(fire(1, headers))
+    elapsed, responses = asyncio.run(fire(n, headers))
+
+    assert all(r.status_code == 200 for r in responses)
+    # Serialized handling would take n * STUB_DELAY.
+    assert elapsed < single * 2, f"1 request: {single:.2f}s, {n} concurrent: {elapsed:.2f}s"
+
+
+def test_model_timeout_falls_through_to_next_candidate(models, headers, monkeypatch):
+    models.delay = STUB_DELAY
+    models.delays[main.MODEL_CANDIDATES[0]] = STUB_DELAY * 3
+    monkeypatch.setattr(main, "MODEL_TIMEOUT_SECONDS", STUB_DELAY)
+
+    _, responses = asyncio.run(fire(1, headers))
+
+    assert responses[0].status_code == 200
+    assert "gemini-2.0-flash" in responses[0].json()["explanation"]
+
+
+def test_hung_model_frees_its_workers_and_spares_healthy_breakers(models, headers, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(main, "model_executor", pool)
+    monkeypatch.setattr(main, "MODEL_TIMEOUT_SECONDS", STUB_DELAY)
+    primary, *fallbacks = main.MODEL_CANDIDATES
+    models.delay = 0.05
+    models.delays[primary] = 60
+
+    try:
+        _, responses = asyncio.run(fire(4, headers))
+    finally:
+        pool.shutdown(wait=False)
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert set(models.timeouts) == {STUB_DELAY}
+    breakers = main.model_breakers.snapshot()
+    assert all(breakers[name]["failures"] == 0 for name in fallbacks if name in breakers)
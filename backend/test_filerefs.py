@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from filerefs import FileRef, FileRefCache
+
+PRIMARY, SECONDARY = main.MODEL_CANDIDATES[:2]
+BIG = b"\xff\xfb" * 50_000
+
+
+def payload(audio: bytes, language: str = "English"):
+    return {"language": language, "audioFormat": "mp3", "audioBase64": base64.b64encode(audio).decode()}
+
+
+@pytest.fixture
+def provider(monkeypatch, models):
+    """Stub file storage plus models; the primary model always fails."""
+    state = SimpleNamespace(uploads=[], deleted=[], models=models, fail_upload=False, expires_in=timedelta(hours=48))
+
+    def upload_file(file, mime_type):
+        if state.fail_upload:
+            raise Exception("503 upload backend unavailable")
+        data = file.read()
+        time.sleep(0.05)
+        state.uploads.append(len(data))
+        return SimpleNamespace(
+            name=f"files/clip{len(state.uploads)}", uri=f"https://files.example/clip{len(state.uploads)}",
+            state=SimpleNamespace(name="ACTIVE"), expiration_time=datetime.now(timezone.utc) + state.expires_in
+        )
+
+    models.errors[PRIMARY] = Exception("500 internal error")
+    monkeypatch.setattr(main.genai, "upload_file", upload_file)
+    monkeypatch.setattr(main.genai, "delete_file", state.deleted.append)
+    monkeypatch.setattr(main.audio_uploader, "min_bytes", 10_000)
+    return state
+
+
+def sent(provider):
+    """(model, audio part) for every model call."""
+    return list(zip(provider.models.calls, provider.models.audio))
+
+
+def test_large_clip_is_uploaded_once_and_referenced_by_every_attempt(provider, client, headers):
+    response = client.post("/api/voice-detection", headers=headers, json=payload(BIG))
+
+    assert response.status_code == 200
+    assert provider.uploads == [len(BIG)]
+    assert [model for model, _ in sent(provider)] == [PRIMARY, SECONDARY]
+    assert all(part == {"file_data": {"mime_type": "audio/mp3", "file_uri": "https://files.example/clip1"}}
+               for _, part in sent(provider))
+    # The audio went up once; two attempts would have been 2x inline.
+    prompt = len(main.model_registry.prompt("English"))
+    assert int(response.headers["x-upstream-bytes"]) == len(BIG) + 2 * prompt
+
+
+def test_repeat_clip_reuses_cached_handle(provider, client, headers):
+    client.post("/api/voice-detection", headers=headers, json=payload(BIG, "English"))
+    repeat = client.post("/api/voice-detection", headers=headers, json=payload(BIG, "Tamil"))
+
+    assert repeat.status_code == 200
+    assert len(provider.uploads) == 1
+    assert main.audio_uploader.stats()["handles"]["hits"] == 1
+    assert int(repeat.headers["x-upstream-bytes"]) < len(BIG)
+
+
+def test_concurrent_requests_share_one_upload(provider, headers):
+    async def fire():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.post("/api/voice-detection", headers=headers, json=payload(BIG, language))
+                for language in ("English", "Hindi", "Telugu")
+            ])
+
+    responses = asyncio.run(fire())
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert len(provider.uploads) == 1
+
+
+def test_small_clips_stay_inline(provider, client, headers):
+    client.post("/api/voice-detection", headers=headers, json=payload(b"tiny clip"))
+
+    assert provider.uploads == []
+    assert all("inline_data" in part for _, part in sent(provider))
+
+
+def test_failed_upload_falls_back_to_inline(provider, client, headers):
+    provider.fail_upload = True
+    response = client.post("/api/voice-detection", headers=headers, json=payload(BIG))
+
+    assert response.status_code == 200
+    assert all(part["inline_data"]["data"] == BIG for _, part in sent(provider))
+    assert main.audio_uploader.stats()["uploadFailures"] == 1
+
+
+def test_handle_close_to_expiry_is_uploaded_again(provider, client, headers):
+    provider.expires_in = timedelta(minutes=5)
+    client.post("/api/voice-detection", headers=headers, json=payload(BIG, "English"))
+    client.post("/api/voice-detection", headers=headers, json=payload(BIG, "Hindi"))
+
+    assert len(provider.uploads) == 2
+    assert main.audio_uploader.stats()["handles"]["expired"] >= 1
+
+
+def test_evicted_and_leftover_files_are_deleted(provider, headers, monkeypatch):
+    monkeypatch.setattr(main.audio_uploader.cache, "max_entries", 1)
+
+    with TestClient(main.app) as client:
+        for clip in (BIG, BIG + b"\x00\x01"):
+            assert client.post("/api/voice-detection", headers=headers, json=payload(clip)).status_code == 200
+
+    assert provider.deleted == ["files/clip1", "files/clip2"]
+    assert main.audio_uploader.stats()["deletes"] == 2
+    assert main.audio_uploader.stats()["handles"]["entries"] == 0
+
+
+def test_cache_evicts_expired_before_live_handles():
+    cache = FileRefCache(max_entries=2, margin_seconds=60)
+    now = time.time()
+    # Too close to expiry to keep, but its own request is still using the file.
+    assert cache.put("stale", FileRef("u0", "files/0", "audio/mp3", now + 30)) == []
+    cache.put("a", FileRef("u1", "files/1", "audio/mp3", now + 3600))
+    cache.put("b", FileRef("u2", "files/2", "audio/mp3", now + 3600))
+    assert [ref.name for ref in cache.put("c", FileRef("u3", "files/3", "audio/mp3", now + 3600))] == ["files/1"]
+
+    assert cache.get("stale") is None
+    assert cache.get("a") is None
+    assert cache.get("b").uri == "u2" and cache.get("c").uri == "u3"
+    assert cache.stats()["expired"] == 1 and cache.stats()["evictions"] == 1
@@ -0,0 +1,154 @@
+import base64
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from audio import decode_pcm, encode_wav, resample
+from fingerprint import FingerprintIndex, fingerprint
+from loadgen import make_clips
+
+RATE = 16000
+CLIPS = [decode_pcm(clip)[0] for clip in make_clips(6)]
+
+
+def variants(samples):
+    """Copies of a clip a caller might plausibly resend."""
+    noise = np.random.default_rng(3).normal(0, 0.003, len(samples)).astype(np.float32)
+    return {
+        "quieter": samples * 0.5,
+        "reencoded_8khz": resample(resample(samples, RATE, 8000), 8000, RATE),
+        "trimmed": samples[int(0.23 * RATE):-int(0.3 * RATE)],
+        "noisy": samples + noise,
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "index"))
+    for i, samples in enumerate(CLIPS[:3]):
+        index.add(fingerprint(samples, RATE), "v1:english", {"clip": i})
+    return index
+
+
+def test_variants_match_their_original(index):
+    for i, samples in enumerate(CLIPS[:3]):
+        for name, variant in variants(samples).items():
+            match = index.lookup(fingerprint(variant, RATE), "v1:english")
+            assert match is not None and match.verdict == {"clip": i}, name
+            assert match.similarity >= index.threshold
+
+
+def test_unrelated_clips_and_other_scopes_miss(index):
+    assert all(index.lookup(fingerprint(samples, RATE), "v1:english") is None for samples in CLIPS[3:])
+    assert index.lookup(fingerprint(CLIPS[0], RATE), "v1:tamil") is None
+    assert fingerprint(np.zeros(3 * RATE, np.float32), RATE) is None
+
+
+def test_index_creates_no_files_until_first_use(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "index"))
+    assert not (tmp_path / "index").exists()
+
+    assert index.lookup(fingerprint(CLIPS[0], RATE), "v1:english") is None
+    assert sorted(os.listdir(tmp_path / "index")) == ["entries.i64", "frames.u32", "records.jsonl"]
+
+
+def test_merged_index_is_reopened_from_disk(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "index"), merge_every=1)
+    for i, samples in enumerate(CLIPS[:2]):
+        index.add(fingerprint(samples, RATE), "v1:english", {"clip": i})
+    index.add(fingerprint(CLIPS[2], RATE), "v1:english", {"clip": 2})
+    index.flush()
+
+    reopened = FingerprintIndex(str(tmp_path / "index"))
+    assert reopened.stats()["clips"] == 3
+    assert reopened.stats()["indexedClips"] == 3
+    for i, samples in enumerate(CLIPS[:3]):
+        assert reopened.lookup(fingerprint(samples * 0.7, RATE), "v1:english").verdict == {"clip": i}
+
+
+def test_reader_survives_merges_by_another_worker(tmp_path, monkeypatch):
+    writer = FingerprintIndex(str(tmp_path / "index"), merge_every=1)
+    writer.add(fingerprint(CLIPS[0], RATE), "v1:english", {"clip": 0})
+    writer.flush()
+    reader = FingerprintIndex(str(tmp_path / "index"))
+
+    # The reader sees the manifest of one generation, but before it opens
+    # that generation's files the writer merges twice more.
+    real_load = np.load
+
+    def load_after_merges(path, *args, **kwargs):
+        monkeypatch.setattr(np, "load", real_load)
+        for i in (1, 2):
+            writer.add(fingerprint(CLIPS[i], RATE), "v1:english", {"clip": i})
+            writer.flush()
+        return real_load(path, *args, **kwargs)
+
+    writer.add(fingerprint(CLIPS[3], RATE), "v1:english", {"clip": 3})
+    writer.flush()
+    monkeypatch.setattr(np, "load", load_after_merges)
+    match = reader.lookup(fingerprint(CLIPS[1], RATE), "v1:english")
+
+    assert match is not None and match.verdict == {"clip": 1}
+    generations = sorted(name for name in os.listdir(tmp_path / "index") if name.startswith("keys-"))
+    assert generations == ["keys-3.npy", "keys-4.npy"]
+
+
+def test_adds_and_lookups_go_on_while_a_merge_runs(tmp_path, monkeypatch):
+    index = FingerprintIndex(str(tmp_path / "index"), merge_every=1)
+    saving, release = threading.Event(), threading.Event()
+    real_save = np.save
+
+    def slow_save(*args, **kwargs):
+        saving.set()
+        release.wait(10)
+        return real_save(*args, **kwargs)
+
+    monkeypatch.setattr(np, "save", slow_save)
+    index.add(fingerprint(CLIPS[0], RATE), "v1:english", {"clip": 0})
+    assert saving.wait(10)
+
+    index.add(fingerprint(CLIPS[1], RATE), "v1:english", {"clip": 1})
+    assert index.lookup(fingerprint(CLIPS[1] * 0.7, RATE), "v1:english").verdict == {"clip": 1}
+    assert index.stats()["indexedClips"] == 0
+
+    release.set()
+    index.flush()
+    assert index.stats()["indexedClips"] == 2
+    assert index.lookup(fingerprint(CLIPS[0] * 0.7, RATE), "v1:english").verdict == {"clip": 0}
+
+
+def test_clips_added_by_a_forked_worker_are_found(index):
+    fp = fingerprint(CLIPS[3], RATE)
+    worker = multiprocessing.get_context("fork").Process(target=index.add, args=(fp, "v1:english", {"clip": 3}))
+    worker.start()
+    worker.join(10)
+
+    assert worker.exitcode == 0
+    assert index.lookup(fp, "v1:english").verdict == {"clip": 3}
+
+
+def test_resent_variant_skips_model(models, client, headers):
+    models.verdict = {"language": "English", "classification": "AI_GENERATED",
+                      "confidenceScore": 0.93, "explanation": "cloned voice"}
+
+    def post(samples):
+        return client.post("/api/voice-detection", headers=headers, json={
+            "language": "English", "audioFormat": "wav",
+            "audioBase64": base64.b64encode(encode_wav(samples, RATE)).decode()
+        })
+
+    first = post(CLIPS[0])
+    assert first.status_code == 200 and len(models.calls) == 1
+    for variant in variants(CLIPS[0]).values():
+        response = post(variant)
+        assert response.status_code == 200
+        assert response.json() == first.json()
+    assert len(models.calls) == 1
+
+    assert post(CLIPS[1]).status_code == 200
+    assert len(models.calls) == 2
+    stats = client.get("/fingerprints/stats", headers=headers).json()
+    assert stats["clips"] == 2 and stats["hits"] == 4
@@ -0,0 +1,151 @@
+import asyncio
+import base64
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from jobs import JobStore, JobWorkers, RetryLater
+
+
+def payload(audio: bytes):
+    return {"language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(audio).decode()}
+
+
+@pytest.fixture
+def stub(models):
+    def respond(model_name, contents):
+        if contents[0]["parts"][1]["inline_data"]["data"] == b"broken":
+            raise Exception("400 corrupt audio")
+        time.sleep(0.1)
+        return {**models.verdict, "classification": "AI_GENERATED", "explanation": "stub"}
+
+    models.respond = respond
+    return models
+
+
+def test_enqueue_then_long_poll_for_result(stub, headers):
+    with TestClient(main.app) as client:
+        accepted = client.post("/api/voice-detection/jobs", headers=headers, json=payload(b"clip"))
+        job_id = accepted.json()["jobId"]
+        job = client.get(f"/jobs/{job_id}?wait=5", headers=headers).json()
+        stats = client.get("/jobs/stats", headers=headers).json()
+
+    assert accepted.status_code == 202
+    assert accepted.json()["statusUrl"] == f"/jobs/{job_id}"
+    assert job["status"] == "done"
+    assert job["result"]["classification"] == "AI_GENERATED"
+    assert job["waitSeconds"] is not None
+    assert stats["done"] == 1 and stats["queueDepth"] == 0 and stats["workers"] == 2
+
+
+def test_failed_job_reports_error(stub, headers):
+    with TestClient(main.app) as client:
+        job_id = client.post("/api/voice-detection/jobs", headers=headers, json=payload(b"broken")).json()["jobId"]
+        job = client.get(f"/jobs/{job_id}?wait=5", headers=headers).json()
+
+    assert job["status"] == "failed"
+    assert "corrupt audio" in job["message"]
+
+
+def test_unknown_job_is_404(client, headers):
+    assert client.get("/jobs/nope", headers=headers).status_code == 404
+
+
+def test_jobs_survive_restart(stub, headers, tmp_path, monkeypatch):
+    db = str(tmp_path / "restart.db")
+    before = JobStore(db)
+    queued = before.enqueue("English", b"queued before crash", "audio/mp3")
+    interrupted = before.enqueue("English", b"running during crash", "audio/mp3")
+    assert before.claim()["id"] == queued
+    assert before.claim()["id"] == interrupted
+    before.enqueue("English", b"still waiting", "audio/mp3")
+
+    after = JobStore(db)
+    monkeypatch.setattr(main, "job_store", after)
+    monkeypatch.setattr(main, "job_workers", JobWorkers(after, main.run_job, workers=2, poll_seconds=0.05))
+    with TestClient(main.app) as client:
+        results = [client.get(f"/jobs/{job}?wait=5", headers=headers).json()["status"] for job in (queued, interrupted)]
+
+    assert results == ["done", "done"]
+    assert after.stats()["queueDepth"] == 0
+
+
+def test_claims_are_exclusive(tmp_path):
+    db = str(tmp_path / "shared.db")
+    first, second = JobStore(db), JobStore(db)
+    first.enqueue("English", b"a", "audio/mp3")
+
+    assert first.claim() is not None
+    assert second.claim() is None
+
+
+def test_transient_failure_is_retried_after_a_delay(tmp_path):
+    store = JobStore(str(tmp_path / "retry.db"))
+    calls = []
+
+    async def handler(language, audio, mime_type):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RetryLater("503 quota used up", delay=0.3)
+        return {"classification": "HUMAN"}
+
+    async def run():
+        workers = JobWorkers(store, handler, workers=1, poll_seconds=0.05)
+        job_id = store.enqueue("English", b"clip", "audio/mp3")
+        await workers.start()
+        while store.get(job_id)["status"] != "done":
+            await asyncio.sleep(0.05)
+        await workers.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.3
+
+
+def test_retries_stop_after_max_attempts(tmp_path):
+    store = JobStore(str(tmp_path / "retry.db"), max_attempts=2)
+    job_id = store.enqueue("English", b"clip", "audio/mp3")
+
+    assert store.claim()["id"] == job_id
+    assert store.retry(job_id, "503 quota used up", delay=0)
+    assert store.claim()["id"] == job_id
+    assert not store.retry(job_id, "503 quota used up", delay=0)
+
+    job = store.get(job_id)
+    assert job["status"] == "failed" and "gave up after 2 attempts" in job["message"]
+
+
+def test_job_that_keeps_killing_its_worker_fails(tmp_path):
+    store = JobStore(str(tmp_path / "crash.db"), max_attempts=2)
+    job_id = store.enqueue("English", b"poison", "audio/mp3")
+    for _ in range(2):
+        assert store.claim()["id"] == job_id
+        store.requeue_interrupted()
+
+    assert store.get(job_id)["status"] == "failed"
+    assert store.claim() is None
+
+
+def test_finished_jobs_are_purged(tmp_path):
+    store = JobStore(str(tmp_path / "purge.db"), retention_seconds=0)
+    done = store.enqueue("English", b"a", "audio/mp3")
+    waiting = store.enqueue("English", b"b", "audio/mp3")
+    store.claim()
+    store.complete(done, {"classification": "HUMAN"})
+
+    assert store.purge() == 1
+    assert store.get(done) is None and store.get(waiting)["status"] == "queued"
+
+
+def test_quota_503_becomes_a_retry(monkeypatch):
+    async def quota_exhausted(*args, **kwargs):
+        raise HTTPException(503, detail={"status": "error", "message": "quota"}, headers={"Retry-After": "7"})
+
+    monkeypatch.setattr(main, "analyze", quota_exhausted)
+    with pytest.raises(RetryLater) as retry:
+        asyncio.run(main.run_job("English", b"clip", "audio/mp3"))
+
+    assert retry.value.delay == 7
@@ -0,0 +1,72 @@
+import base64
+import json
+import logging
+
+import main
+from observability import JsonFormatter, request_id_var
+
+
+def payload(audio: bytes):
+    return {"language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(audio).decode()}
+
+
+def sample(text: str, line_start: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_expose_stages_models_and_fallback_depth(models, client, headers):
+    models.errors[main.MODEL_CANDIDATES[0]] = ValueError("429 quota")
+    before = client.get("/metrics").text
+    response = client.post("/api/voice-detection", headers=headers, json=payload(b"metrics clip"))
+    after = client.get("/metrics").text
+
+    assert response.status_code == 200
+    primary, fallback = main.MODEL_CANDIDATES[:2]
+    for line in (
+        'voxguard_fallback_depth_total{depth="2"}',
+        f'voxguard_model_errors_total{{exception="ValueError",model="{primary}"}}',
+        f'voxguard_model_attempt_seconds_count{{model="{fallback}",outcome="success"}}',
+        'voxguard_stage_seconds_count{stage="validation"}',
+        'voxguard_stage_seconds_count{stage="decode"}',
+        'voxguard_stage_seconds_count{stage="parse"}',
+        'voxguard_verdicts_total{source="model"}',
+        'voxguard_request_seconds_count{method="POST",route="/api/voice-detection",status="200"}',
+    ):
+        assert sample(after, line) == sample(before, line) + 1, line
+    assert "voxguard_in_flight_requests" in after
+    assert 'voxguard_payload_bytes_bucket{kind="upstream_per_request"' in after
+    assert int(response.headers["x-upstream-bytes"]) > len(b"metrics clip")
+
+
+def test_routes_are_labelled_by_template(client, headers):
+    client.get("/jobs/abc123", headers=headers)
+    text = client.get("/metrics").text
+
+    assert 'route="/jobs/{job_id}"' in text
+    assert "abc123" not in text
+
+
+def test_request_id_is_echoed_and_generated(client):
+    echoed = client.get("/", headers={"x-request-id": "req-42"})
+    generated = client.get("/")
+
+    assert echoed.headers["x-request-id"] == "req-42"
+    assert len(generated.headers["x-request-id"]) == 32
+
+
+def test_json_log_lines_carry_request_id_and_fields():
+    record = logging.LogRecord("voxguard", logging.INFO, __file__, 1, "model_success", None, None)
+    record.model = "gemini-2.0-flash"
+    token = request_id_var.set("req-7")
+    try:
+        line = json.loads(JsonFormatter().format(record))
+    finally:
+        request_id_var.reset(token)
+
+    assert line["event"] == "model_success"
+    assert line["request_id"] == "req-7"
+    assert line["model"] == "gemini-2.0-flash"
+    assert line["level"] == "info"
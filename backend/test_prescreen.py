@@ -0,0 +1,82 @@
+import base64
+
+import numpy as np
+import pytest
+
+import main
+from audio import decode_pcm, encode_wav
+from prescreen import classify, extract_features
+
+RATE = 16000
+
+
+def tone(seconds=2.0, hz=440.0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (0.5 * np.sin(2 * np.pi * hz * t)).astype(np.float32)
+
+
+def speech_like(seconds=3.0):
+    """Harmonic voice with drifting pitch, syllable envelope and room noise."""
+    rng = np.random.default_rng(7)
+    t = np.arange(int(RATE * seconds)) / RATE
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.7 * t) + rng.normal(0, 3, len(t)).cumsum() / 200
+    phase = 2 * np.pi * np.cumsum(f0) / RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 3.5 * t), 0, None) ** 0.5
+    return (0.3 * voice * envelope + 0.003 * rng.normal(size=len(t))).astype(np.float32)
+
+
+@pytest.fixture
+def post(models, client, headers):
+    models.verdict = {**models.verdict, "explanation": "model verdict"}
+
+    def post(audio):
+        return client.post("/api/voice-detection", headers=headers, json={
+            "language": "English", "audioFormat": "wav", "audioBase64": base64.b64encode(audio).decode()
+        })
+    return post
+
+
+def test_wav_roundtrip():
+    decoded, rate = decode_pcm(encode_wav(tone(0.1), RATE))
+    assert rate == RATE
+    assert np.allclose(decoded, tone(0.1), atol=1e-4)
+    assert decode_pcm(b"\xff\xf3\x84\x00not a wav") is None
+
+
+def test_features_separate_tone_from_speech():
+    tone_features = extract_features(tone(), RATE)
+    speech_features = extract_features(speech_like(), RATE)
+
+    assert tone_features["pitchJitter"] < 0.002
+    assert speech_features["pitchJitter"] > 0.01
+    assert classify(tone_features)[0] == "AI_GENERATED"
+    assert classify(speech_features) is None
+
+
+def test_silence_and_tone_are_answered_locally(post, models):
+    silent = post(encode_wav(np.zeros(RATE, dtype=np.float32), RATE))
+    synthetic = post(encode_wav(tone(), RATE))
+    empty = post(b"")
+
+    assert silent.status_code == synthetic.status_code == empty.status_code == 200
+    assert synthetic.json()["classification"] == "AI_GENERATED"
+    assert synthetic.json()["confidenceScore"] > 0.9
+    assert models.prompts == []
+    assert main.prescreener.stats()["answeredLocally"] == 3
+
+
+def test_ambiguous_clip_is_forwarded_with_features(post, models):
+    resp = post(encode_wav(speech_like(), RATE))
+
+    assert resp.json()["explanation"] == "model verdict"
+    assert "LOCAL ACOUSTIC MEASUREMENTS" in models.prompts[0]
+    assert '"pitchJitter"' in models.prompts[0]
+
+
+def test_undecodable_clip_is_forwarded_unchanged(post, models):
+    post(b"\xff\xf3\x84\x00" * 64)
+
+    assert "LOCAL ACOUSTIC MEASUREMENTS" not in models.prompts[0]
+    stats = main.prescreener.stats()
+    assert stats["undecodable"] == 1 and stats["localFraction"] == 0.0
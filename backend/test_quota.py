@@ -0,0 +1,100 @@
+import base64
+import time
+
+import numpy as np
+import pytest
+
+import main
+from audio import encode_wav
+from quota import ModelQuota, QuotaScheduler, estimate_tokens
+
+PRIMARY, SECONDARY = main.MODEL_CANDIDATES[:2]
+
+
+def payload(audio: bytes):
+    return {"language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(audio).decode()}
+
+
+THROTTLED = Exception("429 Resource has been exhausted (e.g. check quota).")
+
+
+@pytest.fixture
+def upstream(models):
+    """Models that report 500 tokens of usage per call."""
+    models.tokens = 500
+    return models
+
+
+def test_token_estimate_uses_wav_duration():
+    wav = encode_wav(np.zeros(16000 * 10, dtype=np.float32), 16000)
+    assert estimate_tokens(wav, 0) == 10 * 32 + 300
+    assert estimate_tokens(b"\xff" * 32000, 400) == 2 * 32 + 100 + 300
+
+
+def test_rpm_and_tpm_windows():
+    quota = ModelQuota(rpm=2, tpm=1000)
+    now = 100.0
+    quota.sent.extend([[now, 400], [now + 1, 400]])
+    quota.tokens = 800
+    # The oldest of the last two requests leaves the window (plus slack) at 161.
+    assert quota.wait_for(100, now + 2) == pytest.approx(59)
+    quota.rpm = None
+    assert quota.wait_for(100, now + 2) == 0
+    # 700 more tokens only fit once both earlier requests have aged out.
+    assert quota.wait_for(700, now + 2) == pytest.approx(60)
+    assert quota.wait_for(2000, now + 2) == float("inf")
+
+
+def test_routes_to_model_with_headroom(monkeypatch, upstream, client, headers):
+    monkeypatch.setattr(main, "model_quotas", QuotaScheduler({PRIMARY: {"rpm": 1}}))
+
+    first = client.post("/api/voice-detection", headers=headers, json=payload(b"one"))
+    second = client.post("/api/voice-detection", headers=headers, json=payload(b"two"))
+
+    assert PRIMARY in first.json()["explanation"]
+    assert SECONDARY in second.json()["explanation"]
+    # The primary's budget was spent, so it was never even tried for the second clip.
+    assert upstream.calls == [PRIMARY, SECONDARY]
+
+
+def test_all_models_over_budget_returns_503_with_retry_after(monkeypatch, upstream, client, headers):
+    limits = {model: {"rpm": 1} for model in main.MODEL_CANDIDATES}
+    monkeypatch.setattr(main, "model_quotas", QuotaScheduler(limits, max_wait_seconds=0.5))
+
+    for i in range(len(main.MODEL_CANDIDATES)):
+        assert client.post("/api/voice-detection", headers=headers, json=payload(b"clip %d" % i)).status_code == 200
+    refused = client.post("/api/voice-detection", headers=headers, json=payload(b"one too many"))
+
+    assert refused.status_code == 503
+    assert 55 <= int(refused.headers["retry-after"]) <= 61
+    assert "quota" in refused.json()["detail"]["message"]
+    assert len(upstream.calls) == len(main.MODEL_CANDIDATES)
+
+
+def test_short_waits_are_queued_not_refused(monkeypatch, upstream, client, headers):
+    scheduler = QuotaScheduler({model: {"rpm": 1} for model in main.MODEL_CANDIDATES}, max_wait_seconds=1)
+    for model in main.MODEL_CANDIDATES:
+        scheduler.throttle(model, 0.2)
+    monkeypatch.setattr(main, "model_quotas", scheduler)
+
+    started = time.perf_counter()
+    response = client.post("/api/voice-detection", headers=headers, json=payload(b"waits"))
+
+    assert response.status_code == 200
+    assert time.perf_counter() - started >= 0.2
+    assert scheduler.waited == 1
+
+
+def test_upstream_429_takes_model_out_of_rotation(upstream, client, headers):
+    upstream.errors[PRIMARY] = THROTTLED
+
+    client.post("/api/voice-detection", headers=headers, json=payload(b"first"))
+    client.post("/api/voice-detection", headers=headers, json=payload(b"second"))
+
+    assert upstream.calls == [PRIMARY, SECONDARY, SECONDARY]
+    assert main.model_quotas.stats()["models"][PRIMARY]["throttled"] == 1
+
+
+def test_reported_usage_replaces_estimate(upstream, client, headers):
+    client.post("/api/voice-detection", headers=headers, json=payload(b"usage"))
+    assert main.model_quotas.stats()["models"][PRIMARY]["tokensInWindow"] == 500
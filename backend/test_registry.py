@@ -0,0 +1,81 @@
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import main
+import registry
+from registry import ModelRegistry
+
+
+def listed(*names):
+    return [SimpleNamespace(name=f"models/{n}", supported_generation_methods=["generateContent"]) for n in names]
+
+
+def test_clients_and_prompts_are_built_once(monkeypatch):
+    built = []
+    monkeypatch.setattr(registry.genai, "configure", lambda **kwargs: built.append("configure"))
+    monkeypatch.setattr(registry.genai, "GenerativeModel", lambda name, **kwargs: built.append((name, kwargs)) or name)
+
+    reg = ModelRegistry(["a", "b"])
+    reg.warm_up()
+    reg.client("a")
+    reg.client("b")
+
+    instruction = {"system_instruction": registry.SYSTEM_INSTRUCTION}
+    assert built == ["configure", ("a", instruction), ("b", instruction)]
+    assert reg.prompt("Tamil") is reg.prompt("Tamil")
+    # Only the language hint is sent per request.
+    assert reg.prompt("Tamil") == "Suggested language: Tamil. Audit the attached audio."
+
+
+def test_probe_filters_candidates_to_live_models(monkeypatch):
+    monkeypatch.setattr(registry.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(registry.genai, "list_models", lambda: listed("gemini-2.0-flash", "gemini-1.5-flash"))
+
+    reg = ModelRegistry(main.MODEL_CANDIDATES)
+    assert reg.live(main.MODEL_CANDIDATES) == main.MODEL_CANDIDATES  # unprobed: no filtering
+
+    reg.probe()
+    assert reg.live(main.MODEL_CANDIDATES) == ["gemini-2.0-flash", "gemini-1.5-flash"]
+    assert reg.status()["probeAgeSeconds"] is not None
+
+
+def test_failed_probe_keeps_previous_view(monkeypatch):
+    def boom():
+        raise RuntimeError("network down")
+
+    monkeypatch.setattr(registry.genai, "configure", lambda **kwargs: None)
+    reg = ModelRegistry(["a"])
+    monkeypatch.setattr(registry.genai, "list_models", boom)
+    reg.probe()
+
+    assert reg.live(["a"]) == ["a"]
+    assert reg.status()["probeError"] == "network down"
+
+
+def test_health_reports_live_models(monkeypatch, client):
+    monkeypatch.setattr(registry.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(registry.genai, "list_models", lambda: listed("gemini-2.0-flash"))
+    main.model_registry.probe()
+
+    body = client.get("/health").json()
+    assert body["status"] == "ok"
+    assert body["model_backend"] == "gemini-2.0-flash"
+    assert body["liveModels"] == ["gemini-2.0-flash"]
+
+
+def test_startup_warms_up_and_probes(monkeypatch):
+    monkeypatch.setattr(registry.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(registry.genai, "GenerativeModel", lambda name, **kwargs: name)
+    monkeypatch.setattr(registry.genai, "list_models", lambda: listed("gemini-1.5-flash"))
+
+    with TestClient(main.app) as live_client:
+        # The probe runs in the background, so startup does not wait for it.
+        for _ in range(50):
+            body = live_client.get("/health").json()
+            if body["liveModels"] is not None:
+                break
+            time.sleep(0.02)
+
+    assert body["liveModels"] == ["gemini-1.5-flash"]
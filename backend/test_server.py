@@ -0,0 +1,132 @@
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from admission import AdmissionController, KeyStore, Rejected, SharedLimits
+from loadgen import child_pids, make_clips, spawn, stop
+
+
+def test_key_limits_hold_across_workers():
+    keys = KeyStore({"k": {"name": "k"}}, rate_per_second=0, max_concurrent=2)
+    shared = SharedLimits(keys, workers=2)
+    controller = AdmissionController(keys, max_in_flight=10, shared=shared)
+    controller.admit("k")
+
+    def other_worker(results):
+        shared.worker = 1
+        controller.admit("k")
+        try:
+            controller.admit("k")
+            results.put("admitted")
+        except Rejected as e:
+            results.put(e.status)
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    worker = context.Process(target=other_worker, args=(results,))
+    worker.start()
+    worker.join(10)
+
+    # One slot here, one in the other process: the key's cap of 2 is pool-wide.
+    assert results.get(timeout=5) == 429
+    assert controller.stats()["pool"]["keysInFlight"] == {"k": 2}
+    shared.clear_worker(1)
+    assert controller.stats()["pool"]["keysInFlight"] == {"k": 1}
+
+
+@pytest.fixture
+def pool(tmp_path):
+    profile = tmp_path / "profile.json"
+    profile.write_text(json.dumps({"default": {"latency": {"dist": "fixed", "seconds": 1.5}}}))
+    url, _, processes = spawn(str(profile), 0, {
+        "WEB_CONCURRENCY": "2", "DRAIN_SECONDS": "10", "STATE_DIR": str(tmp_path / "state"),
+        "JOBS_DB": str(tmp_path / "jobs.db"), "CONTEXT_CACHE_TTL_SECONDS": "0",
+    })
+    yield url, processes[0]
+    stop(processes, timeout=30)
+
+
+def detect(url: str, headers: dict, clip: bytes) -> httpx.Response:
+    return httpx.post(f"{url}/api/voice-detection", headers=headers, timeout=30, json={
+        "language": "English", "audioFormat": "wav", "audioBase64": base64.b64encode(clip).decode()
+    })
+
+
+def test_sigterm_drains_in_flight_requests(pool, headers):
+    url, server = pool
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(detect(url, headers, make_clips(1)[0])))
+    request.start()
+    time.sleep(0.5)
+
+    server.send_signal(signal.SIGTERM)
+    request.join(30)
+
+    assert responses[0].status_code == 200
+    assert server.wait(timeout=30) == 0
+
+
+def test_dead_worker_is_replaced(pool, headers):
+    url, server = pool
+    workers = child_pids(server.pid)
+    assert len(workers) == 2
+
+    os.kill(workers[0], signal.SIGKILL)
+    for _ in range(50):
+        replaced = child_pids(server.pid)
+        if len(replaced) == 2 and workers[0] not in replaced:
+            break
+        time.sleep(0.1)
+
+    assert len(replaced) == 2 and workers[0] not in replaced
+    assert all(detect(url, headers, clip).status_code == 200 for clip in make_clips(2))
+
+
+def test_listener_gets_nodelay_connections():
+    # asyncio only disables Nagle on accepted sockets whose proto is TCP.
+    from server import listen
+
+    sock = listen("127.0.0.1", 0)
+    assert sock.proto == socket.IPPROTO_TCP
+    sock.close()
+
+
+def test_crashing_worker_is_logged_and_backed_off(tmp_path, monkeypatch):
+    from observability import JsonFormatter
+    from server import PreforkServer, log
+
+    class BrokenWorkers(PreforkServer):
+        def run_worker(self, worker):
+            raise RuntimeError("bad config")
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    app_module = SimpleNamespace(admission=SimpleNamespace(shared=SimpleNamespace(clear_worker=lambda worker: None)))
+    server = BrokenWorkers(app_module, None, workers=1)
+    # The forked workers write here too.
+    handler = logging.FileHandler(tmp_path / "server.log")
+    handler.setFormatter(JsonFormatter())
+    log.addHandler(handler)
+
+    delays = []
+    for _ in range(3):
+        server.spawn(0)
+        pid, status = os.waitpid(next(iter(server.children)), 0)
+        server.reap(pid, status)
+        delays.append(round(server.respawn_at.pop(0) - time.monotonic()))
+    log.removeHandler(handler)
+    handler.close()
+
+    assert delays == [1, 2, 4]
+    assert os.WEXITSTATUS(status) == 1
+    crashed = [json.loads(line) for line in (tmp_path / "server.log").read_text().splitlines() if "worker_crashed" in line]
+    assert len(crashed) == 3 and "RuntimeError: bad config" in crashed[0]["exc"]
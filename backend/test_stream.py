@@ -0,0 +1,133 @@
+import asyncio
+import base64
+import json
+import time
+
+import numpy as np
+import pytest
+
+import main
+from audio import decode_pcm, encode_wav
+from loadgen import make_clips
+from prescreen import PreScreener
+
+RATE = 8000
+
+
+def recording(seconds, loud=(17, 23)):
+    """Quiet noise with a loud stretch the stub model calls synthetic."""
+    rng = np.random.default_rng(1)
+    samples = rng.uniform(-0.05, 0.05, seconds * RATE)
+    samples[loud[0] * RATE:loud[1] * RATE] *= 10
+    return encode_wav(samples.astype(np.float32), RATE)
+
+
+@pytest.fixture
+def stub(monkeypatch, models):
+    """Calls a window synthetic when it contains the loud stretch."""
+    def respond(model_name, contents):
+        samples, _ = decode_pcm(contents[0]["parts"][1]["inline_data"]["data"])
+        synthetic = np.max(np.abs(samples)) > 0.3
+        return {"status": "success", "language": "English",
+                "classification": "AI_GENERATED" if synthetic else "HUMAN",
+                "confidenceScore": 0.9 if synthetic else 0.7, "explanation": "stub"}
+
+    models.respond = respond
+    monkeypatch.setattr(main, "prescreener", PreScreener(enabled=False))
+    return models
+
+
+@pytest.fixture
+def post_stream(client, headers):
+    def post_stream(audio, **extra):
+        return client.post("/api/voice-detection/stream", headers={**headers, **extra}, json={
+            "language": "English", "audioFormat": "wav", "audioBase64": base64.b64encode(audio).decode(),
+            "windowSeconds": 10, "overlapSeconds": 2
+        })
+    return post_stream
+
+
+def test_windows_stream_then_summary(stub, post_stream):
+    resp = post_stream(recording(35))
+    events = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    windows, summary = events[:-1], events[-1]
+    assert sorted((w["start"], w["end"]) for w in windows) == [(0, 10), (8, 18), (16, 26), (24, 34), (32, 35)]
+    assert summary["type"] == "summary"
+    assert summary["classification"] == "AI_GENERATED"
+    assert summary["confidenceScore"] == 0.9
+    assert summary["syntheticRanges"] == [[8.0, 26.0]]
+
+
+def test_all_human_recording(stub, post_stream):
+    summary = json.loads(post_stream(recording(20, loud=(0, 0))).text.splitlines()[-1])
+
+    assert summary["classification"] == "HUMAN"
+    assert summary["syntheticRanges"] == []
+
+
+def test_overlapping_windows_each_reach_the_model(stub, client, headers, monkeypatch):
+    # Neighbouring windows share 9 of their 10 seconds: they must be judged
+    # on their own, not answered from each other's near-duplicate entries.
+    monkeypatch.setattr(main, "STREAM_CONCURRENCY", 1)
+    resp = client.post("/api/voice-detection/stream", headers=headers, json={
+        "language": "English", "audioFormat": "wav", "audioBase64": base64.b64encode(make_clips(1, seconds=30)[0]).decode(),
+        "windowSeconds": 10, "overlapSeconds": 9
+    })
+    windows = [json.loads(line) for line in resp.text.splitlines()][:-1]
+
+    assert len(windows) > 20
+    assert len(stub.calls) == len(windows)
+    assert main.fingerprint_index.stats()["clips"] == 0
+
+
+def test_unexpected_window_error_is_reported_not_raised(stub, post_stream, monkeypatch):
+    analyze = main.analyze
+
+    async def flaky(language, audio, mime_type, **kwargs):
+        if decode_pcm(audio)[0].size < 5 * RATE:
+            raise RuntimeError("short window")
+        return await analyze(language, audio, mime_type, **kwargs)
+
+    monkeypatch.setattr(main, "analyze", flaky)
+    events = [json.loads(line) for line in post_stream(recording(12)).text.splitlines()]
+
+    assert [(e["end"], e["status"]) for e in sorted(events[:-1], key=lambda e: e["index"])] == [
+        (10, "success"), (12, "error")
+    ]
+    assert events[-1]["failedWindows"] == 1
+
+
+def test_server_sent_events(stub, post_stream):
+    resp = post_stream(recording(12), accept="text/event-stream")
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.text.count("event: window") == 2
+    assert "event: summary" in resp.text
+
+
+def test_time_to_first_verdict_does_not_grow_with_length(stub):
+    stub.delay = 0.2
+
+    async def first_event_after(seconds):
+        start = time.perf_counter()
+        events = main.stream_windows("English", recording(seconds, loud=(0, 0)), "audio/wav", 10, 2)
+        await events.__anext__()
+        elapsed = time.perf_counter() - start
+        await events.aclose()
+        return elapsed
+
+    short = asyncio.run(first_event_after(20))
+    long = asyncio.run(first_event_after(240))
+
+    assert short < 0.6
+    assert long < 0.6
+
+
+def test_overlap_must_be_shorter_than_window(stub, client, headers):
+    resp = client.post("/api/voice-detection/stream", headers=headers, json={
+        "language": "English", "audioFormat": "wav", "audioBase64": "", "windowSeconds": 5, "overlapSeconds": 5
+    })
+
+    assert resp.status_code == 422
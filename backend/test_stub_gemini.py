@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import random
+import threading
+import time
+from collections import Counter
+
+import httpx
+import pytest
+import uvicorn
+
+import main
+from loadgen import Payloads, drive, free_port, make_clips, summarize
+from registry import ModelRegistry
+from stub_gemini import create_app, draw_latency
+
+
+@pytest.fixture
+def stub_server():
+    profile = {
+        "default": {"latency": {"dist": "fixed", "seconds": 0.01}},
+        # A cacheable 2.0-flash, as if the instruction were past Gemini's minimum.
+        "models": {"gemini-3-pro-preview": {"fail": 404}, "gemini-2.0-flash": {"min_cache_tokens": 0}},
+    }
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(profile, seed=0), port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(5)
+
+
+def test_backend_falls_back_past_stubbed_404(stub_server, monkeypatch, client, headers):
+    registry = ModelRegistry(main.MODEL_CANDIDATES, api_key="stub", refresh_seconds=0, api_endpoint=stub_server)
+    monkeypatch.setattr(main, "model_registry", registry)
+
+    response = client.post("/api/voice-detection", headers=headers, json={
+        "language": "English", "audioFormat": "mp3", "audioBase64": base64.b64encode(b"not really mp3").decode()
+    })
+    calls = httpx.get(f"{stub_server}/stub/stats").json()["calls"]
+
+    assert response.status_code == 200
+    assert response.json()["classification"] == "HUMAN"
+    assert calls == {"gemini-3-pro-preview": 1, "gemini-2.0-flash": 1}
+
+
+def test_latency_distributions_are_seeded():
+    spec = {"dist": "lognormal", "median": 0.5, "sigma": 0.3}
+    first = [draw_latency(spec, random.Random(3)) for _ in range(3)]
+    again = [draw_latency(spec, random.Random(3)) for _ in range(3)]
+    assert first == again
+    assert draw_latency({"dist": "fixed", "seconds": 0.2}, random.Random()) == 0.2
+    assert 1 <= draw_latency({"dist": "uniform", "low": 1, "high": 2}, random.Random()) <= 2
+
+
+def test_summary_reports_percentiles_and_statuses():
+    summary = summarize([i / 1000 for i in range(1, 101)], Counter({200: 100, 503: 4}), elapsed=10.0)
+
+    assert summary["requests"] == 104
+    assert summary["throughput_rps"] == 10.0
+    assert summary["statuses"] == {"200": 100, "503": 4}
+    assert summary["latency_ms"]["p50"] == pytest.approx(50.5)
+    assert summary["latency_ms"]["p99"] == pytest.approx(99.0, abs=0.1)
+
+
+def test_payloads_are_unique_per_request():
+    payloads = Payloads(make_clips(count=2, seconds=0.1))
+    bodies = {payloads.next()["audioBase64"] for _ in range(6)}
+    assert len(bodies) == 6
+
+
+def test_closed_loop_drive_against_stub(stub_server, monkeypatch):
+    registry = ModelRegistry(main.MODEL_CANDIDATES, api_key="stub", refresh_seconds=0, api_endpoint=stub_server)
+    monkeypatch.setattr(main, "model_registry", registry)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    try:
+        summary = asyncio.run(drive(f"http://127.0.0.1:{port}", Payloads(make_clips(count=2, seconds=0.5)),
+                                    duration=0.5, concurrency=4))
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+    assert summary["ok"] == summary["requests"] > 0
+    assert summary["latency_ms"]["p99"] >= summary["latency_ms"]["p50"] > 0
+
+
+def test_context_cache_carries_the_instruction(stub_server, monkeypatch, client, headers):
+    registry = ModelRegistry(["gemini-2.0-flash"], api_key="stub", refresh_seconds=0, api_endpoint=stub_server,
+                             context_cache_ttl_seconds=600)
+    registry.warm_up()
+    monkeypatch.setattr(main, "model_registry", registry)
+    monkeypatch.setattr(main, "MODEL_CANDIDATES", ["gemini-2.0-flash"])
+
+    response = client.post("/api/voice-detection", headers=headers, json={
+        "language": "Hindi", "audioFormat": "mp3", "audioBase64": base64.b64encode(b"not really mp3").decode()
+    })
+    assert response.status_code == 200
+    assert httpx.get(f"{stub_server}/stub/stats").json()["cacheHits"] == {"gemini-2.0-flash": 1}
+
+    # Deleted upstream: the refresh recreates it instead of leaving a dead handle.
+    old = registry.context_cache_status()["caches"]["gemini-2.0-flash"]["name"]
+    httpx.delete(f"{stub_server}/v1beta/{old}")
+    registry.refresh_context_caches()
+    assert registry.context_cache_status()["caches"]["gemini-2.0-flash"]["name"] != old
+
+    registry.delete_context_caches()
+    assert httpx.get(f"{stub_server}/stub/stats").json()["caches"] == 0
+
+
+def test_uncacheable_model_keeps_system_instruction(stub_server):
+    registry = ModelRegistry(["gemini-1.5-flash"], api_key="stub", refresh_seconds=0, api_endpoint=stub_server,
+                             context_cache_ttl_seconds=600)
+    registry.warm_up()
+    status = registry.context_cache_status()
+
+    assert status["caches"] == {}
+    assert "too small" in status["errors"]["gemini-1.5-flash"]
+    assert registry.client("gemini-1.5-flash")._system_instruction is not None
+
+    # Retrying cannot help: the instruction is as big as it will get.
+    registry.refresh_context_caches()
+    assert httpx.get(f"{stub_server}/stub/stats").json()["calls"]["cachedContents.create"] == 1
+    assert registry.context_cache_status()["uncacheable"] == ["gemini-1.5-flash"]
@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+
+import pytest
+
+import main
+from loadgen import make_clips
+
+clip_ids = itertools.count()
+
+
+@pytest.fixture
+def tiered(monkeypatch, models):
+    """Confident AI_GENERATED stub verdicts with tiered routing on."""
+    models.verdict = {"language": "English", "classification": "AI_GENERATED", "confidenceScore": 0.95}
+    monkeypatch.setattr(main, "TIERED_ROUTING", True)
+    return models
+
+
+def analyze_fresh_clip():
+    audio = f"tier-clip-{next(clip_ids)}".encode()
+    return asyncio.run(main.analyze("English", audio, "audio/mp3"))
+
+
+def test_confident_fast_tier_answers_alone(tiered):
+    tiered.confidence["gemini-2.0-flash"] = 0.9
+
+    result = analyze_fresh_clip()
+
+    assert result.tier == "fast"
+    assert tiered.calls == ["gemini-2.0-flash"]
+
+
+def test_ambiguous_clip_escalates_to_the_heavy_model(tiered):
+    tiered.confidence["gemini-2.0-flash"] = 0.6
+
+    result = analyze_fresh_clip()
+
+    assert result.tier == "escalated"
+    assert "gemini-3-pro-preview" in result.explanation
+    assert tiered.calls == ["gemini-2.0-flash", "gemini-3-pro-preview"]
+
+
+def test_failed_fast_tier_escalates(tiered):
+    tiered.errors["gemini-2.0-flash"] = Exception("503 overloaded")
+
+    result = analyze_fresh_clip()
+
+    assert result.tier == "escalated"
+    assert tiered.calls == ["gemini-2.0-flash", "gemini-3-pro-preview"]
+
+
+def test_unsure_fast_verdict_is_returned_but_not_kept_when_escalation_fails(tiered):
+    tiered.confidence["gemini-2.0-flash"] = 0.6
+    for name in main.ESCALATION_MODELS:
+        tiered.errors[name] = Exception("404 model not found")
+
+    clip = make_clips(1)[0]
+    result = asyncio.run(main.analyze("English", clip, "audio/wav"))
+
+    assert result.tier == "fast_unconfirmed" and result.confidenceScore == 0.6
+    assert tiered.calls == ["gemini-2.0-flash", *main.ESCALATION_MODELS]
+    assert main.verdict_cache.stats()["entries"] == 0
+    assert main.fingerprint_index.stats()["clips"] == 0
+    # Nothing was remembered, so the clip is tried again next time.
+    asyncio.run(main.analyze("English", clip, "audio/wav"))
+    assert tiered.calls.count("gemini-2.0-flash") == 2
+
+
+def test_escalation_never_lands_on_another_flash_model(tiered):
+    tiered.confidence["gemini-2.0-flash"] = 0.6
+    tiered.errors["gemini-3-pro-preview"] = Exception("503 overloaded")
+
+    result = analyze_fresh_clip()
+
+    assert result.tier == "fast_unconfirmed"
+    assert tiered.calls == ["gemini-2.0-flash", "gemini-3-pro-preview"]
+
+
+def test_fallback_models_answer_when_both_tiers_fail(tiered):
+    tiered.errors["gemini-2.0-flash"] = Exception("503 overloaded")
+    tiered.errors["gemini-3-pro-preview"] = Exception("503 overloaded")
+
+    result = analyze_fresh_clip()
+
+    assert result.tier == "fallback"
+    assert tiered.calls == ["gemini-2.0-flash", "gemini-3-pro-preview", "gemini-2.0-flash-001"]
+
+
+def test_tiering_off_walks_the_full_chain(tiered, monkeypatch):
+    monkeypatch.setattr(main, "TIERED_ROUTING", False)
+
+    assert analyze_fresh_clip().tier == "full"
+    assert tiered.calls == ["gemini-3-pro-preview"]
@@ -0,0 +1,99 @@
+import asyncio
+import base64
+
+import main
+
+CLIP = b"\xff\xf3\x84\x00" + bytes(range(256)) * 40
+
+
+def received(models):
+    """The inline audio part of every model call."""
+    return [part["inline_data"] for part in models.audio]
+
+
+def test_raw_audio_body_is_passed_through(models, client, headers):
+    resp = client.post(
+        "/api/voice-detection/upload?language=Hindi",
+        headers={**headers, "Content-Type": "audio/wav"},
+        content=CLIP
+    )
+
+    assert resp.status_code == 200
+    assert resp.json()["classification"] == "HUMAN"
+    assert received(models) == [{"mime_type": "audio/wav", "data": CLIP}]
+
+
+def test_multipart_upload(models, client, headers):
+    resp = client.post(
+        "/api/voice-detection/upload",
+        headers=headers,
+        data={"language": "Hindi"},
+        files={"file": ("call.mp3", CLIP, "audio/mpeg")}
+    )
+
+    assert resp.status_code == 200
+    assert received(models) == [{"mime_type": "audio/mp3", "data": CLIP}]
+
+
+def test_oversized_body_is_rejected_before_model(models, client, headers, monkeypatch):
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1024)
+
+    resp = client.post(
+        "/api/voice-detection/upload?language=Hindi",
+        headers={**headers, "Content-Type": "audio/wav"},
+        content=CLIP
+    )
+
+    assert resp.status_code == 413
+    assert received(models) == []
+
+
+def test_chunked_multipart_body_is_limited_while_it_arrives(models, headers, monkeypatch):
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1024)
+    boundary = "voxguard-test"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"language\"\r\n\r\nHindi\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"call.mp3\"\r\n"
+        f"Content-Type: audio/mpeg\r\n\r\n"
+    ).encode() + CLIP + f"\r\n--{boundary}--\r\n".encode()
+    chunks = [body[start:start + 512] for start in range(0, len(body), 512)]
+    pulled, sent = [], []
+
+    # Straight to the ASGI app: TestClient would buffer the whole body first.
+    # No Content-Length, so only counting the body as it arrives can stop it.
+    async def receive():
+        pulled.append(chunks[len(pulled)])
+        return {"type": "http.request", "body": pulled[-1], "more_body": len(pulled) < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http", "root_path": "",
+        "path": "/api/voice-detection/upload", "raw_path": b"/api/voice-detection/upload", "query_string": b"",
+        "server": ("testserver", 80), "client": ("testclient", 50000),
+        "headers": [(b"x-api-key", headers["x-api-key"].encode()),
+                    (b"content-type", f"multipart/form-data; boundary={boundary}".encode())],
+    }
+    asyncio.run(main.app(scope, receive, send))
+
+    assert sent[0]["status"] == 413
+    assert received(models) == []
+    assert len(pulled) <= 1024 // 512 + 1 < len(chunks)
+
+
+def test_upload_requires_language_and_audio_type(models, client, headers):
+    no_language = client.post("/api/voice-detection/upload", headers={**headers, "Content-Type": "audio/wav"}, content=CLIP)
+    wrong_type = client.post("/api/voice-detection/upload?language=Hindi", headers={**headers, "Content-Type": "text/plain"}, content=b"hi")
+
+    assert no_language.status_code == 422
+    assert wrong_type.status_code == 415
+
+
+def test_json_and_upload_share_the_verdict_cache(models, client, headers):
+    client.post("/api/voice-detection", headers=headers, json={
+        "language": "Hindi", "audioFormat": "mp3", "audioBase64": base64.b64encode(CLIP).decode()
+    })
+    client.post("/api/voice-detection/upload?language=Hindi", headers={**headers, "Content-Type": "audio/mp3"}, content=CLIP)
+
+    assert len(received(models)) == 1
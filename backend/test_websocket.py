@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from live import Coalescer, RollingWindow
+
+RATE = 8000
+FRAME_SECONDS = 0.1
+
+
+def pcm_frames(seconds):
+    rng = np.random.default_rng(3)
+    samples = (rng.uniform(-0.2, 0.2, int(seconds * RATE)) * 32767).astype("<i2")
+    step = int(FRAME_SECONDS * RATE)
+    return [samples[i:i + step].tobytes() for i in range(0, len(samples), step)]
+
+
+def replay(client, frames, realtime=True, **params):
+    query = "&".join(f"{k}={v}" for k, v in {"api_key": "sk_test_123456789", "sampleRate": RATE, **params}.items())
+    messages = []
+    with client.websocket_connect(f"/ws/voice-detection?{query}") as ws:
+        for frame in frames:
+            ws.send_bytes(frame)
+            if realtime:
+                time.sleep(FRAME_SECONDS)
+        ws.send_text("stop")
+        try:
+            while True:
+                messages.append(ws.receive_json())
+        except WebSocketDisconnect:
+            pass
+    return messages
+
+
+@pytest.fixture
+def stub(models):
+    models.delay = 0.05
+    return models
+
+
+def test_rolling_window_keeps_only_the_latest_audio():
+    window = RollingWindow(rate=10, window_seconds=2, cadence_seconds=1)
+    due = [window.feed_pcm16((np.full(5, i, dtype="<i2")).tobytes()) for i in range(1, 8)]
+
+    start, end, samples = window.snapshot()
+    assert due == [False, True, False, True, False, True, False]
+    assert (start, end) == (1.5, 3.5)
+    assert list(samples) == [v / 32768.0 for v in [4] * 5 + [5] * 5 + [6] * 5 + [7] * 5]
+
+
+def test_frame_longer_than_the_window_keeps_its_timing():
+    window = RollingWindow(rate=10, window_seconds=1, cadence_seconds=1)
+
+    assert window.feed_pcm16(np.arange(30, dtype="<i2").tobytes())
+    start, end, samples = window.snapshot()
+    assert (start, end) == (2.0, 3.0)
+    assert list(samples) == [v / 32768.0 for v in range(20, 30)]
+    # The next cadence point is 4 s, not 2 s.
+    assert not window.feed_pcm16(np.zeros(5, dtype="<i2").tobytes())
+    assert window.feed_pcm16(np.zeros(5, dtype="<i2").tobytes())
+
+
+def test_coalescer_keeps_only_the_newest_waiting_window():
+    c = Coalescer()
+    assert c.offer("w1")
+    assert not c.offer("w2")
+    assert not c.offer("w3")
+
+    assert c.dropped == 1
+    assert c.done() == "w3"
+    assert c.done() is None and not c.in_flight
+
+
+def test_realtime_replay_gets_timely_verdicts(stub, client):
+    messages = replay(client, pcm_frames(4), windowSeconds=2, cadenceSeconds=1)
+
+    assert [m["type"] for m in messages] == ["verdict"] * 4
+    assert [m["end"] for m in messages] == [1.0, 2.0, 3.0, 4.0]
+    assert max(m["latencySeconds"] for m in messages) < 0.5
+    assert messages[-1]["coalesced"] == 0
+
+
+def test_slow_analysis_coalesces_windows(stub, client):
+    stub.delay = 0.5
+
+    messages = replay(client, pcm_frames(5), realtime=False, windowSeconds=2, cadenceSeconds=0.5)
+
+    # Ten windows came due almost at once: the first runs, the newest waits,
+    # everything in between is dropped.
+    assert len(messages) == 2
+    assert messages[-1]["end"] == 5.0
+    assert messages[-1]["coalesced"] == 8
+
+
+def test_unexpected_error_does_not_stall_later_windows(stub, client, monkeypatch):
+    analyze = main.analyze
+    calls = []
+
+    async def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("decoder blew up")
+        return await analyze(*args, **kwargs)
+
+    monkeypatch.setattr(main, "analyze", flaky)
+    messages = replay(client, pcm_frames(3), windowSeconds=2, cadenceSeconds=1)
+
+    assert [m["type"] for m in messages] == ["error", "verdict", "verdict"]
+    assert messages[0]["message"] == "RuntimeError: decoder blew up"
+
+
+def test_rejects_bad_key(client):
+    with pytest.raises(WebSocketDisconnect) as excinfo:
+        with client.websocket_connect("/ws/voice-detection?api_key=wrong") as ws:
+            ws.receive_json()
+    assert excinfo.value.code == 1008
@@ -0,0 +1,44 @@
+import tempfile
+from typing import AsyncIterator
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def limit_stream(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass a request body through, raising UploadTooLarge as soon as more
+    than max_bytes have arrived, whatever Content-Length claimed."""
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        yield chunk
+
+
+async def spool_stream(chunks: AsyncIterator[bytes], max_bytes: int, spool_bytes: int) -> tempfile.SpooledTemporaryFile:
+    """Copy a request body into a spooled temp file, enforcing max_bytes as it arrives.
+
+    Bodies up to spool_bytes stay in memory; larger ones roll over to disk,
+    so the server never holds more than one chunk plus the spool in RAM while
+    receiving. Raises UploadTooLarge as soon as the limit is crossed.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    try:
+        async for chunk in limit_stream(chunks, max_bytes):
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def read_all(spool) -> bytes:
+    """Read a spooled upload into one bytes object and release the spool."""
+    try:
+        spool.seek(0)
+        return spool.read()
+    finally:
+        spool.close()
@@ -0,0 +1,123 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from voxguard_client import AsyncVoxGuardClient, RetryPolicy, VoxGuardClient, VoxGuardError
+from voxguard_client.encoding import content_length, iter_body
+
+VERDICT = {"status": "success", "language": "English", "classification": "HUMAN",
+           "confidenceScore": 0.9, "explanation": "stub"}
+NO_WAIT = RetryPolicy(max_retries=3, base_seconds=0)
+
+
+def test_streamed_body_is_the_json_payload(tmp_path):
+    clip = tmp_path / "a.mp3"
+    clip.write_bytes(bytes(range(256)) * 41)  # not a multiple of the 3-byte base64 group
+
+    body = b"".join(iter_body(str(clip), "Tamil", "mp3", chunk_bytes=3 * 100))
+
+    assert json.loads(body) == {"language": "Tamil", "audioFormat": "mp3",
+                                "audioBase64": base64.b64encode(clip.read_bytes()).decode()}
+    assert len(body) == content_length(str(clip), "Tamil", "mp3")
+
+
+def test_retries_5xx_then_raises_on_client_errors():
+    statuses = iter([503, 429, 200])
+    seen = []
+
+    def handler(request):
+        seen.append(json.loads(request.read())["audioFormat"])
+        status = next(statuses)
+        return httpx.Response(status, json=VERDICT if status == 200 else {"detail": {"message": "busy"}})
+
+    with VoxGuardClient("http://voxguard", "key", retry=NO_WAIT, transport=httpx.MockTransport(handler)) as client:
+        verdict = client.analyze(b"clip", "English", "wav")
+        assert verdict.classification == "HUMAN" and verdict.confidence_score == 0.9
+        assert seen == ["wav", "wav", "wav"]
+
+    def unauthorized(request):
+        seen.append("401")
+        return httpx.Response(401, json={"detail": {"status": "error", "message": "Invalid API Key"}})
+
+    seen.clear()
+    with VoxGuardClient("http://voxguard", "bad", retry=NO_WAIT, transport=httpx.MockTransport(unauthorized)) as client:
+        with pytest.raises(VoxGuardError) as error:
+            client.analyze(b"clip", "English")
+    assert error.value.status == 401 and error.value.message == "Invalid API Key"
+    assert seen == ["401"]
+
+
+def test_connection_errors_are_retried_until_the_budget_runs_out():
+    attempts = []
+
+    def handler(request):
+        attempts.append(1)
+        raise httpx.ConnectError("refused", request=request)
+
+    with VoxGuardClient("http://voxguard", "key", retry=NO_WAIT, transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(httpx.ConnectError):
+            client.analyze(b"clip", "English")
+    assert len(attempts) == 4
+
+
+def test_jitter_stays_within_backoff_and_honours_retry_after():
+    policy = RetryPolicy(base_seconds=1, cap_seconds=5)
+    assert all(0 <= policy.delay(attempt) <= min(5, 2 ** attempt) for attempt in range(6) for _ in range(50))
+    assert policy.delay(0, httpx.Response(503, headers={"retry-after": "3"})) >= 3
+
+
+def test_analyze_many_pipelines_a_directory(tmp_path):
+    for i in range(10):
+        (tmp_path / f"clip{i}.wav").write_bytes(b"RIFF" + bytes([i]) * 100)
+    (tmp_path / "notes.txt").write_text("not audio")
+    (tmp_path / "clip9.wav").write_bytes(b"bad")
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+
+    def handler(request):
+        body = json.loads(request.read())
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        time.sleep(0.05)
+        with lock:
+            state["in_flight"] -= 1
+        if base64.b64decode(body["audioBase64"]) == b"bad":
+            return httpx.Response(400, json={"detail": {"message": "bad clip"}})
+        return httpx.Response(200, json=VERDICT)
+
+    with VoxGuardClient("http://voxguard", "key", max_connections=3, retry=NO_WAIT,
+                        transport=httpx.MockTransport(handler)) as client:
+        results = list(client.analyze_many(tmp_path, "English"))
+
+    assert len(results) == 10
+    assert state["peak"] == 3
+    failed = [r for r in results if r.error is not None]
+    assert [str(r.clip).endswith("clip9.wav") for r in failed] == [True]
+    assert all(r.verdict.classification == "HUMAN" for r in results if r.error is None)
+
+
+def test_async_analyze_many_bounds_concurrency():
+    state = {"in_flight": 0, "peak": 0}
+
+    async def handler(request):
+        await request.aread()
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.02)
+        state["in_flight"] -= 1
+        return httpx.Response(200, json=VERDICT)
+
+    async def run():
+        async with AsyncVoxGuardClient("http://voxguard", "key", retry=NO_WAIT,
+                                       transport=httpx.MockTransport(handler)) as client:
+            return [result async for result in client.analyze_many([b"a", b"b", b"c", b"d", b"e"], "Hindi", concurrency=2)]
+
+    results = asyncio.run(run())
+    assert sorted(r.clip for r in results) == [b"a", b"b", b"c", b"d", b"e"]
+    assert state["peak"] == 2
@@ -0,0 +1,8 @@
+"""Python client for the VoxGuard /api/voice-detection API."""
+from .client import (
+    AsyncVoxGuardClient, ClipResult, RetryPolicy, Verdict, VoxGuardClient, VoxGuardError, iter_clips
+)
+
+__all__ = [
+    "AsyncVoxGuardClient", "ClipResult", "RetryPolicy", "Verdict", "VoxGuardClient", "VoxGuardError", "iter_clips"
+]
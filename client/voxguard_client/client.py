@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import httpx
+
+from .encoding import Audio, aiter_body, content_length, iter_body
+
+DETECT_PATH = "/api/voice-detection"
+# Overloaded, rate-limited, or every model failed: worth another try.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".wave", ".aiff", ".aac", ".m4a", ".ogg", ".opus", ".flac"}
+
+
+class VoxGuardError(Exception):
+    """The API answered with an error (after any retries)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class Verdict(NamedTuple):
+    language: str
+    classification: str  # "AI_GENERATED" | "HUMAN"
+    confidence_score: float
+    explanation: str
+    tier: Optional[str] = None  # "local" | "fast" | "fast_unconfirmed" | "escalated" | "fallback" | "full"; None from older servers
+
+    @classmethod
+    def from_json(cls, body: dict) -> "Verdict":
+        return cls(body["language"], body["classification"], body["confidenceScore"], body["explanation"], body.get("tier"))
+
+
+class ClipResult(NamedTuple):
+    """One clip of analyze_many(): its verdict, or the error it failed with."""
+    clip: Audio
+    verdict: Optional[Verdict]
+    error: Optional[Exception]
+
+
+def audio_format_for(audio: Audio, audio_format: Optional[str] = None) -> str:
+    """The declared audioFormat: as given, else the file extension, else mp3
+    (the server sniffs WAV from the bytes regardless)."""
+    if audio_format:
+        return audio_format
+    if not isinstance(audio, (bytes, bytearray, memoryview)):
+        extension = os.path.splitext(os.fspath(audio))[1].lower().lstrip(".")
+        if extension:
+            return extension
+    return "mp3"
+
+
+def iter_clips(directory: Union[str, os.PathLike], recursive: bool = False) -> List[str]:
+    """Audio files in a directory (by extension), sorted."""
+    if recursive:
+        paths = (os.path.join(root, name) for root, _, names in os.walk(directory) for name in names)
+    else:
+        paths = (entry.path for entry in os.scandir(directory) if entry.is_file())
+    return sorted(path for path in paths if os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS)
+
+
+def error_message(response: httpx.Response) -> str:
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        return response.text or response.reason_phrase
+    if isinstance(detail, dict):
+        return detail.get("message", str(detail))
+    return str(detail)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: attempt n sleeps a uniform
+    random time in [0, min(cap, base * 2**n)], or the server's Retry-After
+    if that is longer, so a crowd of clients does not retry in lockstep."""
+
+    def __init__(self, max_retries: int = 3, base_seconds: float = 0.5, cap_seconds: float = 20.0):
+        self.max_retries = max_retries
+        self.base_seconds = base_seconds
+        self.cap_seconds = cap_seconds
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        delay = random.uniform(0, min(self.cap_seconds, self.base_seconds * 2 ** attempt))
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.cap_seconds))
+        return delay
+
+
+def _client_options(base_url: str, api_key: str, timeout: float, max_connections: int) -> dict:
+    return {
+        "base_url": base_url,
+        "headers": {"x-api-key": api_key},
+        # pool=None: past max_connections, requests wait for a free connection.
+        "timeout": httpx.Timeout(timeout, connect=10.0, pool=None),
+        "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    }
+
+
+class VoxGuardClient:
+    """Blocking client for /api/voice-detection.
+
+    One keep-alive connection pool per client (at most max_connections
+    requests in flight; extra callers wait for a connection), clips streamed
+    from disk as base64, and retries with jittered backoff on 429/5xx and
+    connection errors. Thread-safe; use it as a context manager or close().
+
+        with VoxGuardClient("http://localhost:10000", "sk_...") as client:
+            verdict = client.analyze("call.mp3", language="Tamil")
+    """
+
+    def __init__(self, base_url: str, api_key: str, *, timeout: float = 60.0, max_connections: int = 8,
+                 retry: Optional[RetryPolicy] = None, transport: Optional[httpx.BaseTransport] = None):
+        self.max_connections = max_connections
+        self.retry = retry or RetryPolicy()
+        self._http = httpx.Client(**_client_options(base_url, api_key, timeout, max_connections), transport=transport)
+
+    def analyze(self, audio: Audio, language: str, audio_format: Optional[str] = None) -> Verdict:
+        """Classify one clip: a path or the raw bytes."""
+        audio_format = audio_format_for(audio, audio_format)
+        headers = {"content-type": "application/json",
+                   "content-length": str(content_length(audio, language, audio_format))}
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = self._http.post(DETECT_PATH, headers=headers, content=iter_body(audio, language, audio_format))
+            except httpx.TransportError:
+                if attempt >= self.retry.max_retries:
+                    raise
+            if response is not None:
+                if response.status_code == 200:
+                    return Verdict.from_json(response.json())
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retry.max_retries:
+                    raise VoxGuardError(response.status_code, error_message(response))
+            time.sleep(self.retry.delay(attempt, response))
+            attempt += 1
+
+    def analyze_many(self, clips: Union[str, os.PathLike, Iterable[Audio]], language: str,
+                     audio_format: Optional[str] = None, concurrency: Optional[int] = None) -> Iterator[ClipResult]:
+        """Classify many clips with up to `concurrency` (default
+        max_connections) in flight, yielding results as they finish.
+
+        `clips` is a directory (every audio file in it) or an iterable of
+        paths or bytes; it is consumed lazily, so a huge listing is never
+        read up front. A clip that fails is yielded with its error.
+        """
+        sources = iter(iter_clips(clips) if isinstance(clips, (str, os.PathLike)) else clips)
+        concurrency = concurrency or self.max_connections
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="voxguard") as pool:
+            pending = {}
+
+            def submit(batch):
+                for clip in batch:
+                    pending[pool.submit(self.analyze, clip, language, audio_format)] = clip
+
+            submit(itertools.islice(sources, concurrency))
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                submit(itertools.islice(sources, len(done)))
+                for future in done:
+                    clip = pending.pop(future)
+                    error = future.exception()
+                    yield ClipResult(clip, None if error else future.result(), error)
+
+    def close(self):
+        self._http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncVoxGuardClient:
+    """asyncio twin of VoxGuardClient, with the same pooling, streaming and
+    retry behaviour.
+
+        async with AsyncVoxGuardClient("http://localhost:10000", "sk_...") as client:
+            async for result in client.analyze_many("clips/", language="English"):
+                ...
+    """
+
+    def __init__(self, base_url: str, api_key: str, *, timeout: float = 60.0, max_connections: int = 8,
+                 retry: Optional[RetryPolicy] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_connections = max_connections
+        self.retry = retry or RetryPolicy()
+        self._http = httpx.AsyncClient(**_client_options(base_url, api_key, timeout, max_connections), transport=transport)
+
+    async def analyze(self, audio: Audio, language: str, audio_format: Optional[str] = None) -> Verdict:
+        """Classify one clip: a path or the raw bytes."""
+        audio_format = audio_format_for(audio, audio_format)
+        headers = {"content-type": "application/json",
+                   "content-length": str(content_length(audio, language, audio_format))}
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = await self._http.post(DETECT_PATH, headers=headers,
+                                                 content=aiter_body(audio, language, audio_format))
+            except httpx.TransportError:
+                if attempt >= self.retry.max_retries:
+                    raise
+            if response is not None:
+                if response.status_code == 200:
+                    return Verdict.from_json(response.json())
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retry.max_retries:
+                    raise VoxGuardError(response.status_code, error_message(response))
+            await asyncio.sleep(self.retry.delay(attempt, response))
+            attempt += 1
+
+    async def analyze_many(self, clips: Union[str, os.PathLike, Iterable[Audio]], language: str,
+                           audio_format: Optional[str] = None, concurrency: Optional[int] = None) -> AsyncIterator[ClipResult]:
+        """See VoxGuardClient.analyze_many."""
+        sources = iter(iter_clips(clips) if isinstance(clips, (str, os.PathLike)) else clips)
+        concurrency = concurrency or self.max_connections
+        pending = {}
+
+        def submit(batch):
+            for clip in batch:
+                pending[asyncio.ensure_future(self.analyze(clip, language, audio_format))] = clip
+
+        submit(itertools.islice(sources, concurrency))
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                submit(itertools.islice(sources, len(done)))
+                for task in done:
+                    clip = pending.pop(task)
+                    error = task.exception()
+                    yield ClipResult(clip, None if error else task.result(), error)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
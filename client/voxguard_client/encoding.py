@@ -0,0 +1,68 @@
+import asyncio
+import base64
+import contextlib
+import json
+import math
+import os
+from typing import AsyncIterator, Iterator, Tuple, Union
+
+Audio = Union[str, os.PathLike, bytes]
+
+# A multiple of 3, so every chunk but the last encodes without padding and
+# the chunks concatenate into one valid base64 string.
+CHUNK_BYTES = 3 * 64 * 1024
+
+
+def audio_size(audio: Audio) -> int:
+    return len(audio) if isinstance(audio, (bytes, bytearray, memoryview)) else os.path.getsize(audio)
+
+
+def body_frame(language: str, audio_format: str) -> Tuple[bytes, bytes]:
+    """The JSON around audioBase64: (everything before it, everything after)."""
+    head = json.dumps({"language": language, "audioFormat": audio_format})[:-1]
+    return f'{head}, "audioBase64": "'.encode(), b'"}'
+
+
+def content_length(audio: Audio, language: str, audio_format: str) -> int:
+    prefix, suffix = body_frame(language, audio_format)
+    return len(prefix) + 4 * math.ceil(audio_size(audio) / 3) + len(suffix)
+
+
+def iter_body(audio: Audio, language: str, audio_format: str, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """The /api/voice-detection request body, base64-encoding the clip a
+    chunk at a time so neither the file nor its encoding is held whole."""
+    prefix, suffix = body_frame(language, audio_format)
+    # The JSON framing rides on the first and last chunks: a tiny write of
+    # its own would sit behind Nagle's algorithm until the server ACKs.
+    pending = None
+    for chunk in _read_chunks(audio, chunk_bytes):
+        if pending is None:
+            pending = prefix + base64.b64encode(chunk)
+        else:
+            yield pending
+            pending = base64.b64encode(chunk)
+    yield (prefix if pending is None else pending) + suffix
+
+
+def _read_chunks(audio: Audio, chunk_bytes: int) -> Iterator[bytes]:
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        view = memoryview(audio)
+        for start in range(0, len(view), chunk_bytes):
+            yield view[start:start + chunk_bytes]
+    else:
+        with open(audio, "rb") as f:
+            while chunk := f.read(chunk_bytes):
+                yield chunk
+
+
+async def aiter_body(audio: Audio, language: str, audio_format: str, chunk_bytes: int = CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """iter_body for asyncio: file reads and encoding run off the event loop."""
+    chunks = iter_body(audio, language, audio_format, chunk_bytes)
+    try:
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+    finally:
+        # Still running in its thread if we were cancelled mid-read; it is
+        # then closed by the garbage collector instead.
+        with contextlib.suppress(ValueError):
+            chunks.close()